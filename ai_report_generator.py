@@ -1,17 +1,337 @@
 import json
+import hashlib
+import threading
+from collections import OrderedDict
 from datetime import datetime
+from intent_router import DEFAULT_ROUTER
+from anomaly_detection import RULE_LABELS
+
+# ==========================================
+# 报告小节模板（模块加载时定义一次，渲染时只做字段填充）
+# ==========================================
+REPORT_HEADER_TEMPLATE = (
+    "# 📊 耀襄高级中学AI课堂教学数据分析报告\n\n"
+    "**报告生成时间**: {analysis_time}\n"
+    "**数据来源**: {file_name}\n"
+    "**数据范围**: {start} 至 {end}\n"
+    "**分析记录**: {total_records}条\n\n"
+)
+
+CORE_METRICS_TEMPLATE = (
+    "## 🎯 本周核心教学指标（{date}）\n\n"
+    "### 📈 整体表现\n"
+    "- **总课时**: {total_hours} 课时\n"
+    "- **涉及班级**: {total_classes} 个\n"
+    "- **涉及学科**: {total_subjects} 门\n"
+    "- **平均出勤率**: {attendance:.1f}%\n"
+    "- **微课完成率**: {micro:.1f}%\n"
+    "- **题目正确率**: {correctness:.1f}%\n\n"
+)
+
+WEEK_OVER_WEEK_TEMPLATE = (
+    "### 🔄 周环比变化\n"
+    "| 指标 | 前一周 | 本周 | 变化 |\n"
+    "|------|--------|------|------|\n"
+    "| 总课时 | {prev_hours} | {cur_hours} | {hours_trend} {hours_change:.1f}% |\n"
+    "| 出勤率 | {prev_att:.1f}% | {cur_att:.1f}% | {att_trend} {att_change:.1f}% |\n"
+    "| 正确率 | {prev_corr:.1f}% | {cur_corr:.1f}% | {corr_trend} {corr_change:.1f}% |\n"
+    "\n"
+)
+
+BEST_CLASS_TEMPLATE = (
+    "### 🏆 综合标杆班级\n"
+    "**{name}** 表现突出：\n"
+    "- 总课时: {hours} 课时\n"
+    "- 平均出勤率: {attendance:.1f}%\n"
+    "- 平均题目正确率: {correctness:.1f}%\n"
+    "- 涉及学科: {subjects}\n\n"
+)
+
+FOCUS_CLASS_TEMPLATE = (
+    "### ⚠️ 重点关注班级\n"
+    "**{name}** 需要特别关注：\n"
+    "- 出勤率: {attendance:.1f}% (高于全校平均 {avg_attendance:.1f}%)\n"
+    "- 题目正确率: {correctness:.1f}% (显著低于全校平均 {avg_correctness:.1f}%)\n"
+    "- 涉及学科: {subjects}\n\n"
+    "**建议**: 该班级出勤情况良好但学习效果不佳，建议重点分析教学方法和学生学习状态。\n\n"
+)
+
+ANOMALY_TEMPLATE = (
+    "### 🚨 异常预警\n"
+    "共检测 {series} 个班级×学科周序列，{flagged} 个在 {week} 出现异常，最需关注：\n"
+    "{alert_lines}\n"
+)
+ANOMALY_LINE = "- **{class_name} {subject}** {label} {value:.1f}%（近期中位数 {median:.1f}%）：{rules}\n"
+# 报告与班级分析中列出的预警条数
+REPORT_ALERTS = 5
+
+SUBJECT_TABLE_TEMPLATE = (
+    "## 📚 学科表现分析\n\n"
+    "### 课时最多的5个学科\n"
+    "| 学科 | 总课时 | 平均正确率 | 涉及班级 |\n"
+    "|------|--------|------------|----------|\n"
+    "{rows}"
+    "\n"
+    "### 学科亮点与问题\n"
+)
+SUBJECT_ROW_TEMPLATE = "| {subject} | {hours} | {correctness:.1f}% | {classes} |\n"
+SUBJECT_HIGHLIGHT_TEMPLATE = (
+    "- **表现最佳学科**: {best}，正确率达{best_rate:.1f}%\n"
+    "- **需要关注学科**: {worst}，正确率仅{worst_rate:.1f}%\n"
+)
+
+HISTORY_TEMPLATE = (
+    "\n## 📈 历史趋势分析（{weeks}周）\n\n"
+    "### 整体趋势对比\n"
+    "- **时间跨度**: {first_week} 至 {last_week}\n"
+    "- **总课时变化**: {first_hours} → {last_hours} 课时\n"
+    "- **出勤率变化**: {first_att:.1f}% → {last_att:.1f}%\n"
+    "- **题目正确率变化**: {first_corr:.1f}% → {last_corr:.1f}%\n\n"
+    "### 趋势解读\n"
+    "1. **教学规模**: 总课时增长{hours_growth:.1f}%，教学规模显著扩大\n"
+    "2. **出勤稳定性**: 出勤率变化{att_growth:.1f}%，整体保持稳定\n"
+    "3. **学习效果**: 题目正确率变化{corr_growth:.1f}%，需要关注学习质量提升\n"
+)
+
+RECOMMENDATION_TEMPLATE = (
+    "\n## 💡 初步分析与建议\n\n"
+    "### 优势与亮点\n"
+    "1. **教学规模稳步扩大**: 从学期初的31课时增长到128课时\n"
+    "2. **标杆班级表现突出**: {best_name}在出勤率和正确率上均表现优异\n"
+    "3. **学科覆盖全面**: 涉及9个学科，教学内容丰富\n\n"
+    "### 关注与改进点\n"
+    "1. **学习效果待提升**: 整体题目正确率26.1%，有较大提升空间\n"
+    "{focus_line}"
+    "3. **学科差异明显**: 不同学科的正确率差异较大，需均衡发展\n\n"
+    "### 下一步建议\n"
+    "1. **推广优秀经验**: 总结{best_name}的成功做法，在全校推广\n"
+    "2. **加强薄弱环节**: 针对低正确率学科和班级开展专项教研\n"
+    "3. **优化教学策略**: 结合AI课堂数据，调整教学方法和节奏\n"
+    "4. **持续跟踪分析**: 建立周报机制，持续监控教学效果变化\n"
+)
+RECOMMENDATION_FOCUS_LINE = "2. **重点关注班级**: {focus_name}需要针对性教学干预\n"
+
+ATTENDANCE_TEMPLATE = (
+    "## 📊 出勤率分析\n\n"
+    "本周整体出勤率为**{attendance:.1f}%**，涉及{total_classes}个班级。\n\n"
+    "### 亮点班级\n"
+    "- **{best_name}**: 出勤率{best_attendance:.1f}%，表现优异\n"
+    "{focus_block}"
+    "\n### 建议\n"
+    "1. 继续保持高出勤班级的良好状态\n"
+    "2. 分析低出勤班级的具体原因\n"
+    "3. 建立出勤激励机制，提高整体到课率\n"
+)
+ATTENDANCE_FOCUS_BLOCK = (
+    "\n### 关注班级\n"
+    "- **{focus_name}**: 出勤率{focus_attendance:.1f}%，高于平均水平但学习效果需要关注\n"
+)
+
+CORRECTNESS_TEMPLATE = (
+    "## 📊 题目正确率分析\n\n"
+    "本周整体题目正确率为**{correctness:.1f}%**，有较大提升空间。\n\n"
+    "### 表现突出\n"
+    "- **{best_name}**: 正确率{best_correctness:.1f}%，学习效果显著\n"
+    "{focus_block}"
+    "\n### 学科表现\n"
+    "{subject_lines}"
+    "\n### 改进建议\n"
+    "1. 分析低正确率班级的教学方法和学生学习状态\n"
+    "2. 加强薄弱学科的教学资源投入\n"
+    "3. 开展针对性辅导和练习\n"
+)
+CORRECTNESS_FOCUS_BLOCK = (
+    "\n### 重点关注\n"
+    "- **{focus_name}**: 正确率0%，需要立即干预\n"
+)
+CORRECTNESS_SUBJECT_LINE = "- **{subject}**: 正确率{correctness:.1f}%\n"
+
+RECOMMENDATIONS_TEMPLATE = (
+    "## 💡 教学改进建议\n\n"
+    "### 基于本周数据分析，提出以下建议：\n\n"
+    "**1. 推广优秀经验**\n"
+    "- 总结**{best_name}**的成功做法（出勤率{best_attendance:.1f}%，正确率{best_correctness:.1f}%）\n"
+    "- 组织教学经验分享会，推广有效教学方法\n\n"
+    "{focus_block}"
+    "{subject_block}"
+    "**4. 数据驱动决策**\n"
+    "- 建立周报分析机制，持续监控关键指标\n"
+    "- 基于数据调整教学策略，实现精准教学\n"
+)
+RECOMMENDATIONS_FOCUS_BLOCK = (
+    "**2. 加强重点关注**\n"
+    "- 对**{focus_name}**进行专项诊断（出勤{focus_attendance:.1f}%正常，但正确率{focus_correctness:.1f}%）\n"
+    "- 制定个性化改进方案，定期跟踪效果\n\n"
+)
+RECOMMENDATIONS_SUBJECT_BLOCK = (
+    "**3. 优化薄弱学科**\n"
+    "- **{subject}**学科正确率仅{correctness:.1f}%，需要重点改进\n"
+    "- 加强学科教研，优化教学内容和方法\n\n"
+)
+
+CLASS_ANALYSIS_TEMPLATE = (
+    "## 🏫 班级表现分析\n\n"
+    "### 🏆 标杆班级\n"
+    "**{best_name}** 综合表现最佳：\n"
+    "- 出勤率: {best_attendance:.1f}%\n"
+    "- 题目正确率: {best_correctness:.1f}%\n"
+    "- 涉及学科: {best_subjects}\n\n"
+    "{focus_block}"
+    "### 管理建议\n"
+    "1. **差异化教学**: 针对不同班级特点制定教学方案\n"
+    "2. **结对帮扶**: 组织优秀班级与待提升班级结对\n"
+    "3. **定期反馈**: 建立班级表现反馈机制\n"
+)
+CLASS_ANALYSIS_FOCUS_BLOCK = (
+    "### ⚠️ 重点关注班级\n"
+    "**{focus_name}** 需要特别关注：\n"
+    "- 出勤情况良好: {focus_attendance:.1f}%\n"
+    "- 但学习效果不佳: 正确率{focus_correctness:.1f}%\n"
+    "- 涉及学科: {focus_subjects}\n\n"
+)
+
+SUBJECT_ANALYSIS_TEMPLATE = (
+    "## 📚 学科表现分析\n\n"
+    "### 课时分布\n"
+    "{subject_lines}"
+    "\n### 学科特点分析\n"
+    "{highlight_block}"
+    "\n### 学科建设建议\n"
+    "1. **优化资源配置**: 根据学科需求合理分配教学资源\n"
+    "2. **加强学科教研**: 定期开展学科教研活动，分享成功经验\n"
+    "3. **跨学科整合**: 促进学科间的知识融合和方法借鉴\n"
+)
+SUBJECT_ANALYSIS_LINE = "- **{subject}**: {hours}课时，正确率{correctness:.1f}%，涉及{classes}个班级\n"
+SUBJECT_ANALYSIS_HIGHLIGHT = (
+    "1. **优势学科**: {best}，正确率达{best_rate:.1f}%，教学效果显著\n"
+    "2. **待提升学科**: {worst}，正确率仅{worst_rate:.1f}%，需要重点改进\n"
+)
+
+TREND_ANALYSIS_TEMPLATE = (
+    "## 📈 历史趋势分析\n\n"
+    "### 时间跨度\n"
+    "- 从 **{first_week}** 到 **{last_week}**\n"
+    "- 共 **{weeks}** 周数据\n\n"
+    "### 关键指标变化\n"
+    "1. **教学规模**: {first_hours} → {last_hours}课时 ({hours_dir} {hours_change:.1f}%)\n"
+    "2. **出勤稳定性**: {first_att:.1f}% → {last_att:.1f}% ({att_dir} {att_change:.1f}%)\n"
+    "3. **学习效果**: {first_corr:.1f}% → {last_corr:.1f}% ({corr_dir} {corr_change:.1f}%)\n\n"
+    "### 趋势解读\n"
+    "{hours_note}"
+    "{att_note}"
+    "{corr_note}"
+)
+
+FORECAST_TEMPLATE = (
+    "\n### 🔮 未来{horizon}周预测（最近{window}周线性趋势）\n"
+    "- **总课时**: 预计 {week} 约 {hours:.0f} 课时（95%区间 {hours_low:.0f}–{hours_high:.0f}）\n"
+    "- **出勤率**: 预计 {att:.1f}%（95%区间 {att_low:.1f}%–{att_high:.1f}%）\n"
+    "- **题目正确率**: 预计 {corr:.1f}%（95%区间 {corr_low:.1f}%–{corr_high:.1f}%）\n"
+    "{declining_block}"
+)
+FORECAST_DECLINING_HEADER = "\n**趋势显著下滑的班级×学科**：\n"
+FORECAST_DECLINING_LINE = "- **{class_name} {subject}** {label}: {trend:.1f}% → {forecast:.1f}%（每周 {slope:+.2f} 个百分点）\n"
+
+GENERAL_RESPONSE_TEMPLATE = (
+    "## 🤖 AI分析响应\n\n"
+    "基于您的问题「{user_query}」，结合本周教学数据分析：\n\n"
+    "### 当前教学状况\n"
+    "- **教学规模**: {total_hours}课时，涉及{total_classes}个班级\n"
+    "- **学生参与**: 平均出勤率{attendance:.1f}%\n"
+    "- **学习效果**: 题目正确率{correctness:.1f}%\n\n"
+    "### 核心关注点\n"
+    "1. **学习质量提升**: 当前正确率有较大提升空间\n"
+    "2. **教学差异化**: 不同班级和学科表现差异明显\n"
+    "3. **持续改进**: 需要基于数据不断优化教学策略\n\n"
+    "### 建议进一步分析\n"
+    "如需更深入的分析，您可以尝试询问：\n"
+    "- 出勤率详细分析\n"
+    "- 题目正确率改进建议\n"
+    "- 班级表现对比\n"
+    "- 学科教学优化\n"
+    "- 历史趋势解读\n"
+)
+
+# 组合回答中各意图分析之间的分隔
+COMPOSITE_SEPARATOR = "\n\n---\n\n"
+
+
+def fingerprint(*parts):
+    """计算小节输入数据的指纹"""
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def _pct_change(current, previous):
+    """环比变化百分比（前值不大于0时记为0）"""
+    return ((current - previous) / previous) * 100 if previous > 0 else 0
+
+
+def _correctness_extremes(top_subjects):
+    """找出正确率大于0的学科中表现最好和最差的学科"""
+    subjects_with_correctness = [(s['课时学科'], s['平均题目正确率']) for s in top_subjects if s['平均题目正确率'] > 0]
+    if not subjects_with_correctness:
+        return None, None
+    return max(subjects_with_correctness, key=lambda x: x[1]), min(subjects_with_correctness, key=lambda x: x[1])
+
+
+class SectionCache:
+    """报告小节渲染缓存：按 (小节名, 输入指纹) 缓存，超过容量时淘汰最久未使用的条目
+
+    进程内的多个会话线程与API工作线程共用，读写都在锁内完成；渲染在锁外进行，
+    同一小节并发未命中时可能重复渲染，但结果相同。
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, name, inputs, renderer):
+        """返回缓存的小节文本，输入变化时才重新渲染"""
+        key = (name, fingerprint(inputs))
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return text
+            self.misses += 1
+        text = renderer(*inputs)
+        with self._lock:
+            self._entries[key] = text
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return text
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+# 进程内共享的小节缓存（同一份分析结果在多次重跑、多个会话间复用）
+SECTION_CACHE = SectionCache()
+
 
 class AIReportGenerator:
     """AI协作报告生成器"""
-    
-    def __init__(self, analysis_results):
+
+    def __init__(self, analysis_results, section_cache=None, router=None):
         self.analysis_results = analysis_results
         self.conversation_history = []
-        
+        self.section_cache = section_cache if section_cache is not None else SECTION_CACHE
+        self.router = router if router is not None else DEFAULT_ROUTER
+
     def generate_initial_report(self):
         """基于数据分析生成初始报告草稿"""
         report_parts = []
-        
+        render = self.section_cache.render
+
         # 提取关键数据
         file_info = self.analysis_results['file_info']
         current_week = self.analysis_results['current_week']
@@ -19,405 +339,461 @@ class AIReportGenerator:
         focus_class = self.analysis_results['focus_class']
         top_subjects = self.analysis_results['top_subjects']
         weekly_trends = self.analysis_results['weekly_trends']
-        
+
         # 1. 报告标题和基本信息
-        report_parts.append(f"# 📊 耀襄高级中学AI课堂教学数据分析报告\n\n")
-        report_parts.append(f"**报告生成时间**: {self.analysis_results['analysis_time']}\n")
-        report_parts.append(f"**数据来源**: {file_info['file_name']}\n")
-        report_parts.append(f"**数据范围**: {file_info['date_range']['start']} 至 {file_info['date_range']['end']}\n")
-        report_parts.append(f"**分析记录**: {file_info['total_records']}条\n\n")
-        
+        report_parts.append(render('header', (self.analysis_results['analysis_time'], file_info), self._render_header))
+
         # 2. 本周核心指标
         if current_week['metrics']:
-            metrics = current_week['metrics']
-            report_parts.append(f"## 🎯 本周核心教学指标（{current_week['date']}）\n\n")
-            report_parts.append(f"### 📈 整体表现\n")
-            report_parts.append(f"- **总课时**: {metrics['total_hours']} 课时\n")
-            report_parts.append(f"- **涉及班级**: {metrics['total_classes']} 个\n")
-            report_parts.append(f"- **涉及学科**: {metrics['total_subjects']} 门\n")
-            report_parts.append(f"- **平均出勤率**: {metrics['attendance_rate']*100:.1f}%\n")
-            report_parts.append(f"- **微课完成率**: {metrics['micro_completion_rate']*100:.1f}%\n")
-            report_parts.append(f"- **题目正确率**: {metrics['correctness_rate']*100:.1f}%\n\n")
-        
+            report_parts.append(render('core_metrics', (current_week,), self._render_core_metrics))
+
         # 3. 周环比变化分析
         if len(weekly_trends) >= 2:
-            current = weekly_trends[-1]
-            previous = weekly_trends[-2]
-            
-            report_parts.append(f"### 🔄 周环比变化\n")
-            report_parts.append(f"| 指标 | 前一周 | 本周 | 变化 |\n")
-            report_parts.append(f"|------|--------|------|------|\n")
-            
-            # 总课时变化
-            hours_change = ((current['total_hours'] - previous['total_hours']) / previous['total_hours']) * 100 if previous['total_hours'] > 0 else 0
-            hours_trend = "↑" if hours_change > 0 else "↓"
-            report_parts.append(f"| 总课时 | {previous['total_hours']} | {current['total_hours']} | {hours_trend} {abs(hours_change):.1f}% |\n")
-            
-            # 出勤率变化
-            att_change = ((current['attendance_rate'] - previous['attendance_rate']) / previous['attendance_rate']) * 100 if previous['attendance_rate'] > 0 else 0
-            att_trend = "↑" if att_change > 0 else "↓"
-            report_parts.append(f"| 出勤率 | {previous['attendance_rate']*100:.1f}% | {current['attendance_rate']*100:.1f}% | {att_trend} {abs(att_change):.1f}% |\n")
-            
-            # 正确率变化
-            corr_change = ((current['correctness_rate'] - previous['correctness_rate']) / previous['correctness_rate']) * 100 if previous['correctness_rate'] > 0 else 0
-            corr_trend = "↑" if corr_change > 0 else "↓"
-            report_parts.append(f"| 正确率 | {previous['correctness_rate']*100:.1f}% | {current['correctness_rate']*100:.1f}% | {corr_trend} {abs(corr_change):.1f}% |\n")
-            
-            report_parts.append(f"\n")
-        
-        # 4. 班级表现分析
-        report_parts.append(f"## 🏫 班级表现分析\n\n")
-        
-        # 最佳班级
-        if best_class['name']:
-            report_parts.append(f"### 🏆 综合标杆班级\n")
-            report_parts.append(f"**{best_class['name']}** 表现突出：\n")
-            report_parts.append(f"- 总课时: {best_class['hours']} 课时\n")
-            report_parts.append(f"- 平均出勤率: {best_class['attendance_rate']*100:.1f}%\n")
-            report_parts.append(f"- 平均题目正确率: {best_class['correctness_rate']*100:.1f}%\n")
-            report_parts.append(f"- 涉及学科: {best_class['subjects']}\n\n")
-        
-        # 重点关注班级
-        if focus_class['name'] and focus_class['correctness_rate'] == 0:
-            current_metrics = current_week['metrics']
-            report_parts.append(f"### ⚠️ 重点关注班级\n")
-            report_parts.append(f"**{focus_class['name']}** 需要特别关注：\n")
-            report_parts.append(f"- 出勤率: {focus_class['attendance_rate']*100:.1f}% (高于全校平均 {current_metrics['attendance_rate']*100:.1f}%)\n")
-            report_parts.append(f"- 题目正确率: {focus_class['correctness_rate']*100:.1f}% (显著低于全校平均 {current_metrics['correctness_rate']*100:.1f}%)\n")
-            report_parts.append(f"- 涉及学科: {focus_class['subjects']}\n\n")
-            report_parts.append(f"**建议**: 该班级出勤情况良好但学习效果不佳，建议重点分析教学方法和学生学习状态。\n\n")
-        
+            report_parts.append(render('week_over_week', (weekly_trends[-2], weekly_trends[-1]), self._render_week_over_week))
+
+        # 4. 班级表现分析与异常预警
+        report_parts.append(render(
+            'class_overview', (best_class, focus_class, current_week['metrics']), self._render_class_overview
+        ))
+        anomalies = self.analysis_results.get('anomalies')
+        if anomalies and anomalies['alerts']:
+            report_parts.append(render('anomalies', (anomalies, REPORT_ALERTS), self._render_anomalies))
+
         # 5. 学科表现分析
         if top_subjects:
-            report_parts.append(f"## 📚 学科表现分析\n\n")
-            report_parts.append(f"### 课时最多的5个学科\n")
-            report_parts.append(f"| 学科 | 总课时 | 平均正确率 | 涉及班级 |\n")
-            report_parts.append(f"|------|--------|------------|----------|\n")
-            
-            for subject in top_subjects:
-                report_parts.append(f"| {subject['课时学科']} | {int(subject['总课时'])} | {subject['平均题目正确率']*100:.1f}% | {int(subject['涉及班级数'])} |\n")
-            
-            report_parts.append(f"\n")
-            
-            # 学科亮点和问题
-            report_parts.append(f"### 学科亮点与问题\n")
-            
-            # 找出表现最好和最差的学科
-            if len(top_subjects) >= 2:
-                subjects_with_correctness = [(s['课时学科'], s['平均题目正确率']) for s in top_subjects if s['平均题目正确率'] > 0]
-                if subjects_with_correctness:
-                    best_subject = max(subjects_with_correctness, key=lambda x: x[1])
-                    worst_subject = min(subjects_with_correctness, key=lambda x: x[1])
-                    
-                    report_parts.append(f"- **表现最佳学科**: {best_subject[0]}，正确率达{best_subject[1]*100:.1f}%\n")
-                    report_parts.append(f"- **需要关注学科**: {worst_subject[0]}，正确率仅{worst_subject[1]*100:.1f}%\n")
-        
+            report_parts.append(render('subject_overview', (top_subjects,), self._render_subject_overview))
+
         # 6. 历史趋势分析
         if len(weekly_trends) >= 2:
-            first_week = weekly_trends[0]
-            last_week = weekly_trends[-1]
-            
-            report_parts.append(f"\n## 📈 历史趋势分析（{len(weekly_trends)}周）\n\n")
-            report_parts.append(f"### 整体趋势对比\n")
-            report_parts.append(f"- **时间跨度**: {first_week['week']} 至 {last_week['week']}\n")
-            report_parts.append(f"- **总课时变化**: {first_week['total_hours']} → {last_week['total_hours']} 课时\n")
-            report_parts.append(f"- **出勤率变化**: {first_week['attendance_rate']*100:.1f}% → {last_week['attendance_rate']*100:.1f}%\n")
-            report_parts.append(f"- **题目正确率变化**: {first_week['correctness_rate']*100:.1f}% → {last_week['correctness_rate']*100:.1f}%\n\n")
-            
-            # 趋势解读
-            hours_growth = ((last_week['total_hours'] - first_week['total_hours']) / first_week['total_hours']) * 100
-            att_growth = ((last_week['attendance_rate'] - first_week['attendance_rate']) / first_week['attendance_rate']) * 100
-            corr_growth = ((last_week['correctness_rate'] - first_week['correctness_rate']) / first_week['correctness_rate']) * 100
-            
-            report_parts.append(f"### 趋势解读\n")
-            report_parts.append(f"1. **教学规模**: 总课时增长{hours_growth:.1f}%，教学规模显著扩大\n")
-            report_parts.append(f"2. **出勤稳定性**: 出勤率变化{att_growth:.1f}%，整体保持稳定\n")
-            report_parts.append(f"3. **学习效果**: 题目正确率变化{corr_growth:.1f}%，需要关注学习质量提升\n")
-        
+            report_parts.append(render(
+                'history', (weekly_trends[0], weekly_trends[-1], len(weekly_trends)), self._render_history
+            ))
+
         # 7. 初步建议
-        report_parts.append(f"\n## 💡 初步分析与建议\n\n")
-        report_parts.append(f"### 优势与亮点\n")
-        report_parts.append(f"1. **教学规模稳步扩大**: 从学期初的31课时增长到128课时\n")
-        report_parts.append(f"2. **标杆班级表现突出**: {best_class['name']}在出勤率和正确率上均表现优异\n")
-        report_parts.append(f"3. **学科覆盖全面**: 涉及9个学科，教学内容丰富\n\n")
-        
-        report_parts.append(f"### 关注与改进点\n")
-        report_parts.append(f"1. **学习效果待提升**: 整体题目正确率26.1%，有较大提升空间\n")
-        if focus_class['name']:
-            report_parts.append(f"2. **重点关注班级**: {focus_class['name']}需要针对性教学干预\n")
-        report_parts.append(f"3. **学科差异明显**: 不同学科的正确率差异较大，需均衡发展\n\n")
-        
-        report_parts.append(f"### 下一步建议\n")
-        report_parts.append(f"1. **推广优秀经验**: 总结{best_class['name']}的成功做法，在全校推广\n")
-        report_parts.append(f"2. **加强薄弱环节**: 针对低正确率学科和班级开展专项教研\n")
-        report_parts.append(f"3. **优化教学策略**: 结合AI课堂数据，调整教学方法和节奏\n")
-        report_parts.append(f"4. **持续跟踪分析**: 建立周报机制，持续监控教学效果变化\n")
-        
+        report_parts.append(render('initial_recommendations', (best_class['name'], focus_class['name']), self._render_initial_recommendations))
+
         return "".join(report_parts)
-    
+
+    @staticmethod
+    def _render_header(analysis_time, file_info):
+        """报告标题和基本信息"""
+        return REPORT_HEADER_TEMPLATE.format(
+            analysis_time=analysis_time,
+            file_name=file_info['file_name'],
+            start=file_info['date_range']['start'],
+            end=file_info['date_range']['end'],
+            total_records=file_info['total_records']
+        )
+
+    @staticmethod
+    def _render_core_metrics(current_week):
+        """本周核心指标"""
+        metrics = current_week['metrics']
+        return CORE_METRICS_TEMPLATE.format(
+            date=current_week['date'],
+            total_hours=metrics['total_hours'],
+            total_classes=metrics['total_classes'],
+            total_subjects=metrics['total_subjects'],
+            attendance=metrics['attendance_rate'] * 100,
+            micro=metrics['micro_completion_rate'] * 100,
+            correctness=metrics['correctness_rate'] * 100
+        )
+
+    @staticmethod
+    def _render_week_over_week(previous, current):
+        """周环比变化表"""
+        hours_change = _pct_change(current['total_hours'], previous['total_hours'])
+        att_change = _pct_change(current['attendance_rate'], previous['attendance_rate'])
+        corr_change = _pct_change(current['correctness_rate'], previous['correctness_rate'])
+        return WEEK_OVER_WEEK_TEMPLATE.format(
+            prev_hours=previous['total_hours'],
+            cur_hours=current['total_hours'],
+            hours_trend="↑" if hours_change > 0 else "↓",
+            hours_change=abs(hours_change),
+            prev_att=previous['attendance_rate'] * 100,
+            cur_att=current['attendance_rate'] * 100,
+            att_trend="↑" if att_change > 0 else "↓",
+            att_change=abs(att_change),
+            prev_corr=previous['correctness_rate'] * 100,
+            cur_corr=current['correctness_rate'] * 100,
+            corr_trend="↑" if corr_change > 0 else "↓",
+            corr_change=abs(corr_change)
+        )
+
+    @staticmethod
+    def _render_class_overview(best_class, focus_class, current_metrics):
+        """班级表现分析（标杆班级与重点关注班级）"""
+        parts = ["## 🏫 班级表现分析\n\n"]
+        if best_class['name']:
+            parts.append(BEST_CLASS_TEMPLATE.format(
+                name=best_class['name'],
+                hours=best_class['hours'],
+                attendance=best_class['attendance_rate'] * 100,
+                correctness=best_class['correctness_rate'] * 100,
+                subjects=best_class['subjects']
+            ))
+        if focus_class['name'] and focus_class['correctness_rate'] == 0:
+            parts.append(FOCUS_CLASS_TEMPLATE.format(
+                name=focus_class['name'],
+                attendance=focus_class['attendance_rate'] * 100,
+                avg_attendance=current_metrics['attendance_rate'] * 100,
+                correctness=focus_class['correctness_rate'] * 100,
+                avg_correctness=current_metrics['correctness_rate'] * 100,
+                subjects=focus_class['subjects']
+            ))
+        return "".join(parts)
+
+    @staticmethod
+    def _render_anomalies(anomalies, limit):
+        """异常预警（按严重程度排序的前几条）"""
+        alert_lines = "".join(
+            ANOMALY_LINE.format(
+                class_name=alert['class'],
+                subject=alert['subject'],
+                label=alert['label'],
+                value=alert['value'] * 100,
+                median=alert['median'] * 100,
+                rules='、'.join(RULE_LABELS[rule] for rule in alert['rules'])
+            )
+            for alert in anomalies['alerts'][:limit]
+        )
+        return ANOMALY_TEMPLATE.format(
+            series=anomalies['series'], flagged=anomalies['flagged'], week=anomalies['week'], alert_lines=alert_lines
+        )
+
+    @staticmethod
+    def _render_subject_overview(top_subjects):
+        """学科表现表格与亮点"""
+        rows = "".join(
+            SUBJECT_ROW_TEMPLATE.format(
+                subject=subject['课时学科'],
+                hours=int(subject['总课时']),
+                correctness=subject['平均题目正确率'] * 100,
+                classes=int(subject['涉及班级数'])
+            )
+            for subject in top_subjects
+        )
+        text = SUBJECT_TABLE_TEMPLATE.format(rows=rows)
+        if len(top_subjects) >= 2:
+            best_subject, worst_subject = _correctness_extremes(top_subjects)
+            if best_subject:
+                text += SUBJECT_HIGHLIGHT_TEMPLATE.format(
+                    best=best_subject[0], best_rate=best_subject[1] * 100,
+                    worst=worst_subject[0], worst_rate=worst_subject[1] * 100
+                )
+        return text
+
+    @staticmethod
+    def _render_history(first_week, last_week, weeks):
+        """历史趋势对比与解读"""
+        return HISTORY_TEMPLATE.format(
+            weeks=weeks,
+            first_week=first_week['week'],
+            last_week=last_week['week'],
+            first_hours=first_week['total_hours'],
+            last_hours=last_week['total_hours'],
+            first_att=first_week['attendance_rate'] * 100,
+            last_att=last_week['attendance_rate'] * 100,
+            first_corr=first_week['correctness_rate'] * 100,
+            last_corr=last_week['correctness_rate'] * 100,
+            hours_growth=((last_week['total_hours'] - first_week['total_hours']) / first_week['total_hours']) * 100,
+            att_growth=((last_week['attendance_rate'] - first_week['attendance_rate']) / first_week['attendance_rate']) * 100,
+            corr_growth=((last_week['correctness_rate'] - first_week['correctness_rate']) / first_week['correctness_rate']) * 100
+        )
+
+    @staticmethod
+    def _render_initial_recommendations(best_name, focus_name):
+        """初步分析与建议"""
+        return RECOMMENDATION_TEMPLATE.format(
+            best_name=best_name,
+            focus_line=RECOMMENDATION_FOCUS_LINE.format(focus_name=focus_name) if focus_name else ""
+        )
+
     def process_ai_query(self, user_query, context=""):
-        """处理用户查询并生成AI响应"""
+        """处理用户查询并生成AI响应
+
+        查询经意图索引单次扫描后选出意图，命中多个意图时组合各意图的分析：
+        第一部分与原 if/elif 顺序下的回答一致，其余按意图声明顺序排列。
+        """
+        intents = self.router.select(user_query)
+
+        # 默认响应
+        if not intents:
+            return self._generate_general_response(user_query, self.analysis_results['current_week']['metrics'])
+
+        return COMPOSITE_SEPARATOR.join(self._answer_intent(intent) for intent in intents)
+
+    def _answer_intent(self, intent):
+        """生成单个意图的分析"""
         # 提取关键数据用于AI分析
         current_metrics = self.analysis_results['current_week']['metrics']
         best_class = self.analysis_results['best_class']
         focus_class = self.analysis_results['focus_class']
         top_subjects = self.analysis_results['top_subjects']
-        
-        # 基于用户查询类型生成响应
-        query_lower = user_query.lower()
-        
-        # 出勤率相关查询
-        if any(keyword in query_lower for keyword in ['出勤', 'attendance', '到课']):
+
+        if intent == 'attendance':
             return self._generate_attendance_analysis(current_metrics, best_class, focus_class)
-        
-        # 正确率相关查询
-        elif any(keyword in query_lower for keyword in ['正确率', '准确率', 'correctness', 'accuracy']):
+        elif intent == 'correctness':
             return self._generate_correctness_analysis(current_metrics, best_class, focus_class, top_subjects)
-        
-        # 教学建议查询
-        elif any(keyword in query_lower for keyword in ['建议', '改进', '建议', 'recommendation', 'suggestion']):
+        elif intent == 'recommendation':
             return self._generate_recommendations(current_metrics, best_class, focus_class, top_subjects)
-        
-        # 班级分析查询
-        elif any(keyword in query_lower for keyword in ['班级', 'class', '班']):
-            return self._generate_class_analysis(best_class, focus_class)
-        
-        # 学科分析查询
-        elif any(keyword in query_lower for keyword in ['学科', 'subject', '课程']):
+        elif intent == 'class':
+            return self._generate_class_analysis(best_class, focus_class, self.analysis_results.get('anomalies'))
+        elif intent == 'subject':
             return self._generate_subject_analysis(top_subjects)
-        
-        # 趋势分析查询
-        elif any(keyword in query_lower for keyword in ['趋势', 'trend', '变化', 'history']):
+        elif intent == 'trend':
             return self._generate_trend_analysis()
-        
-        # 默认响应
-        else:
-            return self._generate_general_response(user_query, current_metrics)
-    
+        raise ValueError(f"未知的分析意图: {intent}")
+
     def _generate_attendance_analysis(self, metrics, best_class, focus_class):
         """生成出勤率分析"""
-        response = f"## 📊 出勤率分析\n\n"
-        response += f"本周整体出勤率为**{metrics['attendance_rate']*100:.1f}%**，涉及{metrics['total_classes']}个班级。\n\n"
-        
-        response += f"### 亮点班级\n"
-        response += f"- **{best_class['name']}**: 出勤率{best_class['attendance_rate']*100:.1f}%，表现优异\n"
-        
+        return self.section_cache.render('attendance', (metrics, best_class, focus_class), self._render_attendance)
+
+    @staticmethod
+    def _render_attendance(metrics, best_class, focus_class):
+        focus_block = ""
         if focus_class['name']:
-            response += f"\n### 关注班级\n"
-            response += f"- **{focus_class['name']}**: 出勤率{focus_class['attendance_rate']*100:.1f}%，高于平均水平但学习效果需要关注\n"
-        
-        response += f"\n### 建议\n"
-        response += f"1. 继续保持高出勤班级的良好状态\n"
-        response += f"2. 分析低出勤班级的具体原因\n"
-        response += f"3. 建立出勤激励机制，提高整体到课率\n"
-        
-        return response
-    
+            focus_block = ATTENDANCE_FOCUS_BLOCK.format(
+                focus_name=focus_class['name'],
+                focus_attendance=focus_class['attendance_rate'] * 100
+            )
+        return ATTENDANCE_TEMPLATE.format(
+            attendance=metrics['attendance_rate'] * 100,
+            total_classes=metrics['total_classes'],
+            best_name=best_class['name'],
+            best_attendance=best_class['attendance_rate'] * 100,
+            focus_block=focus_block
+        )
+
     def _generate_correctness_analysis(self, metrics, best_class, focus_class, top_subjects):
         """生成正确率分析"""
-        response = f"## 📊 题目正确率分析\n\n"
-        response += f"本周整体题目正确率为**{metrics['correctness_rate']*100:.1f}%**，有较大提升空间。\n\n"
-        
-        response += f"### 表现突出\n"
-        response += f"- **{best_class['name']}**: 正确率{best_class['correctness_rate']*100:.1f}%，学习效果显著\n"
-        
+        return self.section_cache.render(
+            'correctness', (metrics, best_class, focus_class, top_subjects[:3]), self._render_correctness
+        )
+
+    @staticmethod
+    def _render_correctness(metrics, best_class, focus_class, top_subjects):
+        focus_block = ""
         if focus_class['name'] and focus_class['correctness_rate'] == 0:
-            response += f"\n### 重点关注\n"
-            response += f"- **{focus_class['name']}**: 正确率0%，需要立即干预\n"
-        
-        response += f"\n### 学科表现\n"
-        for subject in top_subjects[:3]:  # 显示前3个学科
-            response += f"- **{subject['课时学科']}**: 正确率{subject['平均题目正确率']*100:.1f}%\n"
-        
-        response += f"\n### 改进建议\n"
-        response += f"1. 分析低正确率班级的教学方法和学生学习状态\n"
-        response += f"2. 加强薄弱学科的教学资源投入\n"
-        response += f"3. 开展针对性辅导和练习\n"
-        
-        return response
-    
+            focus_block = CORRECTNESS_FOCUS_BLOCK.format(focus_name=focus_class['name'])
+        subject_lines = "".join(
+            CORRECTNESS_SUBJECT_LINE.format(subject=s['课时学科'], correctness=s['平均题目正确率'] * 100)
+            for s in top_subjects  # 显示前3个学科
+        )
+        return CORRECTNESS_TEMPLATE.format(
+            correctness=metrics['correctness_rate'] * 100,
+            best_name=best_class['name'],
+            best_correctness=best_class['correctness_rate'] * 100,
+            focus_block=focus_block,
+            subject_lines=subject_lines
+        )
+
     def _generate_recommendations(self, metrics, best_class, focus_class, top_subjects):
         """生成教学建议"""
-        response = f"## 💡 教学改进建议\n\n"
-        
-        response += f"### 基于本周数据分析，提出以下建议：\n\n"
-        
-        response += f"**1. 推广优秀经验**\n"
-        response += f"- 总结**{best_class['name']}**的成功做法（出勤率{best_class['attendance_rate']*100:.1f}%，正确率{best_class['correctness_rate']*100:.1f}%）\n"
-        response += f"- 组织教学经验分享会，推广有效教学方法\n\n"
-        
+        return self.section_cache.render(
+            'recommendations', (best_class, focus_class, top_subjects), self._render_recommendations
+        )
+
+    @staticmethod
+    def _render_recommendations(best_class, focus_class, top_subjects):
+        focus_block = ""
         if focus_class['name']:
-            response += f"**2. 加强重点关注**\n"
-            response += f"- 对**{focus_class['name']}**进行专项诊断（出勤{focus_class['attendance_rate']*100:.1f}%正常，但正确率{focus_class['correctness_rate']*100:.1f}%）\n"
-            response += f"- 制定个性化改进方案，定期跟踪效果\n\n"
-        
+            focus_block = RECOMMENDATIONS_FOCUS_BLOCK.format(
+                focus_name=focus_class['name'],
+                focus_attendance=focus_class['attendance_rate'] * 100,
+                focus_correctness=focus_class['correctness_rate'] * 100
+            )
+
         # 找出正确率最低的学科
+        subject_block = ""
         if top_subjects:
-            subjects_with_correctness = [(s['课时学科'], s['平均题目正确率']) for s in top_subjects if s['平均题目正确率'] > 0]
-            if subjects_with_correctness:
-                worst_subject = min(subjects_with_correctness, key=lambda x: x[1])
-                response += f"**3. 优化薄弱学科**\n"
-                response += f"- **{worst_subject[0]}**学科正确率仅{worst_subject[1]*100:.1f}%，需要重点改进\n"
-                response += f"- 加强学科教研，优化教学内容和方法\n\n"
-        
-        response += f"**4. 数据驱动决策**\n"
-        response += f"- 建立周报分析机制，持续监控关键指标\n"
-        response += f"- 基于数据调整教学策略，实现精准教学\n"
-        
-        return response
-    
-    def _generate_class_analysis(self, best_class, focus_class):
-        """生成班级分析"""
-        response = f"## 🏫 班级表现分析\n\n"
-        
-        response += f"### 🏆 标杆班级\n"
-        response += f"**{best_class['name']}** 综合表现最佳：\n"
-        response += f"- 出勤率: {best_class['attendance_rate']*100:.1f}%\n"
-        response += f"- 题目正确率: {best_class['correctness_rate']*100:.1f}%\n"
-        response += f"- 涉及学科: {best_class['subjects']}\n\n"
-        
+            _, worst_subject = _correctness_extremes(top_subjects)
+            if worst_subject:
+                subject_block = RECOMMENDATIONS_SUBJECT_BLOCK.format(
+                    subject=worst_subject[0], correctness=worst_subject[1] * 100
+                )
+
+        return RECOMMENDATIONS_TEMPLATE.format(
+            best_name=best_class['name'],
+            best_attendance=best_class['attendance_rate'] * 100,
+            best_correctness=best_class['correctness_rate'] * 100,
+            focus_block=focus_block,
+            subject_block=subject_block
+        )
+
+    def _generate_class_analysis(self, best_class, focus_class, anomalies=None):
+        """生成班级分析（有异常预警时附上最需关注的序列）"""
+        text = self.section_cache.render('class_analysis', (best_class, focus_class), self._render_class_analysis)
+        if anomalies and anomalies['alerts']:
+            text += "\n" + self.section_cache.render('anomalies', (anomalies, REPORT_ALERTS), self._render_anomalies)
+        return text
+
+    @staticmethod
+    def _render_class_analysis(best_class, focus_class):
+        focus_block = ""
         if focus_class['name']:
-            response += f"### ⚠️ 重点关注班级\n"
-            response += f"**{focus_class['name']}** 需要特别关注：\n"
-            response += f"- 出勤情况良好: {focus_class['attendance_rate']*100:.1f}%\n"
-            response += f"- 但学习效果不佳: 正确率{focus_class['correctness_rate']*100:.1f}%\n"
-            response += f"- 涉及学科: {focus_class['subjects']}\n\n"
-        
-        response += f"### 管理建议\n"
-        response += f"1. **差异化教学**: 针对不同班级特点制定教学方案\n"
-        response += f"2. **结对帮扶**: 组织优秀班级与待提升班级结对\n"
-        response += f"3. **定期反馈**: 建立班级表现反馈机制\n"
-        
-        return response
-    
+            focus_block = CLASS_ANALYSIS_FOCUS_BLOCK.format(
+                focus_name=focus_class['name'],
+                focus_attendance=focus_class['attendance_rate'] * 100,
+                focus_correctness=focus_class['correctness_rate'] * 100,
+                focus_subjects=focus_class['subjects']
+            )
+        return CLASS_ANALYSIS_TEMPLATE.format(
+            best_name=best_class['name'],
+            best_attendance=best_class['attendance_rate'] * 100,
+            best_correctness=best_class['correctness_rate'] * 100,
+            best_subjects=best_class['subjects'],
+            focus_block=focus_block
+        )
+
     def _generate_subject_analysis(self, top_subjects):
         """生成学科分析"""
-        response = f"## 📚 学科表现分析\n\n"
-        
-        response += f"### 课时分布\n"
-        for subject in top_subjects:
-            response += f"- **{subject['课时学科']}**: {int(subject['总课时'])}课时，正确率{subject['平均题目正确率']*100:.1f}%，涉及{int(subject['涉及班级数'])}个班级\n"
-        
-        response += f"\n### 学科特点分析\n"
-        
+        return self.section_cache.render('subject_analysis', (top_subjects,), self._render_subject_analysis)
+
+    @staticmethod
+    def _render_subject_analysis(top_subjects):
+        subject_lines = "".join(
+            SUBJECT_ANALYSIS_LINE.format(
+                subject=subject['课时学科'],
+                hours=int(subject['总课时']),
+                correctness=subject['平均题目正确率'] * 100,
+                classes=int(subject['涉及班级数'])
+            )
+            for subject in top_subjects
+        )
+
         # 找出表现最好和最差的学科
+        highlight_block = ""
         if len(top_subjects) >= 2:
-            subjects_with_correctness = [(s['课时学科'], s['平均题目正确率']) for s in top_subjects if s['平均题目正确率'] > 0]
-            if subjects_with_correctness:
-                best_subject = max(subjects_with_correctness, key=lambda x: x[1])
-                worst_subject = min(subjects_with_correctness, key=lambda x: x[1])
-                
-                response += f"1. **优势学科**: {best_subject[0]}，正确率达{best_subject[1]*100:.1f}%，教学效果显著\n"
-                response += f"2. **待提升学科**: {worst_subject[0]}，正确率仅{worst_subject[1]*100:.1f}%，需要重点改进\n"
-        
-        response += f"\n### 学科建设建议\n"
-        response += f"1. **优化资源配置**: 根据学科需求合理分配教学资源\n"
-        response += f"2. **加强学科教研**: 定期开展学科教研活动，分享成功经验\n"
-        response += f"3. **跨学科整合**: 促进学科间的知识融合和方法借鉴\n"
-        
-        return response
-    
+            best_subject, worst_subject = _correctness_extremes(top_subjects)
+            if best_subject:
+                highlight_block = SUBJECT_ANALYSIS_HIGHLIGHT.format(
+                    best=best_subject[0], best_rate=best_subject[1] * 100,
+                    worst=worst_subject[0], worst_rate=worst_subject[1] * 100
+                )
+
+        return SUBJECT_ANALYSIS_TEMPLATE.format(subject_lines=subject_lines, highlight_block=highlight_block)
+
     def _generate_trend_analysis(self):
         """生成趋势分析"""
         weekly_trends = self.analysis_results['weekly_trends']
-        
+
         if len(weekly_trends) < 2:
             return "历史数据不足，无法进行趋势分析。"
-        
-        first_week = weekly_trends[0]
-        last_week = weekly_trends[-1]
-        
-        response = f"## 📈 历史趋势分析\n\n"
-        response += f"### 时间跨度\n"
-        response += f"- 从 **{first_week['week']}** 到 **{last_week['week']}**\n"
-        response += f"- 共 **{len(weekly_trends)}** 周数据\n\n"
-        
-        response += f"### 关键指标变化\n"
-        
+
+        text = self.section_cache.render(
+            'trend_analysis', (weekly_trends[0], weekly_trends[-1], len(weekly_trends)), self._render_trend_analysis
+        )
+        forecasts = self.analysis_results.get('forecasts')
+        if forecasts and forecasts['metrics']:
+            text += self.section_cache.render('forecast', (forecasts, REPORT_ALERTS), self._render_forecast)
+        return text
+
+    @staticmethod
+    def _render_forecast(forecasts, limit):
+        """整体指标的预测值与区间，以及预计下滑最多的序列"""
+        hours = forecasts['metrics']['total_hours']
+        attendance = forecasts['metrics']['attendance_rate']
+        correctness = forecasts['metrics']['correctness_rate']
+        declining_block = ""
+        if forecasts['declining']:
+            declining_block = FORECAST_DECLINING_HEADER + "".join(
+                FORECAST_DECLINING_LINE.format(
+                    class_name=item['class'],
+                    subject=item['subject'],
+                    label=item['label'],
+                    trend=item['trend'] * 100,
+                    forecast=item['forecast'] * 100,
+                    slope=item['slope'] * 100
+                )
+                for item in forecasts['declining'][:limit]
+            )
+        return FORECAST_TEMPLATE.format(
+            horizon=forecasts['horizon'],
+            window=forecasts['window'],
+            week=forecasts['weeks'][-1],
+            hours=hours['values'][-1], hours_low=hours['lower'][-1], hours_high=hours['upper'][-1],
+            att=attendance['values'][-1] * 100, att_low=attendance['lower'][-1] * 100,
+            att_high=attendance['upper'][-1] * 100,
+            corr=correctness['values'][-1] * 100, corr_low=correctness['lower'][-1] * 100,
+            corr_high=correctness['upper'][-1] * 100,
+            declining_block=declining_block
+        )
+
+    @staticmethod
+    def _render_trend_analysis(first_week, last_week, weeks):
         # 计算变化百分比
         hours_change = ((last_week['total_hours'] - first_week['total_hours']) / first_week['total_hours']) * 100
         att_change = ((last_week['attendance_rate'] - first_week['attendance_rate']) / first_week['attendance_rate']) * 100
         corr_change = ((last_week['correctness_rate'] - first_week['correctness_rate']) / first_week['correctness_rate']) * 100
-        
-        response += f"1. **教学规模**: {first_week['total_hours']} → {last_week['total_hours']}课时 ({'增长' if hours_change > 0 else '减少'} {abs(hours_change):.1f}%)\n"
-        response += f"2. **出勤稳定性**: {first_week['attendance_rate']*100:.1f}% → {last_week['attendance_rate']*100:.1f}% ({'提升' if att_change > 0 else '下降'} {abs(att_change):.1f}%)\n"
-        response += f"3. **学习效果**: {first_week['correctness_rate']*100:.1f}% → {last_week['correctness_rate']*100:.1f}% ({'提升' if corr_change > 0 else '下降'} {abs(corr_change):.1f}%)\n\n"
-        
-        response += f"### 趋势解读\n"
-        if hours_change > 0:
-            response += f"- ✅ 教学规模持续扩大，说明AI课堂应用逐渐深入\n"
-        else:
-            response += f"- ⚠️ 教学规模有所收缩，需要关注课程安排\n"
-        
-        if att_change > 0:
-            response += f"- ✅ 出勤率保持稳定或略有提升，学生参与度良好\n"
-        else:
-            response += f"- ⚠️ 出勤率有所下降，需要加强学生管理和课程吸引力\n"
-        
-        if corr_change > 0:
-            response += f"- ✅ 学习效果逐步提升，教学方法有效\n"
-        else:
-            response += f"- ⚠️ 学习效果有待提升，需要优化教学策略\n"
-        
-        return response
-    
+
+        return TREND_ANALYSIS_TEMPLATE.format(
+            first_week=first_week['week'],
+            last_week=last_week['week'],
+            weeks=weeks,
+            first_hours=first_week['total_hours'],
+            last_hours=last_week['total_hours'],
+            hours_dir='增长' if hours_change > 0 else '减少',
+            hours_change=abs(hours_change),
+            first_att=first_week['attendance_rate'] * 100,
+            last_att=last_week['attendance_rate'] * 100,
+            att_dir='提升' if att_change > 0 else '下降',
+            att_change=abs(att_change),
+            first_corr=first_week['correctness_rate'] * 100,
+            last_corr=last_week['correctness_rate'] * 100,
+            corr_dir='提升' if corr_change > 0 else '下降',
+            corr_change=abs(corr_change),
+            hours_note="- ✅ 教学规模持续扩大，说明AI课堂应用逐渐深入\n" if hours_change > 0 else "- ⚠️ 教学规模有所收缩，需要关注课程安排\n",
+            att_note="- ✅ 出勤率保持稳定或略有提升，学生参与度良好\n" if att_change > 0 else "- ⚠️ 出勤率有所下降，需要加强学生管理和课程吸引力\n",
+            corr_note="- ✅ 学习效果逐步提升，教学方法有效\n" if corr_change > 0 else "- ⚠️ 学习效果有待提升，需要优化教学策略\n"
+        )
+
     def _generate_general_response(self, user_query, metrics):
         """生成通用响应"""
-        response = f"## 🤖 AI分析响应\n\n"
-        response += f"基于您的问题「{user_query}」，结合本周教学数据分析：\n\n"
-        
-        response += f"### 当前教学状况\n"
-        response += f"- **教学规模**: {metrics['total_hours']}课时，涉及{metrics['total_classes']}个班级\n"
-        response += f"- **学生参与**: 平均出勤率{metrics['attendance_rate']*100:.1f}%\n"
-        response += f"- **学习效果**: 题目正确率{metrics['correctness_rate']*100:.1f}%\n\n"
-        
-        response += f"### 核心关注点\n"
-        response += f"1. **学习质量提升**: 当前正确率有较大提升空间\n"
-        response += f"2. **教学差异化**: 不同班级和学科表现差异明显\n"
-        response += f"3. **持续改进**: 需要基于数据不断优化教学策略\n\n"
-        
-        response += f"### 建议进一步分析\n"
-        response += f"如需更深入的分析，您可以尝试询问：\n"
-        response += f"- 出勤率详细分析\n"
-        response += f"- 题目正确率改进建议\n"
-        response += f"- 班级表现对比\n"
-        response += f"- 学科教学优化\n"
-        response += f"- 历史趋势解读\n"
-        
-        return response
+        return self.section_cache.render('general', (user_query, metrics), self._render_general_response)
+
+    @staticmethod
+    def _render_general_response(user_query, metrics):
+        return GENERAL_RESPONSE_TEMPLATE.format(
+            user_query=user_query,
+            total_hours=metrics['total_hours'],
+            total_classes=metrics['total_classes'],
+            attendance=metrics['attendance_rate'] * 100,
+            correctness=metrics['correctness_rate'] * 100
+        )
 
 # 主程序
 if __name__ == "__main__":
     # 读取分析结果
     with open('/home/workspace/analysis_results.json', 'r', encoding='utf-8') as f:
         analysis_results = json.load(f)
-    
+
     # 创建AI报告生成器
     ai_generator = AIReportGenerator(analysis_results)
-    
+
     # 生成初始报告
     initial_report = ai_generator.generate_initial_report()
-    
+
     # 保存初始报告
     with open('/home/workspace/initial_report.md', 'w', encoding='utf-8') as f:
         f.write(initial_report)
-    
+
     print("✅ AI报告生成完成！")
     print(f"初始报告已保存到: /home/workspace/initial_report.md")
     print(f"报告长度: {len(initial_report)} 字符")
-    
+
     # 测试AI查询功能
     print("\n=== AI查询测试 ===")
-    
+
     test_queries = [
         "出勤率分析",
         "题目正确率改进建议",
         "班级表现对比",
         "教学改进建议"
     ]
-    
+
     for query in test_queries:
         print(f"\n查询: {query}")
         response = ai_generator.process_ai_query(query)
         print(f"响应长度: {len(response)} 字符")
-        print(f"响应摘要: {response[:100]}...")
\ No newline at end of file
+        print(f"响应摘要: {response[:100]}...")
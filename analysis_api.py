@@ -0,0 +1,300 @@
+import os
+import threading
+import argparse
+from urllib.parse import quote
+import pyarrow as pa
+import pyarrow.compute as pc
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+from ai_report_generator import AIReportGenerator
+from metrics_cube import DIMENSIONS, MetricsCube
+from report_export import EXPORT_FORMATS, TABLE_SHEETS, export_tables, iter_file
+from results_store import DEFAULT_STORE_DIR, MANIFEST_FILE, ResultsStore
+from shared_cache import SharedResultsCache, load_cached_results
+from simple_analysis import DEFAULT_OUTPUT_FILE
+
+# 默认监听地址
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8600
+
+
+class AnalysisService:
+    """API背后的分析服务：与看板共用共享结果缓存、列式结果存储和AI报告生成器"""
+
+    def __init__(self, store_dir=DEFAULT_STORE_DIR, results_file=DEFAULT_OUTPUT_FILE, cache=None):
+        self.store_dir = store_dir
+        self.results_file = results_file
+        self.cache = cache if cache is not None else SharedResultsCache()
+        self._store = None
+        self._generator = None
+        self._cube = None
+        # 处理函数在线程池中并发执行，延迟构建的存储、立方体与生成器加锁避免重复构建
+        self._lock = threading.RLock()
+
+    def results(self):
+        """当前分析结果（按文件修改时间缓存，文件不存在时抛出 FileNotFoundError）"""
+        return load_cached_results(self.cache, self.store_dir, self.results_file)
+
+    def table(self, results, name):
+        """读取结果中的大表：共享缓存中已冻结的Arrow表，或结果存储中内存映射的表"""
+        value = results.get(name)
+        if isinstance(value, pa.Table):
+            return value
+        if value is not None:
+            return pa.table(value) if isinstance(value, dict) else pa.Table.from_pylist(value)
+        store_dir = results.get('store_dir')
+        if not store_dir or not ResultsStore.exists(store_dir):
+            return None
+        manifest_mtime = os.path.getmtime(os.path.join(store_dir, MANIFEST_FILE))
+        with self._lock:
+            if self._store is None or self._store[0] != (store_dir, manifest_mtime):
+                self._store = ((store_dir, manifest_mtime), ResultsStore(store_dir))
+            store = self._store[1]
+        return store.table(name) if name in store.table_names() else None
+
+    def week_rows(self, results, name, week=None):
+        """大表中某一周的记录（默认当前周），周次不存在时返回空列表"""
+        table = self.table(results, name)
+        if table is None:
+            return None
+        week = week or results['current_week']['date']
+        return table.filter(pc.equal(table['周'], week)).to_pylist()
+
+    def cube(self, results):
+        """与当前结果绑定的指标立方体（结果更新后重建），结果不含立方体时返回 None"""
+        with self._lock:
+            if self._cube is None or self._cube[0] is not results:
+                table = self.table(results, 'metrics_cube')
+                self._cube = (results, MetricsCube.from_columnar(table) if table is not None else None)
+            return self._cube[1]
+
+    def generator(self, results):
+        """与当前结果绑定的AI报告生成器（结果更新后重建，小节渲染缓存在进程内共享）"""
+        with self._lock:
+            if self._generator is None or self._generator.analysis_results is not results:
+                self._generator = AIReportGenerator(results)
+            return self._generator
+
+
+# ==========================================
+# 路由处理
+# ==========================================
+# 读取结果、筛选大表与生成回答都是阻塞操作，处理函数定义为普通函数，由 Starlette 在线程池中执行，
+# 不阻塞事件循环上的其他请求
+def _error(status_code, message):
+    return JSONResponse({'error': message}, status_code=status_code)
+
+
+def _load_results(request):
+    """取出当前结果；结果文件尚未生成时返回 None"""
+    try:
+        return request.app.state.service.results()
+    except FileNotFoundError:
+        return None
+
+
+async def health(request):
+    return JSONResponse({'status': 'ok'})
+
+
+def metrics(request):
+    """当前周与前一周核心指标"""
+    results = _load_results(request)
+    if results is None:
+        return _error(503, '分析结果尚未生成')
+    return JSONResponse({
+        'file_info': results['file_info'],
+        'current_week': results['current_week'],
+        'previous_week': results.get('previous_week'),
+        'analysis_time': results['analysis_time']
+    })
+
+
+def trends(request):
+    """每周趋势"""
+    results = _load_results(request)
+    if results is None:
+        return _error(503, '分析结果尚未生成')
+    return JSONResponse({'weekly_trends': results['weekly_trends']})
+
+
+def anomalies(request):
+    """异常预警：按严重程度排序的 班级×学科 周序列预警"""
+    results = _load_results(request)
+    if results is None:
+        return _error(503, '分析结果尚未生成')
+    if 'anomalies' not in results:
+        return _error(404, '当前分析结果不含异常预警，请重新运行分析')
+    return JSONResponse(results['anomalies'])
+
+
+def forecasts(request):
+    """趋势预测：整体指标未来几周的预测值与区间，及预计下滑最多的 班级×学科 序列"""
+    results = _load_results(request)
+    if results is None:
+        return _error(503, '分析结果尚未生成')
+    if 'forecasts' not in results:
+        return _error(404, '当前分析结果不含趋势预测，请重新运行分析')
+    return JSONResponse(results['forecasts'])
+
+
+def quality(request):
+    """数据质量报告：读取时的缺失值、非数值、越界值、无效周次与重复记录统计"""
+    results = _load_results(request)
+    if results is None:
+        return _error(503, '分析结果尚未生成')
+    if 'data_quality' not in results:
+        return _error(404, '当前分析结果不含数据质量报告，请重新运行分析')
+    return JSONResponse(results['data_quality'])
+
+
+def _week_table_endpoint(section, key):
+    """班级/学科周统计接口：?week=YYYY-MM-DD，默认当前周"""
+    def endpoint(request):
+        results = _load_results(request)
+        if results is None:
+            return _error(503, '分析结果尚未生成')
+        week = request.query_params.get('week') or results['current_week']['date']
+        rows = request.app.state.service.week_rows(results, section, week)
+        if rows is None:
+            return _error(404, '当前分析结果不含该统计表，请重新运行分析')
+        if not rows:
+            return _error(404, f"没有周次 {week} 的数据")
+        return JSONResponse({'week': week, key: rows})
+    return endpoint
+
+
+def _list_param(request, name):
+    """逗号分隔的查询参数，未提供时返回 None"""
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def cube(request):
+    """立方体上卷：?by=周,课时学科&subjects=英语&classes=...&weeks=...&last_weeks=6&start=&end="""
+    results = _load_results(request)
+    if results is None:
+        return _error(503, '分析结果尚未生成')
+    metrics_cube = request.app.state.service.cube(results)
+    if metrics_cube is None:
+        return _error(404, '当前分析结果不含指标立方体，请重新运行分析')
+    by = _list_param(request, 'by') or []
+    unknown = [dim for dim in by if dim not in DIMENSIONS]
+    if unknown:
+        return _error(400, f"不支持的维度: {', '.join(unknown)}（可选 {', '.join(DIMENSIONS)}）")
+    last_weeks = request.query_params.get('last_weeks')
+    try:
+        last_weeks = int(last_weeks) if last_weeks else None
+        sliced = metrics_cube.slice(
+            weeks=_list_param(request, 'weeks'),
+            classes=_list_param(request, 'classes'),
+            subjects=_list_param(request, 'subjects'),
+            last_weeks=last_weeks,
+            start=request.query_params.get('start'),
+            end=request.query_params.get('end')
+        )
+    except ValueError as e:
+        return _error(400, f"筛选参数不合法: {e}")
+    if by:
+        stats = sliced.stats(by)
+        if '周' in stats.columns:
+            stats['周'] = stats['周'].dt.strftime('%Y-%m-%d')
+        return JSONResponse({'by': by, 'rows': stats.to_dict('records')})
+    return JSONResponse({'by': by, 'metrics': sliced.metrics()})
+
+
+async def query(request):
+    """AI问答：POST {"query": "...", "context": "..."} 或 GET ?q=..."""
+    if request.method == 'POST':
+        try:
+            payload = await request.json()
+        except ValueError:
+            return _error(400, '请求体不是合法的JSON')
+        if not isinstance(payload, dict):
+            return _error(400, '请求体应为JSON对象')
+        user_query = payload.get('query')
+        context = payload.get('context', '')
+    else:
+        user_query = request.query_params.get('q')
+        context = request.query_params.get('context', '')
+    if not isinstance(user_query, str) or not user_query.strip():
+        return _error(400, '缺少查询内容 query')
+
+    # 读取请求体需要在事件循环中等待，加载结果与生成回答放到线程池执行
+    return await run_in_threadpool(_answer_query, request, user_query, context)
+
+
+def _answer_query(request, user_query, context):
+    """生成AI问答响应（阻塞操作，在线程池中执行）"""
+    results = _load_results(request)
+    if results is None:
+        return _error(503, '分析结果尚未生成')
+    generator = request.app.state.service.generator(results)
+    return JSONResponse({
+        'query': user_query,
+        'intents': generator.router.select(user_query),
+        'response': generator.process_ai_query(user_query, context)
+    })
+
+
+def export_table_file(request):
+    """导出XLSX：周趋势与班级/学科周统计（逐块写出并以流式响应传输，大表不在内存中整体展开）"""
+    results = _load_results(request)
+    if results is None:
+        return _error(503, '分析结果尚未生成')
+    service = request.app.state.service
+    sheets = {'周趋势': results['weekly_trends']}
+    for name, sheet_name in TABLE_SHEETS.items():
+        table = service.table(results, name)
+        if table is not None:
+            sheets[sheet_name] = table
+    extension, mime = EXPORT_FORMATS['xlsx']
+    file_name = quote(f"教学数据_{results['current_week']['date']}.{extension}")
+    return StreamingResponse(
+        iter_file(export_tables(sheets)),
+        media_type=mime,
+        headers={'Content-Disposition': f"attachment; filename*=UTF-8''{file_name}"}
+    )
+
+
+def create_app(service=None):
+    """创建ASGI应用"""
+    app = Starlette(routes=[
+        Route('/health', health),
+        Route('/api/metrics', metrics),
+        Route('/api/trends', trends),
+        Route('/api/classes', _week_table_endpoint('class_week_stats', 'classes')),
+        Route('/api/subjects', _week_table_endpoint('subject_week_stats', 'subjects')),
+        Route('/api/anomalies', anomalies),
+        Route('/api/forecasts', forecasts),
+        Route('/api/quality', quality),
+        Route('/api/cube', cube),
+        Route('/api/query', query, methods=['GET', 'POST']),
+        Route('/api/export/tables', export_table_file)
+    ])
+    app.state.service = service if service is not None else AnalysisService()
+    return app
+
+
+def main(argv=None):
+    """启动API服务"""
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description='教学数据分析 JSON API')
+    parser.add_argument('--host', default=DEFAULT_HOST, help='监听地址')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='监听端口')
+    parser.add_argument('--store-dir', default=DEFAULT_STORE_DIR, help='列式结果存储目录')
+    parser.add_argument('--results-file', default=DEFAULT_OUTPUT_FILE, help='结果JSON文件（无结果存储时使用）')
+    args = parser.parse_args(argv)
+
+    app = create_app(AnalysisService(args.store_dir, args.results_file))
+    uvicorn.run(app, host=args.host, port=args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
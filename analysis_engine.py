@@ -0,0 +1,327 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from run_profiler import profile_stage
+from anomaly_detection import detect_anomalies
+from forecasting import forecast_summary
+
+# 权重列（课时数）与核心指标列
+WEIGHT_COL = '课时数'
+CORE_INDICATORS = {
+    'attendance_rate': '课时平均出勤率',
+    'micro_completion_rate': '微课完成率',
+    'correctness_rate': '题目正确率（自学+快背）'
+}
+
+# 最细粒度聚合维度：周 × 班级 × 学科
+FINE_KEYS = ['周', '班级名称', '课时学科']
+# 细粒度加权和（指标立方体）以列式保存时的浮点精度，上卷后仍与原始计算一致
+CUBE_DIGITS = 10
+
+
+# 班级/学科统计表中的指标列名
+STAT_COLUMNS = {
+    'attendance_rate': '平均出勤率',
+    'micro_completion_rate': '平均微课完成率',
+    'correctness_rate': '平均题目正确率'
+}
+
+
+def _safe_divide(numerator, denominator, where):
+    """按掩码做除法，不满足条件的位置记为0"""
+    numerator = np.asarray(numerator, dtype=float)
+    denominator = np.asarray(denominator, dtype=float)
+    return np.divide(numerator, denominator, out=np.zeros(len(numerator)), where=where)
+
+
+def sum_columns(indicators=CORE_INDICATORS):
+    """加权和结果中可累加的列"""
+    return [WEIGHT_COL] + [f'{key}_wsum' for key in indicators] + ['records']
+
+
+def weighted_sums(df, by, indicators=CORE_INDICATORS, sort=True):
+    """按维度分组累加课时数、指标×课时数乘积和记录数
+
+    结果列为 课时数、<指标>_wsum、records，可再次分组累加（上卷）。
+    """
+    weights = df[WEIGHT_COL]
+    frame = df[by if isinstance(by, list) else [by]].copy()
+    frame[WEIGHT_COL] = weights
+    for key, col in indicators.items():
+        # 缺失的指标列按0处理
+        frame[f'{key}_wsum'] = df[col] * weights if col in df.columns else 0.0
+
+    grouped = frame.groupby(by, sort=sort)
+    sums = grouped.sum()
+    sums['records'] = grouped.size()
+    return sums
+
+
+def aggregate_fine(df):
+    """将原始记录聚合为 周×班级×学科 粒度的加权和（保持首次出现顺序）"""
+    return weighted_sums(df, FINE_KEYS, sort=False).reset_index()
+
+
+def rollup_sums(fine, by):
+    """将细粒度加权和上卷到指定维度"""
+    columns = [col for col in sum_columns() if col in fine.columns]
+    return fine.groupby(by, sort=True)[columns].sum()
+
+
+def weighted_means(sums, indicators=CORE_INDICATORS):
+    """由加权和计算加权平均值，总课时不大于0的组记为0"""
+    total_weight = sums[WEIGHT_COL].to_numpy(dtype=float)
+    return pd.DataFrame(
+        {key: _safe_divide(sums[f'{key}_wsum'], total_weight, total_weight > 0) for key in indicators},
+        index=sums.index
+    )
+
+
+def _group_stats(sums, indicators):
+    """由加权和生成 总课时/加权平均指标/记录数 统计表"""
+    means = weighted_means(sums, indicators)
+    stats = pd.DataFrame(index=sums.index)
+    stats['总课时'] = sums[WEIGHT_COL].astype(int)
+    for key in indicators:
+        stats[STAT_COLUMNS.get(key, key)] = means[key]
+    stats['记录数'] = sums['records'].astype(int)
+    return stats
+
+
+def stats_from_sums(fine, by, indicators=CORE_INDICATORS):
+    """由细粒度加权和上卷到任意维度组合并计算统计表"""
+    return _group_stats(rollup_sums(fine, by), indicators)
+
+
+def weighted_group_stats(data, by, indicators=CORE_INDICATORS):
+    """通用加权聚合：按任意维度（班级、学科、教师、年级等）计算总课时、加权平均指标和记录数"""
+    return _group_stats(weighted_sums(data, by, indicators), indicators)
+
+
+def metrics_from_sums(fine):
+    """由细粒度加权和计算核心教学指标（与 calculate_core_metrics 一致）"""
+    if len(fine) == 0:
+        return None
+
+    total_weight = fine[WEIGHT_COL].sum()
+    metrics = {
+        'total_hours': int(total_weight),
+        'total_classes': fine['班级名称'].nunique(),
+        'total_subjects': fine['课时学科'].nunique(),
+        'total_records': int(fine['records'].sum())
+    }
+    for key in CORE_INDICATORS:
+        metrics[key] = float(fine[f'{key}_wsum'].sum() / total_weight) if total_weight != 0 else 0.0
+    return metrics
+
+
+def class_stats_from_sums(fine):
+    """由单周细粒度加权和计算班级表现统计"""
+    stats = _group_stats(rollup_sums(fine, '班级名称'), CORE_INDICATORS)
+    # 细粒度行按首次出现顺序排列，拼接结果与逐组 unique() 一致
+    stats['涉及学科'] = fine['课时学科'].astype(str).groupby(fine['班级名称'], sort=True).agg(', '.join)
+    # 综合得分
+    stats['综合得分'] = (
+        stats['平均出勤率'] * 0.3 +
+        stats['平均微课完成率'] * 0.3 +
+        stats['平均题目正确率'] * 0.4
+    )
+    columns = ['总课时', '平均出勤率', '平均微课完成率', '平均题目正确率', '涉及学科', '记录数', '综合得分']
+    return stats[columns].reset_index()
+
+
+def subject_stats_from_sums(fine):
+    """由单周细粒度加权和计算学科表现统计"""
+    indicators = {key: CORE_INDICATORS[key] for key in ['attendance_rate', 'correctness_rate']}
+    stats = _group_stats(rollup_sums(fine, '课时学科'), indicators)
+    stats['涉及班级数'] = fine.groupby('课时学科', sort=True)['班级名称'].nunique()
+    columns = ['总课时', '平均出勤率', '平均题目正确率', '涉及班级数', '记录数']
+    return stats[columns].reset_index()
+
+
+def weekly_metrics_from_sums(fine):
+    """由细粒度加权和计算每周核心指标，返回以周为索引的DataFrame"""
+    sums = rollup_sums(fine, '周')
+    total_weight = sums[WEIGHT_COL].to_numpy(dtype=float)
+
+    weekly = pd.DataFrame(index=sums.index)
+    weekly['total_hours'] = sums[WEIGHT_COL].astype(int)
+    for key in CORE_INDICATORS:
+        weekly[key] = _safe_divide(sums[f'{key}_wsum'], total_weight, total_weight != 0)
+    counts = fine.groupby('周', sort=True)[['班级名称', '课时学科']].nunique()
+    weekly['total_classes'] = counts['班级名称']
+    weekly['total_subjects'] = counts['课时学科']
+    weekly['total_records'] = sums['records'].astype(int)
+    return weekly
+
+
+def weekly_trends_from_sums(fine):
+    """由细粒度加权和生成 weekly_trends 记录列表"""
+    weekly = weekly_metrics_from_sums(fine)
+    return [
+        {
+            'week': week.strftime('%Y-%m-%d'),
+            'total_hours': int(row.total_hours),
+            'attendance_rate': float(row.attendance_rate),
+            'correctness_rate': float(row.correctness_rate),
+            'class_count': int(row.total_classes)
+        }
+        for week, row in zip(weekly.index, weekly.itertuples(index=False))
+    ]
+
+
+def class_week_stats_from_sums(fine):
+    """由细粒度加权和计算每个班级每周的统计（周×班级）"""
+    sums = rollup_sums(fine, ['周', '班级名称'])
+    stats = _group_stats(sums, CORE_INDICATORS)
+    stats['学科数'] = fine.groupby(['周', '班级名称'], sort=True)['课时学科'].nunique()
+    stats['综合得分'] = (
+        stats['平均出勤率'] * 0.3 +
+        stats['平均微课完成率'] * 0.3 +
+        stats['平均题目正确率'] * 0.4
+    )
+    return stats.reset_index()
+
+
+def subject_week_stats_from_sums(fine):
+    """由细粒度加权和计算每个学科每周的统计（周×学科）"""
+    sums = rollup_sums(fine, ['周', '课时学科'])
+    stats = _group_stats(sums, CORE_INDICATORS)
+    stats['涉及班级数'] = fine.groupby(['周', '课时学科'], sort=True)['班级名称'].nunique()
+    return stats.reset_index()
+
+
+def to_columnar(frame, digits=6):
+    """将统计表转为紧凑的列式字典（列名 → 值列表），日期格式化、浮点数限定精度"""
+    columns = {}
+    for col in frame.columns:
+        values = frame[col]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            columns[col] = values.dt.strftime('%Y-%m-%d').tolist()
+        elif pd.api.types.is_float_dtype(values):
+            columns[col] = values.round(digits).tolist()
+        else:
+            columns[col] = values.tolist()
+    return columns
+
+
+def compute_class_stats(data):
+    """班级表现统计"""
+    return class_stats_from_sums(aggregate_fine(data))
+
+
+def compute_subject_stats(data):
+    """学科表现统计"""
+    return subject_stats_from_sums(aggregate_fine(data))
+
+
+def compute_weekly_metrics(df):
+    """单次分组计算每周核心指标，返回以周为索引的DataFrame
+
+    与逐周调用 calculate_core_metrics 的结果一致，但只对全量数据分组一次。
+    """
+    return weekly_metrics_from_sums(aggregate_fine(df))
+
+
+def compute_weekly_trends(df):
+    """生成 weekly_trends 记录列表"""
+    return weekly_trends_from_sums(aggregate_fine(df))
+
+
+def split_weeks(fine):
+    """从细粒度加权和中取出最新周、前一周及其数据"""
+    latest_week = fine['周'].max()
+    current = fine[fine['周'] == latest_week]
+    previous_weeks = fine.loc[fine['周'] < latest_week, '周']
+    if len(previous_weeks) > 0:
+        prev_week = previous_weeks.max()
+        previous = fine[fine['周'] == prev_week]
+    else:
+        prev_week = None
+        previous = fine.iloc[0:0]
+    return latest_week, current, prev_week, previous
+
+
+def build_results(fine, file_name, class_stats=None, subject_stats=None, profiler=None):
+    """由细粒度加权和组装 analysis_results 结果文档（传入 profiler 时记录各分组计算）"""
+    latest_week, current, prev_week, previous = split_weeks(fine)
+    with profile_stage(profiler, 'core_metrics', len(current)):
+        current_metrics = metrics_from_sums(current)
+    if class_stats is None:
+        with profile_stage(profiler, 'class_stats', len(current)):
+            class_stats = class_stats_from_sums(current)
+    if subject_stats is None:
+        with profile_stage(profiler, 'subject_stats', len(current)):
+            subject_stats = subject_stats_from_sums(current)
+
+    # 最佳班级（综合表现）
+    best_class = None
+    if len(class_stats) > 0:
+        best_class = class_stats.loc[class_stats['综合得分'].idxmax()]
+
+    # 需要关注的班级（出勤正常但正确率低），取正确率最低的一个
+    focus_class = None
+    if current_metrics and len(class_stats) > 0:
+        focus_classes = class_stats[
+            (class_stats['平均出勤率'] > current_metrics['attendance_rate']) &
+            (class_stats['平均题目正确率'] < current_metrics['correctness_rate'])
+        ]
+        if len(focus_classes) > 0:
+            focus_class = focus_classes.loc[focus_classes['平均题目正确率'].idxmin()]
+
+    top_subjects = subject_stats.sort_values('总课时', ascending=False).head(5)
+
+    with profile_stage(profiler, 'weekly_trends', len(fine)):
+        weekly_trends = weekly_trends_from_sums(fine)
+    with profile_stage(profiler, 'class_week_stats', len(fine)):
+        class_week_stats = to_columnar(class_week_stats_from_sums(fine))
+    with profile_stage(profiler, 'subject_week_stats', len(fine)):
+        subject_week_stats = to_columnar(subject_week_stats_from_sums(fine))
+    with profile_stage(profiler, 'anomalies', len(fine)):
+        anomalies = detect_anomalies(fine, STAT_COLUMNS)
+    with profile_stage(profiler, 'forecasts', len(fine)):
+        forecasts = forecast_summary(weekly_trends, fine, STAT_COLUMNS)
+    with profile_stage(profiler, 'metrics_cube', len(fine)):
+        metrics_cube = to_columnar(fine, CUBE_DIGITS)
+
+    return {
+        'file_info': {
+            'file_name': file_name,
+            'total_records': int(fine['records'].sum()),
+            'date_range': {
+                'start': fine['周'].min().strftime('%Y-%m-%d'),
+                'end': latest_week.strftime('%Y-%m-%d')
+            }
+        },
+        'current_week': {
+            'date': latest_week.strftime('%Y-%m-%d'),
+            'metrics': current_metrics,
+            'class_stats_count': len(class_stats),
+            'subject_stats_count': len(subject_stats)
+        },
+        'previous_week': {
+            'date': prev_week.strftime('%Y-%m-%d') if prev_week is not None else None,
+            'metrics': metrics_from_sums(previous)
+        },
+        'best_class': {
+            'name': best_class['班级名称'] if best_class is not None else None,
+            'hours': int(best_class['总课时']) if best_class is not None else 0,
+            'attendance_rate': float(best_class['平均出勤率']) if best_class is not None else 0,
+            'correctness_rate': float(best_class['平均题目正确率']) if best_class is not None else 0,
+            'subjects': best_class['涉及学科'] if best_class is not None else ''
+        },
+        'focus_class': {
+            'name': focus_class['班级名称'] if focus_class is not None else None,
+            'attendance_rate': float(focus_class['平均出勤率']) if focus_class is not None else 0,
+            'correctness_rate': float(focus_class['平均题目正确率']) if focus_class is not None else 0,
+            'subjects': focus_class['涉及学科'] if focus_class is not None else ''
+        },
+        'top_subjects': top_subjects[['课时学科', '总课时', '平均题目正确率', '涉及班级数']].to_dict('records'),
+        'weekly_trends': weekly_trends,
+        'anomalies': anomalies,
+        'forecasts': forecasts,
+        'class_week_stats': class_week_stats,
+        'subject_week_stats': subject_week_stats,
+        'metrics_cube': metrics_cube,
+        'analysis_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
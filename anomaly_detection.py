@@ -0,0 +1,168 @@
+import warnings
+import numpy as np
+import pandas as pd
+
+# 检测窗口：稳健统计使用的历史周数、滚动基线周数、计算z分数所需的最少历史周数
+HISTORY_WEEKS = 8
+BASELINE_WEEKS = 4
+MIN_HISTORY = 3
+# 阈值：稳健z分数、相对基线的下降幅度（比率的绝对值）、相对上一周的骤降比例
+Z_THRESHOLD = 3.5
+DROP_THRESHOLD = 0.15
+SUDDEN_DROP_RATIO = 0.5
+# 稳健尺度下限，避免历史几乎不变的序列因微小波动被标记
+MIN_SCALE = 0.02
+# MAD 换算为标准差的系数
+MAD_SCALE = 1.4826
+# 结果中保留的预警条数
+MAX_ALERTS = 50
+
+# 预警规则
+RULE_ROBUST_Z = 'robust_z'
+RULE_BASELINE_DROP = 'baseline_drop'
+RULE_SUDDEN_DROP = 'sudden_drop'
+RULE_LABELS = {
+    RULE_ROBUST_Z: '显著偏离历史水平',
+    RULE_BASELINE_DROP: '低于近期基线',
+    RULE_SUDDEN_DROP: '较上周骤降'
+}
+
+
+def series_matrices(fine, indicators, week_col='周', series_cols=('班级名称', '课时学科'), weight_col='课时数'):
+    """将细粒度加权和展开为 指标×序列×周 的比率矩阵
+
+    返回 (比率矩阵, 课时矩阵, 周次, 序列标签表)；某序列某周没有课时时比率为 NaN。
+    细粒度表每个 周×班级×学科 只有一行，直接按编码写入矩阵。
+    """
+    week_codes, weeks = pd.factorize(fine[week_col], sort=True)
+    # 序列编码：各维度分别编码后组合为整数再编码（比按多列元组编码快一个数量级）
+    first_codes, first_levels = pd.factorize(fine[series_cols[0]], sort=True)
+    second_codes, second_levels = pd.factorize(fine[series_cols[1]], sort=True)
+    series_codes, combined = pd.factorize(first_codes.astype(np.int64) * len(second_levels) + second_codes, sort=True)
+    labels = pd.DataFrame({
+        series_cols[0]: first_levels[combined // len(second_levels)],
+        series_cols[1]: second_levels[combined % len(second_levels)]
+    })
+    shape = (len(labels), len(weeks))
+
+    weight = fine[weight_col].to_numpy(dtype=float)
+    hours = np.zeros(shape)
+    hours[series_codes, week_codes] = weight
+    values = np.full((len(indicators),) + shape, np.nan)
+    has_hours = weight > 0
+    rows, cols = series_codes[has_hours], week_codes[has_hours]
+    for i, key in enumerate(indicators):
+        values[i, rows, cols] = fine[f'{key}_wsum'].to_numpy(dtype=float)[has_hours] / weight[has_hours]
+    return values, hours, weeks, labels
+
+
+def _last_observed(history):
+    """每个序列历史窗口中最后一个有值的周（没有时为 NaN）"""
+    if history.shape[-1] == 0:
+        return np.full(history.shape[:-1], np.nan)
+    valid = ~np.isnan(history)
+    positions = np.where(valid, np.arange(history.shape[-1]), -1)
+    last = positions.max(axis=-1)
+    previous = np.take_along_axis(history, np.maximum(last, 0)[..., None], axis=-1)[..., 0]
+    return np.where(last >= 0, previous, np.nan)
+
+
+def score_latest_week(values, history_weeks=HISTORY_WEEKS, baseline_weeks=BASELINE_WEEKS, min_history=MIN_HISTORY,
+                      z_threshold=Z_THRESHOLD, drop_threshold=DROP_THRESHOLD, sudden_drop_ratio=SUDDEN_DROP_RATIO):
+    """对所有序列的最新一周同时计算稳健z分数、滚动基线和骤降检测
+
+    values 为 指标×序列×周 的比率矩阵，所有计算沿周轴向量化完成。
+    返回各检测量与规则命中矩阵（形状均为 指标×序列）组成的字典。
+    """
+    current = values[..., -1]
+    history = values[..., max(0, values.shape[-1] - 1 - history_weeks):-1]
+    observed = (~np.isnan(history)).sum(axis=-1)
+
+    with warnings.catch_warnings():
+        # 没有历史数据的序列结果为 NaN，忽略全为 NaN 的切片警告
+        warnings.simplefilter('ignore', RuntimeWarning)
+        median = np.nanmedian(history, axis=-1)
+        mad = np.nanmedian(np.abs(history - median[..., None]), axis=-1)
+        baseline = np.nanmean(history[..., -baseline_weeks:], axis=-1)
+    scale = np.maximum(MAD_SCALE * mad, MIN_SCALE)
+    z_score = (current - median) / scale
+    previous = _last_observed(history)
+    baseline_drop = baseline - current
+    previous_drop = previous - current
+
+    has_current = ~np.isnan(current)
+    enough_history = has_current & (observed >= min_history)
+    rules = {
+        RULE_ROBUST_Z: enough_history & (z_score <= -z_threshold),
+        RULE_BASELINE_DROP: enough_history & (baseline_drop >= drop_threshold),
+        RULE_SUDDEN_DROP: has_current & (previous_drop >= drop_threshold) & (current < previous * (1 - sudden_drop_ratio))
+    }
+    # 严重程度：各检测量相对阈值的倍数取最大值
+    with np.errstate(invalid='ignore'):
+        severity = np.fmax(np.fmax(-z_score / z_threshold, baseline_drop / drop_threshold), previous_drop / drop_threshold)
+    return {
+        'current': current,
+        'median': median,
+        'baseline': baseline,
+        'previous': previous,
+        'z_score': z_score,
+        'baseline_drop': baseline_drop,
+        'previous_drop': previous_drop,
+        'severity': severity,
+        'rules': rules
+    }
+
+
+def _round(value, digits=4):
+    return None if np.isnan(value) else round(float(value), digits)
+
+
+def detect_anomalies(fine, indicators, max_alerts=MAX_ALERTS, history_weeks=HISTORY_WEEKS, **params):
+    """检测每个 班级×学科 周序列最新一周的异常，返回按严重程度排序的预警
+
+    indicators 为 指标键 → 显示名称；params 传给 score_latest_week 调整基线窗口与阈值。
+    只展开最近 history_weeks+1 周，矩阵大小与总周数无关。
+    预警条目包含序列、指标、当前值、历史中位数、滚动基线、上一次观测值、z分数、命中规则与严重程度。
+    """
+    if len(fine) == 0:
+        return {'week': None, 'series': 0, 'flagged': 0, 'rule_counts': {}, 'alerts': []}
+
+    recent_weeks = np.sort(fine['周'].unique())[-(history_weeks + 1):]
+    fine = fine[fine['周'] >= recent_weeks[0]]
+    keys = list(indicators)
+    values, hours, weeks, labels = series_matrices(fine, keys)
+    scores = score_latest_week(values, history_weeks=history_weeks, **params)
+    rules = scores['rules']
+    flagged = np.logical_or.reduce(list(rules.values()))
+
+    indicator_idx, series_idx = np.nonzero(flagged)
+    severity = scores['severity'][indicator_idx, series_idx]
+    latest_hours = hours[series_idx, -1]
+    # 严重程度降序，同分时课时多的在前
+    order = np.lexsort((-latest_hours, -severity))[:max_alerts]
+
+    class_names = labels.iloc[:, 0].to_numpy()
+    subject_names = labels.iloc[:, 1].to_numpy()
+    alerts = []
+    for i, s in zip(indicator_idx[order], series_idx[order]):
+        alerts.append({
+            'class': class_names[s],
+            'subject': subject_names[s],
+            'indicator': keys[i],
+            'label': indicators[keys[i]],
+            'value': _round(scores['current'][i, s]),
+            'median': _round(scores['median'][i, s]),
+            'baseline': _round(scores['baseline'][i, s]),
+            'previous': _round(scores['previous'][i, s]),
+            'z_score': _round(scores['z_score'][i, s], 2),
+            'rules': [rule for rule, hit in rules.items() if hit[i, s]],
+            'severity': _round(scores['severity'][i, s], 3),
+            'hours': int(hours[s, -1])
+        })
+    return {
+        'week': weeks[-1].strftime('%Y-%m-%d'),
+        'series': len(labels),
+        'flagged': int(flagged.any(axis=0).sum()),
+        'rule_counts': {rule: int(hit.sum()) for rule, hit in rules.items()},
+        'alerts': alerts
+    }
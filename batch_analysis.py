@@ -0,0 +1,137 @@
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from simple_analysis import analyze_file, save_results
+
+# 默认批量输出目录
+DEFAULT_OUTPUT_DIR = '/home/workspace/batch_results'
+WORKBOOK_PATTERNS = ('*.xlsx', '*.xls')
+
+
+def collect_workbooks(inputs):
+    """将目录或通配符展开为工作簿路径列表"""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for pattern in WORKBOOK_PATTERNS:
+                paths.extend(glob.glob(os.path.join(item, pattern)))
+        else:
+            paths.extend(glob.glob(item))
+    # 跳过Excel临时锁文件并去重
+    return sorted({os.path.abspath(p) for p in paths if not os.path.basename(p).startswith('~$')})
+
+
+def school_names(paths):
+    """各工作簿的学校标识：相对于共同上级目录的路径（去掉扩展名，目录分隔符换为 "__"）
+
+    不同学校目录下的同名工作簿因此得到不同的标识，输出文件不会互相覆盖；
+    所有工作簿在同一目录时标识即文件名。
+    """
+    if not paths:
+        return {}
+    root = os.path.commonpath([os.path.dirname(p) for p in paths])
+    return {
+        path: os.path.splitext(os.path.relpath(path, root))[0].replace(os.sep, '__')
+        for path in paths
+    }
+
+
+def analyze_workbook(path, output_dir, school=None):
+    """单个学校工作簿的完整分析流程（在子进程中执行，数据质量检查未通过时记为失败）
+
+    与单文件分析相同（analyze_file：大文件自动分块读取，结果附带运行概况与数据质量报告）；
+    摘要小节写入 {school}_analysis_results.json，班级/学科周统计与指标立方体写入 {school}_store 列式存储。
+    """
+    start = time.perf_counter()
+    if school is None:
+        school = os.path.splitext(os.path.basename(path))[0]
+    results = analyze_file(path)
+    quality_report = results['data_quality']
+    stages = {stage['name'] for stage in results['run_profile']['stages']}
+
+    output_file = os.path.join(output_dir, f"{school}_analysis_results.json")
+    save_results(results, output_file, os.path.join(output_dir, f"{school}_store"))
+
+    # 只返回汇总所需的小字典，避免跨进程传输数据帧
+    return {
+        'school': school,
+        'output_file': output_file,
+        'total_records': results['file_info']['total_records'],
+        'date_range': results['file_info']['date_range'],
+        'current_week': results['current_week']['date'],
+        'metrics': results['current_week']['metrics'],
+        'best_class': results['best_class']['name'],
+        'focus_class': results['focus_class']['name'],
+        'flagged_series': results['anomalies']['flagged'],
+        'quality_status': quality_report['status'],
+        'quality_issues': len(quality_report['issues']),
+        'weeks': len(results['weekly_trends']),
+        'streamed': 'stream_ingest' in stages,
+        'from_cache': not stages & {'read_excel', 'stream_ingest'},
+        'elapsed_seconds': round(time.perf_counter() - start, 3)
+    }
+
+
+def merge_summaries(summaries):
+    """合并各学校当前周结果为跨校汇总（比率按课时加权）"""
+    total_hours = sum(s['metrics']['total_hours'] for s in summaries if s['metrics'])
+    overall = {
+        'schools': len(summaries),
+        'total_records': sum(s['total_records'] for s in summaries),
+        'total_hours': total_hours
+    }
+    for key in ['attendance_rate', 'micro_completion_rate', 'correctness_rate']:
+        weighted = sum(s['metrics'][key] * s['metrics']['total_hours'] for s in summaries if s['metrics'])
+        overall[key] = weighted / total_hours if total_hours > 0 else 0.0
+
+    return {
+        'overall': overall,
+        'schools': sorted(summaries, key=lambda s: s['school']),
+        'analysis_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+
+def run_batch(inputs, output_dir=DEFAULT_OUTPUT_DIR, workers=None):
+    """并行分析多个学校工作簿，返回 (汇总, 失败列表)"""
+    paths = collect_workbooks(inputs)
+    schools = school_names(paths)
+    os.makedirs(output_dir, exist_ok=True)
+    summaries, failures = [], []
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(analyze_workbook, path, output_dir, schools[path]): path for path in paths}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                summary = future.result()
+                summaries.append(summary)
+                print(f"✅ {summary['school']}: {summary['total_records']}条记录, 耗时 {summary['elapsed_seconds']}s")
+            except Exception as e:
+                failures.append({'file': path, 'error': str(e)})
+                print(f"❌ {os.path.basename(path)}: {e}")
+
+    merged = merge_summaries(summaries)
+    merged['failures'] = failures
+    summary_file = os.path.join(output_dir, 'cross_school_summary.json')
+    with open(summary_file, 'w', encoding='utf-8') as f:
+        json.dump(merged, f, ensure_ascii=False, indent=2, default=str)
+    print(f"跨校汇总已保存到: {summary_file}")
+    return merged, failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='多学校工作簿批量并行分析')
+    parser.add_argument('inputs', nargs='+', help='工作簿目录或通配符，如 data/ 或 "data/*.xlsx"')
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR, help='结果输出目录')
+    parser.add_argument('--workers', type=int, default=None, help='进程数（默认为CPU核数）')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    merged, failures = run_batch(args.inputs, args.output_dir, args.workers)
+    print(f"共分析 {merged['overall']['schools']} 所学校，失败 {len(failures)} 个，总耗时 {time.perf_counter() - start:.2f}s")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,310 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import tempfile
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import simple_analysis
+from ai_report_generator import AIReportGenerator, SectionCache
+from analysis_engine import STAT_COLUMNS, compute_class_stats, compute_weekly_trends
+from anomaly_detection import detect_anomalies
+from forecasting import forecast_series
+from data_loader import clean_data, read_workbook, write_cache
+from data_quality import QualityReport
+from intent_router import DEFAULT_INTENTS, DEFAULT_ROUTER, IntentRouter
+from synthetic_data import make_frame, make_raw_frame, write_workbook
+
+# 基准测试规模（行数）
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+# 流水线基准：超过该行数时不再生成Excel文件测量解析耗时（写入和解析都很慢）
+DEFAULT_EXCEL_MAX_ROWS = 100_000
+# 基准结果记录文件与回归判定阈值（耗时超过上次记录的倍数）
+DEFAULT_RECORD_FILE = 'benchmark_history.jsonl'
+DEFAULT_REGRESSION_THRESHOLD = 1.25
+
+
+def legacy_weekly_trends(df):
+    """原逐周过滤实现（作为对照基线）"""
+    trends = []
+    for week in sorted(df['周'].unique()):
+        week_data = df[df['周'] == week]
+        total_weight = week_data['课时数'].sum()
+        trends.append({
+            'week': week.strftime('%Y-%m-%d'),
+            'total_hours': int(total_weight),
+            'attendance_rate': float((week_data['课时平均出勤率'] * week_data['课时数']).sum() / total_weight) if total_weight != 0 else 0.0,
+            'correctness_rate': float((week_data['题目正确率（自学+快背）'] * week_data['课时数']).sum() / total_weight) if total_weight != 0 else 0.0,
+            'class_count': week_data['班级名称'].nunique()
+        })
+    return trends
+
+
+def legacy_class_stats(data):
+    """原 groupby().apply(lambda → pd.Series) 实现（作为对照基线）"""
+    return data.groupby('班级名称').apply(
+        lambda x: pd.Series({
+            '总课时': int(x['课时数'].sum()),
+            '平均出勤率': (x['课时平均出勤率'] * x['课时数']).sum() / x['课时数'].sum() if x['课时数'].sum() > 0 else 0,
+            '平均微课完成率': (x['微课完成率'] * x['课时数']).sum() / x['课时数'].sum() if x['课时数'].sum() > 0 else 0,
+            '平均题目正确率': (x['题目正确率（自学+快背）'] * x['课时数']).sum() / x['课时数'].sum() if x['课时数'].sum() > 0 else 0,
+            '涉及学科': ', '.join(x['课时学科'].dropna().unique()),
+            '记录数': len(x)
+        })
+    ).reset_index()
+
+
+def best_of(func, *args, repeat=3):
+    """多次运行取最短耗时"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_weekly_trends(sizes=DEFAULT_SIZES):
+    """对比逐周循环与单次分组实现，并输出每行耗时以验证线性扩展"""
+    print(f"{'行数':>10} {'逐周循环(s)':>12} {'单次分组(s)':>12} {'加速比':>8} {'ns/行':>8}")
+    for rows in sizes:
+        df = make_frame(rows)
+        legacy = best_of(legacy_weekly_trends, df)
+        engine = best_of(compute_weekly_trends, df)
+        print(f"{rows:>10} {legacy:>12.4f} {engine:>12.4f} {legacy / engine:>8.1f} {engine / rows * 1e9:>8.1f}")
+
+
+def bench_class_stats(sizes=DEFAULT_SIZES):
+    """对比 apply 逐组构造Series与加权聚合内核的班级统计耗时"""
+    print(f"{'行数':>10} {'apply(s)':>12} {'加权内核(s)':>12} {'加速比':>8}")
+    for rows in sizes:
+        df = make_frame(rows, classes=5000)
+        legacy = best_of(legacy_class_stats, df, repeat=1)
+        kernel = best_of(compute_class_stats, df)
+        print(f"{rows:>10} {legacy:>12.4f} {kernel:>12.4f} {legacy / kernel:>8.1f}")
+
+
+def make_queries(count, intents=DEFAULT_INTENTS, seed=0):
+    """生成混合关键词与填充文本的合成查询"""
+    rng = np.random.default_rng(seed)
+    keywords = [keyword for words in intents.values() for keyword in words]
+    fillers = ['请帮我看看', '本周', '各年级', '的情况', '分析一下', '对比', '怎么样', '教研会议用']
+    queries = []
+    for _ in range(count):
+        parts = list(rng.choice(fillers, 3)) + list(rng.choice(keywords, rng.integers(0, 4)))
+        rng.shuffle(parts)
+        queries.append(''.join(parts))
+    return queries
+
+
+def make_intents(count, keywords_per_intent=5):
+    """生成指定数量的合成意图（含默认意图）"""
+    intents = dict(DEFAULT_INTENTS)
+    for i in range(count - len(intents)):
+        intents[f'intent{i}'] = [f'主题{i}词{j}' for j in range(keywords_per_intent)]
+    return intents
+
+
+def legacy_route(query, intents):
+    """原 if/elif + any(keyword in query) 顺序扫描（作为对照基线）"""
+    query_lower = query.lower()
+    for intent, keywords in intents.items():
+        if any(keyword in query_lower for keyword in keywords):
+            return intent
+    return None
+
+
+def legacy_scored_route(query, intents):
+    """顺序扫描全部意图并统计命中次数（与意图索引功能相同的子串查找对照）"""
+    query_lower = query.lower()
+    scores = {}
+    for intent, keywords in intents.items():
+        score = sum(query_lower.count(keyword) for keyword in keywords)
+        if score:
+            scores[intent] = score
+    return sorted(scores.items(), key=lambda item: -item[1])
+
+
+def bench_query_routing(query_count=5000, intent_counts=(6, 60, 600)):
+    """对比顺序关键词扫描与意图索引在不同意图规模下的路由耗时
+
+    顺序扫描为原 if/elif 首个命中即返回；顺序计分为逐个查找子串并统计全部意图的命中（与意图索引输出相当）。
+    """
+    print(f"{'意图数':>8} {'查询数':>8} {'顺序扫描(s)':>12} {'顺序计分(s)':>12} {'意图索引(s)':>12} {'加速比':>8}")
+    for intent_count in intent_counts:
+        intents = make_intents(intent_count)
+        router = IntentRouter(intents)
+        queries = make_queries(query_count, intents)
+        legacy = best_of(lambda: [legacy_route(q, intents) for q in queries])
+        scored = best_of(lambda: [legacy_scored_route(q, intents) for q in queries])
+        indexed = best_of(lambda: [router.route(q) for q in queries])
+        print(f"{intent_count:>8} {query_count:>8} {legacy:>12.4f} {scored:>12.4f} {indexed:>12.4f} "
+              f"{scored / indexed:>8.1f}")
+
+
+def ai_queries(generator, queries):
+    """依次处理查询（同一次重复内相同小节仍命中缓存，与会话中的实际行为一致）"""
+    return [generator.process_ai_query(q) for q in queries]
+
+
+def time_stage(func, repeat):
+    """多次运行取最短耗时，同时返回最后一次的结果"""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def bench_pipeline(sizes=DEFAULT_SIZES, excel_max_rows=DEFAULT_EXCEL_MAX_ROWS, query_count=1000, repeat=3):
+    """按阶段测量完整分析流程：加载、清洗、指标、班级/学科统计、趋势、报告生成、查询路由、立方体筛选、异常检测
+
+    返回记录列表 [{'rows', 'stage', 'seconds'}, ...]。
+    """
+    records = []
+    queries = make_queries(query_count)
+    print(f"{'行数':>10} {'阶段':<16} {'耗时(s)':>10} {'行/秒':>14}")
+    for rows in sizes:
+        raw = make_raw_frame(rows, weeks=40, classes=max(30, rows // 2000), dirty_ratio=0.01)
+        stages = []
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            if rows <= excel_max_rows:
+                workbook = os.path.join(tmp_dir, 'synthetic.xlsx')
+                write_workbook(raw, workbook)
+                stages.append(('load_excel', lambda: read_workbook(workbook), 1))
+            stages.append(('clean', lambda: clean_data(raw.copy()), repeat))
+            stages.append(('clean_validate', lambda: clean_data(raw.copy(), quality=QualityReport()), repeat))
+            df = clean_data(raw.copy())
+            cache_file = os.path.join(tmp_dir, 'synthetic.parquet')
+            write_cache(df, cache_file)
+            stages.append(('load_cache', lambda: pd.read_parquet(cache_file), repeat))
+            stages.extend([
+                ('core_metrics', lambda: simple_analysis.compute_core_metrics(df), repeat),
+                ('class_stats', lambda: simple_analysis.class_stats(df), repeat),
+                ('subject_stats', lambda: simple_analysis.subject_stats(df), repeat),
+                ('weekly_trends', lambda: simple_analysis.weekly_trends(df), repeat),
+                ('build_results', lambda: simple_analysis.build_results(df, 'synthetic.xlsx'), repeat)
+            ])
+            stage_results = {}
+            for stage, func, stage_repeat in stages:
+                seconds, stage_results[stage] = time_stage(func, stage_repeat)
+                records.append({'rows': rows, 'stage': stage, 'seconds': seconds})
+                print(f"{rows:>10} {stage:<16} {seconds:>10.4f} {rows / seconds:>14,.0f}")
+
+        # 报告生成与查询处理（每次重复使用空的小节缓存，测量完整渲染而非缓存命中）、
+        # 立方体筛选（最近6周英语按周上卷）、异常检测与序列预测
+        results = stage_results['build_results']
+        cube = simple_analysis.cube(df)
+        report_stages = [
+            ('report', lambda: AIReportGenerator(results, section_cache=SectionCache()).generate_initial_report()),
+            ('query_routing', lambda: [DEFAULT_ROUTER.route(q) for q in queries]),
+            ('ai_queries', lambda: ai_queries(AIReportGenerator(results, section_cache=SectionCache()), queries)),
+            ('cube_filter', lambda: cube.slice(subjects=['英语'], last_weeks=6).stats(['周'])),
+            ('anomalies', lambda: detect_anomalies(cube.fine, STAT_COLUMNS)),
+            ('forecasts', lambda: forecast_series(cube.fine, STAT_COLUMNS))
+        ]
+        for stage, func in report_stages:
+            seconds, _ = time_stage(func, repeat)
+            records.append({'rows': rows, 'stage': stage, 'seconds': seconds})
+            print(f"{rows:>10} {stage:<16} {seconds:>10.4f} {'':>14}")
+    return records
+
+
+def git_revision():
+    """当前代码版本（非git目录时返回 None）"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(record_file):
+    """读取历史基准记录"""
+    if not os.path.exists(record_file):
+        return []
+    with open(record_file, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def find_regressions(records, history, threshold=DEFAULT_REGRESSION_THRESHOLD, host=None):
+    """与同一主机上同一规模、同一阶段的上一次记录比较，返回变慢超过阈值的阶段
+
+    耗时与机器相关，其他主机的记录不参与比较；记录文件应留在本地，不提交到仓库。
+    """
+    host = host or platform.node()
+    previous = {}
+    for record in history:
+        if record.get('host') == host:
+            previous[(record['rows'], record['stage'])] = record
+    regressions = []
+    for record in records:
+        last = previous.get((record['rows'], record['stage']))
+        if last and last['seconds'] > 0 and record['seconds'] > last['seconds'] * threshold:
+            regressions.append((record, last))
+    return regressions
+
+
+def record_results(records, record_file):
+    """追加写入基准记录（每行一条JSON，附带版本与运行环境）"""
+    run_info = {
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'host': platform.node()
+    }
+    with open(record_file, 'a', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps({**run_info, **record}, ensure_ascii=False) + '\n')
+
+
+def main(argv=None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description='分析流程基准测试')
+    parser.add_argument('sizes', nargs='*', type=int, help='数据行数（默认 10万/100万等多个规模）')
+    parser.add_argument('--suite', choices=['pipeline', 'kernels', 'routing', 'all'], default='all',
+                        help='pipeline: 分阶段流程; kernels: 新旧聚合实现对比; routing: 路由对比')
+    parser.add_argument('--excel-max-rows', type=int, default=DEFAULT_EXCEL_MAX_ROWS,
+                        help='测量Excel解析耗时的最大行数')
+    parser.add_argument('--repeat', type=int, default=3, help='每个阶段重复次数（取最短）')
+    parser.add_argument('--record', default=None, help=f'基准记录文件（如 {DEFAULT_RECORD_FILE}，本地文件，不提交），指定后追加本次结果')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+                        help='回归判定阈值（耗时超过上次记录的倍数）')
+    args = parser.parse_args(argv)
+    sizes = args.sizes or DEFAULT_SIZES
+
+    if args.suite in ('kernels', 'all'):
+        bench_weekly_trends(sizes)
+        bench_class_stats(sizes)
+    if args.suite in ('routing', 'all'):
+        bench_query_routing()
+    if args.suite not in ('pipeline', 'all'):
+        return 0
+
+    records = bench_pipeline(sizes, args.excel_max_rows, repeat=args.repeat)
+    if not args.record:
+        return 0
+
+    regressions = find_regressions(records, load_history(args.record), args.threshold)
+    record_results(records, args.record)
+    print(f"\n基准结果已追加到: {args.record}")
+    for record, last in regressions:
+        print(f"⚠️ 性能回归: {record['rows']}行 {record['stage']} "
+              f"{last['seconds']:.4f}s → {record['seconds']:.4f}s（上次版本 {last.get('revision')}）")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from data_quality import check_schema
+from run_profiler import profile_stage
+
+# 数值列（缺失或非法值按0处理）
+NUMERIC_COLS = ['课时数', '课时平均出勤率', '微课完成率', '题目正确率（自学+快背）']
+# 分组键文本列（无论读入时是整数、浮点还是混合类型，一律转为字符串）
+TEXT_KEY_COLS = ['班级名称', '课时学科']
+
+# 默认缓存目录（位于源文件同级目录下）
+CACHE_DIR_NAME = '.analysis_cache'
+# 清洗逻辑版本（清洗结果变化时递增，旧缓存随之失效）
+CLEAN_VERSION = 3
+# 清洗缓存中保存数据质量报告的Parquet元数据键
+QUALITY_METADATA_KEY = b'data_quality'
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """计算文件内容的SHA-256摘要"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_workbook(path):
+    """读取Excel工作簿"""
+    return pd.read_excel(path)
+
+
+def clean_data(df, profiler=None, quality=None):
+    """数据清洗：校验必需列、解析周次、转换数值列、填充缺失值，返回新的DataFrame（不修改传入的 df）
+
+    缺少必需列时立即抛出 DataQualityError；传入 quality（QualityReport）时在清洗前检查原始值并累加到报告。
+    """
+    check_schema(df.columns)
+
+    # 1. 解析周次与数值列（非法值记为缺失）
+    with profile_stage(profiler, 'parse_dates', len(df)):
+        weeks = pd.to_datetime(df['周'], errors='coerce')
+    with profile_stage(profiler, 'coerce_numeric', len(df)):
+        numeric = {col: pd.to_numeric(df[col], errors='coerce') for col in NUMERIC_COLS}
+
+    # 2. 数据质量检查（基于原始值，清洗后缺失与非法值已不可区分）
+    if quality is not None:
+        with profile_stage(profiler, 'validate', len(df)):
+            quality.add(df, weeks, numeric)
+
+    # 3. 删除周次为NaN的行，填充缺失值；文本列统一为字符串（缺失的班级/学科记为 "0"，与缓存读取结果一致）
+    #    班级/学科列的类型取决于读入的数据（分块读取时每块可能不同），先统一为字符串，保证 101 与 '101' 是同一分组
+    with profile_stage(profiler, 'fillna', len(df)) as stage:
+        df = df.assign(**{'周': weeks}, **numeric)
+        df = df.dropna(subset=['周'])
+        df = df.assign(**{col: _key_to_str(df[col]) for col in TEXT_KEY_COLS}).fillna(0).reset_index(drop=True)
+        _text_columns_to_str(df)
+        stage['rows'] = len(df)
+
+    return df
+
+
+def _cache_path(path, digest, cache_dir):
+    """根据源文件名、内容摘要和清洗逻辑版本生成缓存文件路径"""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, f"{stem}.{digest[:16]}-v{CLEAN_VERSION}.parquet")
+
+
+def _key_text(value):
+    """分组键的文本形式：整数值的浮点数按整数书写（含缺失值的整数列读入后为浮点）"""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _key_to_str(values):
+    """将分组键列转为字符串（缺失值记为 "0"），只对不同取值做转换"""
+    codes, uniques = pd.factorize(values)
+    texts = np.array([_key_text(value) for value in uniques] + ['0'], dtype=object)
+    return pd.Series(texts[codes], index=values.index).astype(str)
+
+
+def _text_columns_to_str(df):
+    """将混合类型的文本列原地转为字符串（填充缺失值后可能混入整数0）"""
+    for col in df.columns:
+        if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=True) != 'string':
+            df[col] = df[col].astype(str)
+
+
+def _to_arrow_safe(df):
+    """将混合类型的文本列转为字符串，便于写入Parquet"""
+    df = df.copy()
+    _text_columns_to_str(df)
+    return df
+
+
+def write_cache(df, cache_file, quality_report=None):
+    """原子写入清洗后的Parquet缓存（数据质量报告写入文件元数据）"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    tmp_file = cache_file + '.tmp'
+    table = pa.Table.from_pandas(_to_arrow_safe(df), preserve_index=False)
+    if quality_report is not None:
+        metadata = dict(table.schema.metadata or {})
+        metadata[QUALITY_METADATA_KEY] = json.dumps(quality_report, ensure_ascii=False).encode('utf-8')
+        table = table.replace_schema_metadata(metadata)
+    pq.write_table(table, tmp_file)
+    os.replace(tmp_file, cache_file)
+
+    # 清理同一源文件的旧版本缓存
+    cache_dir, cache_name = os.path.split(cache_file)
+    stem = cache_name.rsplit('.', 2)[0]
+    for name in os.listdir(cache_dir):
+        if name != cache_name and name.endswith('.parquet') and name.rsplit('.', 2)[0] == stem:
+            os.remove(os.path.join(cache_dir, name))
+
+
+def read_quality_report(cache_file):
+    """读取清洗缓存中保存的数据质量报告（旧版本缓存没有时返回 None）"""
+    import pyarrow.parquet as pq
+
+    metadata = pq.read_schema(cache_file).metadata or {}
+    if QUALITY_METADATA_KEY not in metadata:
+        return None
+    return json.loads(metadata[QUALITY_METADATA_KEY])
+
+
+def _read_and_clean(path, profiler, quality):
+    """解析Excel并清洗"""
+    with profile_stage(profiler, 'read_excel') as stage:
+        df = read_workbook(path)
+        stage['rows'] = len(df)
+    return clean_data(df, profiler, quality)
+
+
+def load_data(path, cache_dir=None, use_cache=True, profiler=None, quality=None):
+    """加载并清洗数据，源文件内容不变时直接复用Parquet缓存
+
+    返回 (df, from_cache)。传入 profiler 时记录各阶段耗时与内存；
+    传入 quality（QualityReport）时记录数据质量，命中缓存时从缓存元数据还原。
+    """
+    if not use_cache:
+        return _read_and_clean(path, profiler, quality), False
+
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR_NAME)
+    with profile_stage(profiler, 'hash_file'):
+        cache_file = _cache_path(path, file_digest(path), cache_dir)
+
+    if os.path.exists(cache_file):
+        try:
+            with profile_stage(profiler, 'read_cache') as stage:
+                report = read_quality_report(cache_file) if quality is not None else None
+                # 旧版本缓存不含质量报告，需要质量报告时重新解析
+                if quality is None or report is not None:
+                    df = pd.read_parquet(cache_file)
+                    stage['rows'] = len(df)
+                    if report is not None:
+                        quality.restore(report)
+                    return df, True
+        except Exception as e:
+            print(f"缓存读取失败，重新解析Excel: {e}")
+
+    df = _read_and_clean(path, profiler, quality)
+    try:
+        with profile_stage(profiler, 'write_cache', len(df)):
+            write_cache(df, cache_file, quality.to_dict() if quality is not None else None)
+    except Exception as e:
+        # 缺少pyarrow或目录不可写时不影响分析
+        print(f"缓存写入失败: {e}")
+    return df, False
@@ -0,0 +1,226 @@
+import numpy as np
+import pandas as pd
+from pandas.util import hash_array
+
+# 原始工作簿必须包含的列
+KEY_COLUMNS = ['周', '班级名称', '课时学科']
+# 数值列的合法取值范围（None 表示不限）：课时数非负，比率在 [0, 1]
+VALUE_RANGES = {
+    '课时数': (0, None),
+    '课时平均出勤率': (0, 1),
+    '微课完成率': (0, 1),
+    '题目正确率（自学+快背）': (0, 1)
+}
+REQUIRED_COLUMNS = KEY_COLUMNS + list(VALUE_RANGES)
+
+# 某列问题值（缺失、非数值、越界）占比超过该值时视为导出错误，分析直接失败
+ERROR_RATE = 0.5
+
+# 问题级别
+LEVEL_ERROR = 'error'
+LEVEL_WARNING = 'warning'
+
+# 重复记录检查范围：
+# all   跨块精确统计，每行保留8字节哈希直到生成报告，内存随总行数增长（一次性读取时使用）；
+# chunk 只在每块内部统计，块处理完即释放哈希，内存只取决于块大小，但跨块的重复记录不计入（分块读取时的默认值）；
+# off   不检查重复记录
+DUPLICATES_ALL = 'all'
+DUPLICATES_CHUNK = 'chunk'
+DUPLICATES_OFF = 'off'
+DUPLICATE_SCOPES = (DUPLICATES_ALL, DUPLICATES_CHUNK, DUPLICATES_OFF)
+
+
+class DataQualityError(ValueError):
+    """数据不满足分析的基本要求（缺少必需列、没有有效行或问题值占比过高）"""
+
+    def __init__(self, message, report=None):
+        super().__init__(message)
+        self.report = report
+
+
+def check_schema(columns):
+    """检查必需列是否齐全，缺少时立即失败（在解析任何数据之前）"""
+    missing = [col for col in REQUIRED_COLUMNS if col not in columns]
+    if missing:
+        raise DataQualityError(f"数据缺少必需列: {', '.join(missing)}")
+
+
+# 组合各列哈希时使用的乘数（奇数，溢出按 2^64 取模）
+HASH_MULTIPLIER = np.uint64(0x100000001B3)
+
+
+def _ratio(count, total):
+    return round(count / total, 6) if total else 0.0
+
+
+def _count_repeats(hashes):
+    """哈希数组中重复出现的个数（排序后比较相邻哈希）"""
+    if hashes is None or len(hashes) < 2:
+        return 0
+    hashes = np.sort(hashes)
+    return int((hashes[1:] == hashes[:-1]).sum())
+
+
+def row_hashes(columns):
+    """逐行组合各列取值的64位哈希
+
+    数值与日期列直接计算；文本列先编码，只对不同取值计算哈希再按编码展开（缺失值编码为 -1，对应末尾的固定哈希）。
+    """
+    hashes = None
+    for values in columns:
+        if values.dtype.kind in 'biufmM':
+            column_hash = hash_array(values.to_numpy())
+        else:
+            codes, uniques = pd.factorize(values)
+            column_hash = np.append(hash_array(np.asarray(uniques, dtype=object)), np.uint64(0))[codes]
+        hashes = column_hash if hashes is None else hashes * HASH_MULTIPLIER ^ column_hash
+    return hashes
+
+
+class QualityReport:
+    """数据质量报告
+
+    对清洗前的原始数据逐列做向量化检查：缺失值、非数值、越界值、无法解析的周次与完全重复的记录。
+    各计数可以按块累加（分块读取时共用一个报告），重复记录按 duplicate_scope 统计（见 DUPLICATES_ALL 等）；
+    to_dict 生成随结果保存的报告，restore 由已保存的报告还原（命中清洗缓存时使用）。
+    """
+
+    def __init__(self, duplicate_scope=DUPLICATES_ALL):
+        if duplicate_scope not in DUPLICATE_SCOPES:
+            raise ValueError(f"不支持的重复记录检查范围: {duplicate_scope}（可选 {', '.join(DUPLICATE_SCOPES)}）")
+        self.duplicate_scope = duplicate_scope
+        self.rows = 0
+        self.invalid_weeks = 0
+        self.missing = {col: 0 for col in REQUIRED_COLUMNS}
+        self.non_numeric = {col: 0 for col in VALUE_RANGES}
+        self.out_of_range = {col: 0 for col in VALUE_RANGES}
+        self.extra_columns = []
+        self._duplicates = 0
+        self._hashes = []
+
+    def add(self, df, weeks=None, numeric=None):
+        """检查一块原始数据
+
+        weeks 为已解析的周次、numeric 为已转换的数值列（清洗过程中已计算时传入，避免重复解析）。
+        """
+        check_schema(df.columns)
+        if weeks is None:
+            weeks = pd.to_datetime(df['周'], errors='coerce')
+        if numeric is None:
+            numeric = {col: pd.to_numeric(df[col], errors='coerce') for col in VALUE_RANGES}
+
+        self.rows += len(df)
+        for col in df.columns:
+            if col not in REQUIRED_COLUMNS and col not in self.extra_columns:
+                self.extra_columns.append(str(col))
+        for col in REQUIRED_COLUMNS:
+            self.missing[col] += int(df[col].isna().sum())
+        self.invalid_weeks += int(weeks.isna().sum()) - int(df['周'].isna().sum())
+
+        for col, (low, high) in VALUE_RANGES.items():
+            values = numeric[col].to_numpy(dtype=float)
+            self.non_numeric[col] += int(np.isnan(values).sum()) - int(df[col].isna().sum())
+            bad = np.zeros(len(values), dtype=bool)
+            if low is not None:
+                bad |= values < low
+            if high is not None:
+                bad |= values > high
+            self.out_of_range[col] += int(bad.sum())
+
+        # 完全相同的记录：解析后的各列一起计算行哈希，跨块统计时保留到生成报告，块内统计时立即计数
+        if self.duplicate_scope != DUPLICATES_OFF:
+            hashes = row_hashes([weeks, df['班级名称'], df['课时学科']] + list(numeric.values()))
+            if self.duplicate_scope == DUPLICATES_ALL:
+                self._hashes.append(hashes)
+            else:
+                self._duplicates += _count_repeats(hashes)
+        return self
+
+    def duplicate_rows(self):
+        """重复出现的记录数（每组相同记录中第一条之外的行数）"""
+        if not self._hashes:
+            return self._duplicates
+        return self._duplicates + _count_repeats(np.concatenate(self._hashes))
+
+    def issues(self, usable_rows, duplicates):
+        """问题清单：每条为 {'level', 'code', 'column', 'count', 'rate', 'message'}"""
+        issues = []
+        if usable_rows == 0:
+            issues.append({
+                'level': LEVEL_ERROR, 'code': 'no_usable_rows', 'column': '周', 'count': self.rows,
+                'rate': 1.0, 'message': "没有周次有效的数据行"
+            })
+
+        def add(code, column, count, label):
+            if count == 0:
+                return
+            rate = _ratio(count, self.rows)
+            issues.append({
+                'level': LEVEL_ERROR if rate > ERROR_RATE else LEVEL_WARNING,
+                'code': code, 'column': column, 'count': count, 'rate': rate,
+                'message': f"{column}: {count} 行{label}（{rate * 100:.1f}%）"
+            })
+
+        add('invalid_week', '周', self.invalid_weeks + self.missing['周'], '周次缺失或无法解析，已删除')
+        for col in ['班级名称', '课时学科']:
+            add('missing', col, self.missing[col], '缺失')
+        for col, (low, high) in VALUE_RANGES.items():
+            add('missing', col, self.missing[col], '缺失，已按0处理')
+            add('non_numeric', col, self.non_numeric[col], '不是数值，已按0处理')
+            bound = f"[{low}, {high}]" if high is not None else f"不小于{low}"
+            add('out_of_range', col, self.out_of_range[col], f"超出合法范围 {bound}")
+        if duplicates:
+            scope = "同一块内的" if self.duplicate_scope == DUPLICATES_CHUNK else ""
+            issues.append({
+                'level': LEVEL_WARNING, 'code': 'duplicate_rows', 'column': None, 'count': duplicates,
+                'rate': _ratio(duplicates, self.rows), 'message': f"{duplicates} 行与{scope}其他记录完全相同"
+            })
+        return issues
+
+    def to_dict(self):
+        """机器可读的质量报告（随分析结果保存）"""
+        usable_rows = self.rows - self.invalid_weeks - self.missing['周']
+        duplicates = self.duplicate_rows()
+        issues = self.issues(usable_rows, duplicates)
+        levels = {issue['level'] for issue in issues}
+        status = LEVEL_ERROR if LEVEL_ERROR in levels else LEVEL_WARNING if levels else 'ok'
+        columns = {}
+        for col in REQUIRED_COLUMNS:
+            columns[col] = {'missing': self.missing[col], 'missing_rate': _ratio(self.missing[col], self.rows)}
+            if col in VALUE_RANGES:
+                columns[col]['non_numeric'] = self.non_numeric[col]
+                columns[col]['out_of_range'] = self.out_of_range[col]
+                columns[col]['range'] = list(VALUE_RANGES[col])
+        return {
+            'status': status,
+            'rows': self.rows,
+            'usable_rows': usable_rows,
+            'invalid_weeks': self.invalid_weeks,
+            'duplicate_rows': duplicates,
+            'duplicate_scope': self.duplicate_scope,
+            'extra_columns': list(self.extra_columns),
+            'columns': columns,
+            'issues': issues
+        }
+
+    def restore(self, report):
+        """由已保存的报告还原各计数（重复记录数直接沿用），返回自身"""
+        self.__init__(report.get('duplicate_scope', DUPLICATES_ALL))
+        self.rows = report['rows']
+        self.invalid_weeks = report['invalid_weeks']
+        self.extra_columns = list(report['extra_columns'])
+        self._duplicates = report['duplicate_rows']
+        for col, stats in report['columns'].items():
+            self.missing[col] = stats['missing']
+            if col in VALUE_RANGES:
+                self.non_numeric[col] = stats['non_numeric']
+                self.out_of_range[col] = stats['out_of_range']
+        return self
+
+    def check(self):
+        """存在错误级问题时失败，返回质量报告"""
+        report = self.to_dict()
+        errors = [issue['message'] for issue in report['issues'] if issue['level'] == LEVEL_ERROR]
+        if errors:
+            raise DataQualityError("数据质量检查未通过: " + "；".join(errors), report)
+        return report
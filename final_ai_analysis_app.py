@@ -1,13 +1,26 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import json
 import datetime
 import plotly.graph_objects as go
 import plotly.express as px
 from datetime import datetime as dt
+import os
+import time
 import base64
+import hashlib
 from io import BytesIO
+import simple_analysis
+from data_loader import file_digest
+from metrics_cube import MetricsCube
+from analysis_engine import STAT_COLUMNS
+from anomaly_detection import RULE_LABELS, detect_anomalies
+from forecasting import FORECAST_HORIZON, forecast_summary, forecast_trends
+from results_store import DEFAULT_STORE_DIR, MANIFEST_FILE, ResultsStore
+from shared_cache import SharedResultsCache, load_cached_results
+from session_report import ReportSessionStore
+from job_queue import AnalysisJobQueue, JOB_DONE, JOB_FAILED, JOB_PENDING
+from report_export import EXPORT_FORMATS, TABLE_SHEETS, export_report, export_tables
 
 # ==========================================
 # 页面配置
@@ -161,17 +174,117 @@ st.markdown("""
 # ==========================================
 # 加载分析结果
 # ==========================================
-@st.cache_data
+# 数据目录与预计算结果文件
+DATA_DIR = '/home/workspace/attachments'
+RESULTS_FILE = '/home/workspace/analysis_results.json'
+STORE_DIR = DEFAULT_STORE_DIR
+# 后台分析任务状态轮询间隔（秒）
+JOB_POLL_SECONDS = 1.0
+# AI报告中完整显示的最近小节数
+REPORT_RECENT_SECTIONS = 3
+
+@st.cache_resource(max_entries=4)
+def open_results_store(store_dir, manifest_mtime):
+    """打开列式结果存储（进程内共享，清单更新后自动重新打开）"""
+    return ResultsStore(store_dir)
+
+@st.cache_resource
+def shared_results_cache():
+    """进程内共享的只读结果缓存（所有会话共用同一份结果，按数据集LRU淘汰）"""
+    return SharedResultsCache()
+
 def load_analysis_results():
-    """加载分析结果"""
+    """加载分析结果：优先读取列式结果存储的清单，大表按需读取
+
+    结果按文件修改时间缓存在共享缓存中，各会话不再各自复制一份。
+    """
     try:
-        with open('/home/workspace/analysis_results.json', 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return load_cached_results(shared_results_cache(), STORE_DIR, RESULTS_FILE)
     except FileNotFoundError:
         st.error("分析结果文件未找到，请先运行数据分析")
         return None
 
-analysis_results = load_analysis_results()
+@st.cache_data(max_entries=256)
+def workbook_digest(path, mtime, size):
+    """按文件路径、修改时间和大小缓存内容哈希，避免每次重跑都重新读取文件"""
+    return file_digest(path)
+
+@st.cache_resource
+def analysis_job_queue():
+    """进程内共享的分析任务队列（所有会话共用，相同输入只计算一次，结果写入共享缓存）"""
+    return AnalysisJobQueue(cache=shared_results_cache())
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def watch_analysis_job(job_key):
+    """轮询后台分析任务，完成或失败时触发整页重跑"""
+    job = analysis_job_queue().job(job_key)
+    if job is None or job['status'] in (JOB_DONE, JOB_FAILED):
+        st.rerun()
+    waited = time.time() - job['submitted']
+    label = "排队中" if job['status'] == JOB_PENDING else "分析中"
+    st.info(f"🤖 工作簿{label}：{job['label']}（已等待 {waited:.0f} 秒）")
+
+def request_analysis(job_key, label, func, *args):
+    """提交（或复用）后台分析任务；结果就绪时返回，否则显示任务状态并返回 None"""
+    queue = analysis_job_queue()
+    queue.submit(job_key, func, *args, label=label)
+    results = queue.result(job_key)
+    if results is not None:
+        return results
+    job = queue.job(job_key)
+    if job is not None and job['status'] == JOB_FAILED:
+        st.error(f"分析失败：{job['error']}")
+        if st.button("🔁 重试", key=f"retry_{job_key}"):
+            queue.retry(job_key)
+            st.rerun()
+        return None
+    watch_analysis_job(job_key)
+    return None
+
+def list_data_workbooks():
+    """列出数据目录中的工作簿"""
+    if not os.path.isdir(DATA_DIR):
+        return []
+    return sorted(
+        name for name in os.listdir(DATA_DIR)
+        if name.endswith(('.xlsx', '.xls')) and not name.startswith('~$')
+    )
+
+with st.sidebar:
+    st.markdown("## 📁 数据来源")
+    data_workbooks = list_data_workbooks()
+    source_options = ["上传工作簿", "数据目录", "预计算结果"]
+    data_source = st.radio(
+        "选择数据来源",
+        source_options,
+        index=1 if data_workbooks else 2,
+        horizontal=True
+    )
+
+    analysis_results = None
+    if data_source == "上传工作簿":
+        uploaded_file = st.file_uploader("上传Excel工作簿", type=['xlsx', 'xls'])
+        if uploaded_file is not None:
+            content = uploaded_file.getvalue()
+            job_key = f"upload:{hashlib.sha256(content).hexdigest()}:{uploaded_file.name}"
+            analysis_results = request_analysis(
+                job_key, uploaded_file.name, simple_analysis.analyze_bytes, content, uploaded_file.name
+            )
+        else:
+            st.info("请上传工作簿，或切换到其他数据来源")
+    elif data_source == "数据目录":
+        if data_workbooks:
+            selected_workbook = st.selectbox("选择工作簿", data_workbooks)
+            workbook_path = os.path.join(DATA_DIR, selected_workbook)
+            stat = os.stat(workbook_path)
+            job_key = f"file:{workbook_digest(workbook_path, stat.st_mtime_ns, stat.st_size)}:{workbook_path}"
+            analysis_results = request_analysis(
+                job_key, selected_workbook, simple_analysis.analyze_file, workbook_path
+            )
+        else:
+            st.warning(f"数据目录 {DATA_DIR} 中没有工作簿")
+    else:
+        analysis_results = load_analysis_results()
 
 if analysis_results is None:
     st.stop()
@@ -185,9 +298,190 @@ best_class = analysis_results['best_class']
 focus_class = analysis_results['focus_class']
 top_subjects = analysis_results['top_subjects']
 weekly_trends = analysis_results['weekly_trends']
+anomalies = analysis_results.get('anomalies')
+forecasts = analysis_results.get('forecasts')
 
 current_metrics = current_week['metrics']
 
+# ==========================================
+# 班级明细数据处理
+# ==========================================
+CLASS_STATUSES = ['优秀', '良好', '一般', '需关注']
+CLASS_SORT_FIELDS = {
+    '综合得分': '综合得分',
+    '总课时': '总课时',
+    '出勤率': '出勤率',
+    '正确率': '正确率',
+    '微课完成率': '微课完成率',
+    '班级名称': '班级名称'
+}
+
+def table_source(results, name):
+    """结果中的大表：列式字典，或列式结果存储中按需内存映射的Arrow表"""
+    stats = results.get(name)
+    if stats is not None:
+        return stats
+    store_dir = results.get('store_dir')
+    if store_dir and ResultsStore.exists(store_dir):
+        manifest_mtime = os.path.getmtime(os.path.join(store_dir, MANIFEST_FILE))
+        store = open_results_store(store_dir, manifest_mtime)
+        if name in store.table_names():
+            return store.table(name)
+    return None
+
+def class_week_frame(results):
+    """将结果中的列式班级周统计转为DataFrame"""
+    source = table_source(results, 'class_week_stats')
+    if source is None:
+        return None
+    return pd.DataFrame(source) if isinstance(source, dict) else source.to_pandas()
+
+def export_sheets(results):
+    """导出的表格：周趋势 + 班级/学科周统计"""
+    sheets = {'周趋势': results['weekly_trends']}
+    for name, sheet_name in TABLE_SHEETS.items():
+        source = table_source(results, name)
+        if source is not None:
+            sheets[sheet_name] = source
+    return sheets
+
+def filter_class_table(class_week_df, week, week_metrics, name_filter, statuses, sort_field, ascending):
+    """按周次、名称、状态筛选班级并排序"""
+    df = class_week_df[class_week_df['周'] == week].copy()
+    
+    # 状态：综合得分的周内百分位；出勤高于平均但正确率低于平均的标记为需关注
+    pct = df['综合得分'].rank(pct=True)
+    status = np.where(pct >= 0.75, '优秀', np.where(pct >= 0.4, '良好', '一般'))
+    if week_metrics:
+        focus = (
+            (df['平均出勤率'] > week_metrics['attendance_rate']) &
+            (df['平均题目正确率'] < week_metrics['correctness_rate'])
+        )
+        status = np.where(focus, '需关注', status)
+    df['状态'] = status
+    
+    df['出勤率'] = df['平均出勤率'] * 100
+    df['微课完成率'] = df['平均微课完成率'] * 100
+    df['正确率'] = df['平均题目正确率'] * 100
+    
+    if name_filter:
+        df = df[df['班级名称'].str.contains(name_filter, regex=False)]
+    if statuses:
+        df = df[df['状态'].isin(statuses)]
+    return df.sort_values(sort_field, ascending=ascending, kind='stable')
+
+# ==========================================
+# 数据筛选（周次范围 / 年级 / 班级 / 学科）
+# ==========================================
+@st.cache_resource(max_entries=8)
+def load_metrics_cube(cube_key, _source):
+    """由结果中的 metrics_cube 表还原指标立方体（进程内共享，按结果版本缓存）"""
+    return MetricsCube.from_columnar(_source)
+
+def results_cube(results):
+    """当前结果对应的指标立方体；结果不含立方体（旧版本结果）时返回 None"""
+    source = table_source(results, 'metrics_cube')
+    if source is None:
+        return None
+    cube_key = (results['file_info']['file_name'], results['analysis_time'], id(source))
+    return cube_key, load_metrics_cube(cube_key, source)
+
+def class_grades(classes):
+    """按班级名称前缀（如 2024级）分组，无法识别年级的班级归入“其他”"""
+    grades = pd.Series(classes, dtype=object).str.extract(r'^(\d+级)', expand=False).fillna('其他')
+    return {grade: list(names) for grade, names in pd.Series(classes, dtype=object).groupby(grades)}
+
+@st.cache_resource(max_entries=16)
+def dimension_tables(cube_key, _cube, classes, subjects):
+    """按班级/学科筛选后的逐周数据（周趋势、班级周统计），与周次范围无关，进程内共享
+
+    拖动周次范围时只按周过滤这里的结果，不重新上卷；调用方不得修改返回的表。
+    """
+    cube = _cube.slice(classes=list(classes) or None, subjects=list(subjects) or None)
+    class_week_df = cube.class_week_stats()
+    class_week_df['周'] = class_week_df['周'].dt.strftime('%Y-%m-%d')
+    return cube, cube.weekly_trends(), class_week_df
+
+@st.cache_data(max_entries=64)
+def filtered_view(cube_key, _cube, week_range, classes, subjects):
+    """筛选后的看板数据：当前周/前一周指标、周趋势、课时最多的学科、班级周统计、异常预警与趋势预测
+
+    全部由立方体切片上卷得到，不读取原始记录；结构与结果文档中的对应小节一致。筛选后无数据时返回 None。
+    """
+    start, end = week_range
+    cube, weekly_trends, class_week_df = dimension_tables(cube_key, _cube, classes, subjects)
+    cube = cube.slice(start=start, end=end)
+    if len(cube) == 0:
+        return None
+    current = cube.current_week()
+    previous = cube.previous_week()
+    subject_stats = current.subject_stats().sort_values('总课时', ascending=False).head(5)
+    # ISO日期字符串可直接按字典序比较
+    weekly_trends = [week for week in weekly_trends if start <= week['week'] <= end]
+    return {
+        'current_week': {'date': current.weeks()[-1].strftime('%Y-%m-%d'), 'metrics': current.metrics()},
+        'previous_week': {
+            'date': previous.weeks()[-1].strftime('%Y-%m-%d') if len(previous) > 0 else None,
+            'metrics': previous.metrics()
+        },
+        'weekly_trends': weekly_trends,
+        'top_subjects': subject_stats[['课时学科', '总课时', '平均题目正确率', '涉及班级数']].to_dict('records'),
+        'class_week_stats': class_week_df[class_week_df['周'].between(start, end)],
+        # 以范围内最后一周为当前周检测
+        'anomalies': detect_anomalies(cube.fine, STAT_COLUMNS),
+        'forecasts': forecast_summary(weekly_trends, cube.fine, STAT_COLUMNS)
+    }
+
+# 筛选条件未改动时直接使用结果文档中的小节
+filtered = None
+with st.sidebar:
+    st.markdown("## 🔎 数据筛选")
+    cube_entry = results_cube(analysis_results)
+    if cube_entry is None or len(cube_entry[1]) == 0:
+        st.caption("当前分析结果不含指标立方体，请重新运行分析后使用筛选")
+    else:
+        cube_key, cube = cube_entry
+        # 筛选控件按数据集区分，切换数据集时不沿用不存在的取值
+        filter_scope = f"{file_info['file_name']}:{analysis_results['analysis_time']}"
+        week_options = [week.strftime('%Y-%m-%d') for week in cube.weeks()]
+        if len(week_options) > 1:
+            week_range = st.select_slider(
+                "周次范围",
+                options=week_options,
+                value=(week_options[0], week_options[-1]),
+                key=f"filter_weeks:{filter_scope}"
+            )
+        else:
+            week_range = (week_options[0], week_options[-1])
+        grade_classes = class_grades(cube.classes())
+        selected_grades = st.multiselect("年级", list(grade_classes), key=f"filter_grades:{filter_scope}")
+        class_options = [name for grade in (selected_grades or grade_classes) for name in grade_classes[grade]]
+        selected_classes = st.multiselect("班级", class_options, key=f"filter_classes:{filter_scope}")
+        selected_subjects = st.multiselect("学科", cube.subjects(), key=f"filter_subjects:{filter_scope}")
+
+        # 只选年级时筛选该年级的全部班级
+        filter_classes = selected_classes or (class_options if selected_grades else [])
+        if (week_range[0], week_range[1]) != (week_options[0], week_options[-1]) or filter_classes or selected_subjects:
+            filtered = filtered_view(
+                cube_key, cube, tuple(week_range), tuple(sorted(filter_classes)), tuple(sorted(selected_subjects))
+            )
+            if filtered is None:
+                st.warning("筛选条件下没有数据")
+                st.stop()
+            st.caption(
+                f"已筛选：{week_range[0]} 至 {week_range[1]}"
+                + (f" · {len(filter_classes)} 个班级" if filter_classes else "")
+                + (f" · {len(selected_subjects)} 个学科" if selected_subjects else "")
+            )
+
+if filtered is not None:
+    current_week = filtered['current_week']
+    current_metrics = current_week['metrics']
+    weekly_trends = filtered['weekly_trends']
+    top_subjects = filtered['top_subjects']
+    anomalies = filtered['anomalies']
+    forecasts = filtered['forecasts']
+
 # ==========================================
 # 侧边栏 - 控制面板
 # ==========================================
@@ -231,12 +525,22 @@ with st.sidebar:
     col1, col2 = st.columns(2)
     with col1:
         if st.button("🔄 重新分析", use_container_width=True):
-            st.cache_data.clear()
+            # 后台分析任务按内容哈希去重，预计算结果按文件修改时间缓存，数据未变化时直接复用
+            workbook_digest.clear()
             st.rerun()
     
     with col2:
-        if st.button("📊 导出数据", use_container_width=True):
-            st.success("数据导出功能已准备")
+        # 点击时才生成XLSX（逐块写出，不在每次重跑时构建）；下载按钮会把整个文件读入内存，
+        # 大数据量请通过 API 的 /api/export/tables 流式下载
+        st.download_button(
+            "📊 导出数据",
+            data=lambda: export_tables(export_sheets(analysis_results)),
+            file_name=f"教学数据_{analysis_results['current_week']['date']}.{EXPORT_FORMATS['xlsx'][0]}",
+            mime=EXPORT_FORMATS['xlsx'][1],
+            on_click="ignore",
+            help="数据量很大时请通过 API /api/export/tables 流式下载",
+            use_container_width=True
+        )
     
     # 信息面板
     st.markdown("---")
@@ -247,21 +551,248 @@ with st.sidebar:
     **时间范围**: {file_info['date_range']['start']} 至 {file_info['date_range']['end']}
     **分析时间**: {analysis_results['analysis_time']}
     """)
+    
+    # 最近一次分析运行的阶段耗时与内存
+    run_profile = analysis_results.get('run_profile')
+    if run_profile:
+        with st.expander(f"⏱️ 运行概况（{run_profile['total_seconds']:.2f} 秒）"):
+            peak_rss = run_profile.get('peak_rss_mb')
+            st.caption(
+                f"运行于 {run_profile['started']} · CPU {run_profile['cpu_seconds']:.2f} 秒"
+                + (f" · 峰值内存 {peak_rss:.0f} MB" if peak_rss is not None else "")
+            )
+            st.dataframe(
+                pd.DataFrame([{
+                    '阶段': '　' * stage['depth'] + stage['name'],
+                    '耗时(秒)': stage['wall_seconds'],
+                    'CPU(秒)': stage['cpu_seconds'],
+                    '行数': stage['rows'],
+                    '峰值内存(MB)': stage['peak_rss_mb']
+                } for stage in run_profile['stages']]),
+                column_config={
+                    '耗时(秒)': st.column_config.NumberColumn(format='%.3f'),
+                    'CPU(秒)': st.column_config.NumberColumn(format='%.3f')
+                },
+                hide_index=True,
+                use_container_width=True
+            )
+
+    # 读取时的数据质量检查（有问题时默认展开）
+    data_quality = analysis_results.get('data_quality')
+    if data_quality:
+        quality_icon = {'ok': '✅', 'warning': '⚠️', 'error': '❌'}[data_quality['status']]
+        with st.expander(
+            f"{quality_icon} 数据质量（有效行 {data_quality['usable_rows']}/{data_quality['rows']}）",
+            expanded=bool(data_quality['issues'])
+        ):
+            if data_quality['issues']:
+                for issue in data_quality['issues']:
+                    st.caption(issue['message'])
+            else:
+                st.caption("未发现缺失、非数值、越界或重复记录")
+            duplicate_scope = data_quality.get('duplicate_scope')
+            if duplicate_scope == 'chunk':
+                st.caption("分块读取：重复记录只在每个读取块内比较")
+            elif duplicate_scope == 'off':
+                st.caption("分块读取：未检查重复记录")
+
+    cache_stats = shared_results_cache().stats()
+    st.caption(f"共享结果缓存：{cache_stats['entries']} 个数据集，约 {cache_stats['bytes'] / 1024 / 1024:.1f} MB")
+    
+    # 后台分析任务表
+    analysis_jobs = analysis_job_queue().jobs()
+    if analysis_jobs:
+        with st.expander(f"⏳ 分析任务（{len(analysis_jobs)}）"):
+            st.dataframe(
+                pd.DataFrame([{
+                    '工作簿': job['label'],
+                    '状态': job['status'],
+                    '耗时(秒)': round((job['finished'] or time.time()) - (job['started'] or job['submitted']), 1)
+                } for job in analysis_jobs]),
+                hide_index=True,
+                use_container_width=True
+            )
 
 # ==========================================
-# 主内容区域 - 标签页
+# 图表构建（按输入数据缓存，重跑时不重复构建）
 # ==========================================
-tab1, tab2, tab3, tab4 = st.tabs([
-    "📈 核心指标", 
-    "🏫 班级分析", 
-    "📚 学科分析", 
-    "🤖 AI协作"
-])
+@st.cache_data(max_entries=32)
+def trend_forecast(weekly_trends):
+    """整体指标的趋势预测（按周趋势内容缓存，有新的周次时才重新拟合）"""
+    return forecast_trends(weekly_trends)
+
+# 预测线的颜色与坐标轴（与历史折线一致）；比率按百分比显示
+FORECAST_TRACES = {
+    'total_hours': ('总课时', '#3498db', 'rgba(52, 152, 219, 0.15)', 'y', 1),
+    'attendance_rate': ('出勤率', '#2ecc71', 'rgba(46, 204, 113, 0.15)', 'y2', 100),
+    'correctness_rate': ('正确率', '#e74c3c', 'rgba(231, 76, 60, 0.15)', 'y2', 100)
+}
+
+def add_forecast_traces(fig, trend_df, forecast):
+    """在趋势图上叠加预测虚线与95%预测区间（从最后一个实际周次接续）"""
+    last = trend_df.iloc[-1]
+    weeks = [last['week']] + list(pd.to_datetime(forecast['weeks']))
+    for key, (name, color, fill, axis, scale) in FORECAST_TRACES.items():
+        metric = forecast['metrics'].get(key)
+        if metric is None:
+            continue
+        anchor = float(last[key])
+        upper = [anchor] + metric['upper']
+        lower = [anchor] + metric['lower']
+        if None not in upper + lower:
+            fig.add_trace(go.Scatter(
+                x=weeks + weeks[::-1],
+                y=[v * scale for v in upper + lower[::-1]],
+                fill='toself',
+                fillcolor=fill,
+                line=dict(width=0),
+                hoverinfo='skip',
+                showlegend=False,
+                yaxis=axis
+            ))
+        fig.add_trace(go.Scatter(
+            x=weeks,
+            y=[v * scale for v in [anchor] + metric['values']],
+            name=f'{name}预测',
+            line=dict(color=color, width=2, dash='dash'),
+            mode='lines',
+            yaxis=axis
+        ))
+
+@st.cache_data(max_entries=32)
+def trend_figure(weekly_trends, forecast=None):
+    """教学指标历史趋势折线图（传入 forecast 时叠加未来几周的预测）"""
+    trend_df = pd.DataFrame(weekly_trends)
+    trend_df['week'] = pd.to_datetime(trend_df['week'])
+    
+    fig = go.Figure()
+    
+    # 添加总课时折线
+    fig.add_trace(go.Scatter(
+        x=trend_df['week'],
+        y=trend_df['total_hours'],
+        name='总课时',
+        line=dict(color='#3498db', width=3),
+        mode='lines+markers'
+    ))
+    
+    # 添加出勤率折线（次坐标轴）
+    fig.add_trace(go.Scatter(
+        x=trend_df['week'],
+        y=trend_df['attendance_rate']*100,
+        name='出勤率',
+        line=dict(color='#2ecc71', width=3),
+        mode='lines+markers',
+        yaxis='y2'
+    ))
+    
+    # 添加正确率折线（次坐标轴）
+    fig.add_trace(go.Scatter(
+        x=trend_df['week'],
+        y=trend_df['correctness_rate']*100,
+        name='正确率',
+        line=dict(color='#e74c3c', width=3),
+        mode='lines+markers',
+        yaxis='y2'
+    ))
+    
+    if forecast and forecast['metrics']:
+        add_forecast_traces(fig, trend_df, forecast)
+    
+    fig.update_layout(
+        title='教学指标历史趋势',
+        xaxis_title='周次',
+        yaxis_title='总课时（课时）',
+        yaxis2=dict(
+            title='百分比（%）',
+            overlaying='y',
+            side='right'
+        ),
+        hovermode='x unified',
+        template='plotly_white',
+        height=500,
+        legend=dict(
+            orientation='h',
+            yanchor='bottom',
+            y=1.02,
+            xanchor='right',
+            x=1
+        )
+    )
+    return fig
+
+@st.cache_data(max_entries=64)
+def radar_figure(radar_classes):
+    """班级综合表现雷达图（radar_classes 含 班级名称/总课时/出勤率/正确率）"""
+    categories = ['课时数', '出勤率', '正确率']
+    max_hours = max(radar_classes['总课时'].max(), 1)
+    
+    fig = go.Figure()
+    
+    for class_data in radar_classes.to_dict('records'):
+        values = [
+            class_data['总课时'] / max_hours,  # 按所选班级最大课时归一化
+            class_data['出勤率'] / 100,
+            class_data['正确率'] / 100
+        ]
+        
+        fig.add_trace(go.Scatterpolar(
+            r=values,
+            theta=categories,
+            fill='toself',
+            name=class_data['班级名称'],
+            line=dict(width=2)
+        ))
+    
+    fig.update_layout(
+        polar=dict(
+            radialaxis=dict(
+                visible=True,
+                range=[0, 1]
+            )
+        ),
+        showlegend=True,
+        title='班级综合表现对比',
+        height=500
+    )
+    return fig
+
+@st.cache_data(max_entries=32)
+def subject_figures(subject_df):
+    """学科课时分布饼图与正确率柱状图"""
+    # 课时分布饼图
+    fig1 = px.pie(
+        subject_df,
+        values='课时数',
+        names='学科',
+        title='学科课时分布',
+        hole=0.3,
+        color_discrete_sequence=px.colors.qualitative.Set3
+    )
+    fig1.update_traces(textposition='inside', textinfo='percent+label')
+    
+    # 正确率柱状图
+    fig2 = px.bar(
+        subject_df,
+        x='学科',
+        y='平均正确率',
+        title='学科平均正确率对比',
+        color='平均正确率',
+        color_continuous_scale='RdYlGn'
+    )
+    fig2.update_layout(
+        yaxis_title='正确率（%）',
+        xaxis_title='学科',
+        coloraxis_showscale=False
+    )
+    return fig1, fig2
 
 # ==========================================
 # 标签页1: 核心指标
 # ==========================================
-with tab1:
+@st.fragment
+def render_core_tab():
+    """标签页1：核心指标与历史趋势"""
     st.markdown('<h2 class="sub-header">📈 本周核心教学指标</h2>', unsafe_allow_html=True)
     
     # 关键指标卡片
@@ -354,70 +885,20 @@ with tab1:
     if show_charts and len(weekly_trends) > 0:
         st.markdown('<h3 class="sub-header">📊 历史趋势图表</h3>', unsafe_allow_html=True)
         
-        # 准备数据
-        trend_df = pd.DataFrame(weekly_trends)
-        trend_df['week'] = pd.to_datetime(trend_df['week'])
-        
-        # 创建图表
-        fig = go.Figure()
-        
-        # 添加总课时折线
-        fig.add_trace(go.Scatter(
-            x=trend_df['week'],
-            y=trend_df['total_hours'],
-            name='总课时',
-            line=dict(color='#3498db', width=3),
-            mode='lines+markers'
-        ))
-        
-        # 添加出勤率折线（次坐标轴）
-        fig.add_trace(go.Scatter(
-            x=trend_df['week'],
-            y=trend_df['attendance_rate']*100,
-            name='出勤率',
-            line=dict(color='#2ecc71', width=3),
-            mode='lines+markers',
-            yaxis='y2'
-        ))
-        
-        # 添加正确率折线（次坐标轴）
-        fig.add_trace(go.Scatter(
-            x=trend_df['week'],
-            y=trend_df['correctness_rate']*100,
-            name='正确率',
-            line=dict(color='#e74c3c', width=3),
-            mode='lines+markers',
-            yaxis='y2'
-        ))
-        
-        # 更新布局
-        fig.update_layout(
-            title='教学指标历史趋势',
-            xaxis_title='周次',
-            yaxis_title='总课时（课时）',
-            yaxis2=dict(
-                title='百分比（%）',
-                overlaying='y',
-                side='right'
-            ),
-            hovermode='x unified',
-            template='plotly_white',
-            height=500,
-            legend=dict(
-                orientation='h',
-                yanchor='bottom',
-                y=1.02,
-                xanchor='right',
-                x=1
+        forecast = trend_forecast(weekly_trends)
+        st.plotly_chart(trend_figure(weekly_trends, forecast), use_container_width=True)
+        if forecast['metrics']:
+            st.caption(
+                f"虚线为基于最近{min(len(weekly_trends), forecast['window'])}周线性趋势的未来{forecast['horizon']}周预测，"
+                f"阴影为95%预测区间"
             )
-        )
-        
-        st.plotly_chart(fig, use_container_width=True)
 
 # ==========================================
 # 标签页2: 班级分析
 # ==========================================
-with tab2:
+@st.fragment
+def render_class_tab():
+    """标签页2：班级筛选表格与雷达图（筛选交互只重跑本标签页）"""
     st.markdown('<h2 class="sub-header">🏫 班级表现分析</h2>', unsafe_allow_html=True)
     
     # 最佳班级展示
@@ -450,99 +931,110 @@ with tab2:
         </div>
         """, unsafe_allow_html=True)
     
-    # 班级对比分析
-    if show_details:
-        st.markdown('<h3 class="sub-header">📋 班级对比数据</h3>', unsafe_allow_html=True)
-        
-        # 创建示例班级数据（实际应用中应从分析结果中获取）
-        sample_classes = [
-            {
-                'name': '2024级10班',
-                'hours': 12,
-                'attendance': 80.3,
-                'correctness': 63.2,
-                'status': '优秀'
-            },
-            {
-                'name': '2024级1班',
-                'hours': 8,
-                'attendance': 77.7,
-                'correctness': 0.0,
-                'status': '需关注'
-            },
-            {
-                'name': '2024级2班',
-                'hours': 10,
-                'attendance': 60.0,
-                'correctness': 18.2,
-                'status': '一般'
-            },
-            {
-                'name': '2024级3班',
-                'hours': 9,
-                'attendance': 65.6,
-                'correctness': 41.4,
-                'status': '良好'
-            }
-        ]
-        
-        class_df = pd.DataFrame(sample_classes)
-        
-        # 显示表格
+    # 异常预警：各 班级×学科 周序列按严重程度排序
+    if anomalies and anomalies['alerts']:
+        st.markdown('<h3 class="sub-header">🚨 异常预警</h3>', unsafe_allow_html=True)
+        st.caption(
+            f"{anomalies['week']} · 检测 {anomalies['series']} 个班级×学科周序列，"
+            f"{anomalies['flagged']} 个出现异常（显示前 {len(anomalies['alerts'])} 条）"
+        )
         st.dataframe(
-            class_df,
+            pd.DataFrame([{
+                '班级': alert['class'],
+                '学科': alert['subject'],
+                '指标': alert['label'],
+                '本周': alert['value'] * 100,
+                '近期中位数': alert['median'] * 100 if alert['median'] is not None else None,
+                '上次': alert['previous'] * 100 if alert['previous'] is not None else None,
+                'z分数': alert['z_score'],
+                '规则': '、'.join(RULE_LABELS[rule] for rule in alert['rules']),
+                '严重程度': alert['severity']
+            } for alert in anomalies['alerts']]),
             column_config={
-                'name': st.column_config.TextColumn('班级名称'),
-                'hours': st.column_config.NumberColumn('总课时', format='%d'),
-                'attendance': st.column_config.NumberColumn('出勤率', format='%.1f%%'),
-                'correctness': st.column_config.NumberColumn('正确率', format='%.1f%%'),
-                'status': st.column_config.TextColumn('状态')
+                '本周': st.column_config.NumberColumn('本周', format='%.1f%%'),
+                '近期中位数': st.column_config.NumberColumn('近期中位数', format='%.1f%%'),
+                '上次': st.column_config.NumberColumn('上次', format='%.1f%%'),
+                '严重程度': st.column_config.ProgressColumn(
+                    '严重程度', format='%.2f', min_value=0, max_value=max(alert['severity'] for alert in anomalies['alerts'])
+                )
             },
-            use_container_width=True
+            hide_index=True,
+            use_container_width=True,
+            height=300
         )
+    
+    # 班级对比分析
+    if show_details:
+        st.markdown('<h3 class="sub-header">📋 班级对比数据</h3>', unsafe_allow_html=True)
+        
+        class_week_df = filtered['class_week_stats'] if filtered is not None else class_week_frame(analysis_results)
         
-        # 班级表现雷达图
-        if show_charts and len(sample_classes) > 0:
-            st.markdown('<h3 class="sub-header">📊 班级表现雷达图</h3>', unsafe_allow_html=True)
+        if class_week_df is None:
+            st.info("当前分析结果不含班级明细数据，请重新运行分析以生成每周班级统计")
+        else:
+            # 筛选与排序条件（在服务端处理，仅向浏览器发送当前页）
+            class_weeks = sorted(class_week_df['周'].unique(), reverse=True)
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                selected_week = st.selectbox("统计周次", class_weeks, index=0, key="class_week")
+            with col2:
+                name_filter = st.text_input("班级名称筛选", placeholder="例如：2024级", key="class_name_filter")
+            with col3:
+                status_filter = st.multiselect("状态", CLASS_STATUSES, key="class_status_filter")
+            with col4:
+                sort_label = st.selectbox("排序字段", list(CLASS_SORT_FIELDS), key="class_sort_field")
             
-            # 准备雷达图数据
-            categories = ['课时数', '出勤率', '正确率']
+            col5, col6, col7 = st.columns(3)
+            with col5:
+                sort_desc = st.toggle("降序排列", value=True, key="class_sort_desc")
+            with col6:
+                page_size = st.selectbox("每页行数", [10, 20, 50, 100], index=1, key="class_page_size")
             
-            fig = go.Figure()
+            week_metrics = next((w for w in weekly_trends if w['week'] == selected_week), None)
+            class_df = filter_class_table(
+                class_week_df, selected_week, week_metrics, name_filter, status_filter,
+                CLASS_SORT_FIELDS[sort_label], not sort_desc
+            )
             
-            for class_data in sample_classes[:4]:  # 显示前4个班级
-                values = [
-                    class_data['hours'] / 20,  # 归一化处理
-                    class_data['attendance'] / 100,
-                    class_data['correctness'] / 100
-                ]
-                
-                fig.add_trace(go.Scatterpolar(
-                    r=values,
-                    theta=categories,
-                    fill='toself',
-                    name=class_data['name'],
-                    line=dict(width=2)
-                ))
+            total_pages = max(1, -(-len(class_df) // page_size))
+            with col7:
+                page = st.number_input("页码", min_value=1, max_value=total_pages, value=1, step=1, key="class_page")
+            page_df = class_df.iloc[(page - 1) * page_size:page * page_size]
             
-            fig.update_layout(
-                polar=dict(
-                    radialaxis=dict(
-                        visible=True,
-                        range=[0, 1]
-                    )
-                ),
-                showlegend=True,
-                title='班级综合表现对比',
-                height=500
+            st.caption(f"共 {len(class_df)} 个班级，第 {page}/{total_pages} 页")
+            
+            # 显示表格
+            st.dataframe(
+                page_df[['班级名称', '总课时', '出勤率', '微课完成率', '正确率', '综合得分', '状态']],
+                column_config={
+                    '班级名称': st.column_config.TextColumn('班级名称'),
+                    '总课时': st.column_config.NumberColumn('总课时', format='%d'),
+                    '出勤率': st.column_config.NumberColumn('出勤率', format='%.1f%%'),
+                    '微课完成率': st.column_config.NumberColumn('微课完成率', format='%.1f%%'),
+                    '正确率': st.column_config.NumberColumn('正确率', format='%.1f%%'),
+                    '综合得分': st.column_config.NumberColumn('综合得分', format='%.3f'),
+                    '状态': st.column_config.TextColumn('状态')
+                },
+                hide_index=True,
+                use_container_width=True
             )
             
-            st.plotly_chart(fig, use_container_width=True)
+            # 班级表现雷达图
+            if show_charts and len(class_df) > 0:
+                st.markdown('<h3 class="sub-header">📊 班级表现雷达图</h3>', unsafe_allow_html=True)
+                
+                top_n = st.slider("对比班级数（按综合得分取前N名）", min_value=2, max_value=10, value=4, key="radar_top_n")
+                radar_classes = class_df.nlargest(top_n, '综合得分')
+                
+                radar_columns = ['班级名称', '总课时', '出勤率', '正确率']
+                st.plotly_chart(radar_figure(radar_classes[radar_columns]), use_container_width=True)
 
 # ==========================================
 # 标签页3: 学科分析
 # ==========================================
-with tab3:
+@st.fragment
+def render_subject_tab():
+    """标签页3：学科表格与对比图表"""
     st.markdown('<h2 class="sub-header">📚 学科表现分析</h2>', unsafe_allow_html=True)
     
     if top_subjects:
@@ -583,36 +1075,13 @@ with tab3:
         
         # 学科对比图表
         if show_charts:
+            fig1, fig2 = subject_figures(subject_df)
             col1, col2 = st.columns(2)
             
             with col1:
-                # 课时分布饼图
-                fig1 = px.pie(
-                    subject_df,
-                    values='课时数',
-                    names='学科',
-                    title='学科课时分布',
-                    hole=0.3,
-                    color_discrete_sequence=px.colors.qualitative.Set3
-                )
-                fig1.update_traces(textposition='inside', textinfo='percent+label')
                 st.plotly_chart(fig1, use_container_width=True)
             
             with col2:
-                # 正确率柱状图
-                fig2 = px.bar(
-                    subject_df,
-                    x='学科',
-                    y='平均正确率',
-                    title='学科平均正确率对比',
-                    color='平均正确率',
-                    color_continuous_scale='RdYlGn'
-                )
-                fig2.update_layout(
-                    yaxis_title='正确率（%）',
-                    xaxis_title='学科',
-                    coloraxis_showscale=False
-                )
                 st.plotly_chart(fig2, use_container_width=True)
         
         # 学科表现分析
@@ -646,7 +1115,37 @@ with tab3:
 # ==========================================
 # 标签页4: AI协作
 # ==========================================
-with tab4:
+def forecast_outlook(weekly_trends, forecasts):
+    """“趋势预测”回答中的四条预测：总课时、出勤率、正确率与预计下滑最多的班级×学科"""
+    forecast = trend_forecast(weekly_trends)
+    if not forecast['metrics']:
+        return ["- 历史周数不足，暂无法预测", "", "", ""]
+    week = forecast['weeks'][-1]
+    hours = forecast['metrics']['total_hours']
+    lines = [
+        f"1. **教学规模**: 预计 {week} 当周约 {hours['values'][-1]:.0f} 课时"
+        f"（95%区间 {hours['lower'][-1]:.0f}–{hours['upper'][-1]:.0f}），每周变化 {hours['slope']:+.1f} 课时"
+    ]
+    for i, (key, name, label) in enumerate([('attendance_rate', '学生参与', '出勤率'), ('correctness_rate', '学习效果', '正确率')], 2):
+        metric = forecast['metrics'][key]
+        lines.append(
+            f"{i}. **{name}**: 预计{label} {metric['values'][-1]*100:.1f}%"
+            f"（95%区间 {metric['lower'][-1]*100:.1f}%–{metric['upper'][-1]*100:.1f}%），"
+            f"每周变化 {metric['slope']*100:+.2f} 个百分点"
+        )
+    declining = forecasts['declining'] if forecasts else []
+    if declining:
+        lines.append("4. **班级差异**: 下滑最明显的是 " + "；".join(
+            f"{item['class']} {item['subject']} {item['label']} {item['trend']*100:.1f}% → {item['forecast']*100:.1f}%"
+            for item in declining[:3]
+        ))
+    else:
+        lines.append("4. **班级差异**: 暂未发现趋势显著下滑的班级×学科")
+    return lines
+
+@st.fragment
+def render_ai_tab():
+    """标签页4：AI协作（提问只重跑本标签页，不重建其他标签页的图表）"""
     st.markdown('<h2 class="sub-header">🤖 AI智能协作分析</h2>', unsafe_allow_html=True)
     
     st.info("""
@@ -656,11 +1155,8 @@ with tab4:
     3. 所有分析基于实际教学数据，提供针对性建议
     """)
     
-    # 初始化会话状态
-    if 'ai_conversation' not in st.session_state:
-        st.session_state.ai_conversation = []
-    
-    if 'ai_report_content' not in st.session_state:
+    # 初始化会话状态（报告按小节存储，超出上限时自动压缩）
+    if 'report_store' not in st.session_state:
         # 生成初始AI报告
         initial_ai_report = f"""
         ## 📊 AI课堂教学数据分析报告
@@ -681,17 +1177,29 @@ with tab4:
         - **加强薄弱环节**: 针对低正确率班级开展专项辅导
         - **优化教学策略**: 基于数据分析调整教学方法
         """
-        st.session_state.ai_report_content = initial_ai_report
+        st.session_state.report_store = ReportSessionStore(intro=initial_ai_report)
+    report_store = st.session_state.report_store
     
-    # 显示当前AI报告
+    # 显示当前AI报告：只渲染概要和最近几个小节，较早的小节按需展开
     st.markdown('<h3 class="sub-header">📝 当前AI分析报告</h3>', unsafe_allow_html=True)
     
-    ai_report_display = st.text_area(
-        "报告内容",
-        value=st.session_state.ai_report_content,
-        height=300,
-        key="ai_report_display"
-    )
+    with st.container(height=300):
+        st.markdown(report_store.intro)
+        if report_store.archived_count:
+            st.caption(f"🗂️ 已归档 {report_store.archived_count} 个较早的查询小节（下载的报告保留最近 {len(report_store.archived_titles)} 个标题）")
+        for section in report_store.recent_sections(REPORT_RECENT_SECTIONS):
+            st.markdown(f"## {section['title']}\n{section['body']}")
+    
+    older_sections = report_store.older_sections(REPORT_RECENT_SECTIONS)
+    if older_sections:
+        with st.expander(f"📂 较早的报告小节（{len(older_sections)}个）"):
+            titles = [f"{section['time']} {section['title']}" for section in older_sections]
+            selected_title = st.selectbox("选择要查看的小节", titles, index=None, key="older_section_select")
+            if selected_title is not None:
+                section = older_sections[titles.index(selected_title)]
+                st.markdown(section['body'])
+    
+    st.caption(f"报告共 {report_store.total_queries} 次查询，当前约 {report_store.total_chars} 字")
     
     # AI对话界面
     st.markdown('<h3 class="sub-header">💬 AI对话分析</h3>', unsafe_allow_html=True)
@@ -718,6 +1226,7 @@ with tab4:
             if user_query:
                 with st.spinner("🤖 AI正在深度分析..."):
                     # 模拟AI响应（实际部署中集成aily AI）
+                    outlook = forecast_outlook(weekly_trends, forecasts)
                     ai_responses = {
                         '出勤率分析': f"""
                         ## 📊 出勤率深度分析
@@ -796,10 +1305,11 @@ with tab4:
                         - **出勤率变化**: {weekly_trends[0]['attendance_rate']*100:.1f}% → {weekly_trends[-1]['attendance_rate']*100:.1f}%
                         - **正确率变化**: {weekly_trends[0]['correctness_rate']*100:.1f}% → {weekly_trends[-1]['correctness_rate']*100:.1f}%
                         
-                        ### 🔮 未来趋势预测
-                        1. **教学规模**: 预计将继续稳定增长
-                        2. **学习效果**: 通过针对性改进，正确率有望提升10-15%
-                        3. **班级差异**: 通过经验共享，班级间差距将逐步缩小
+                        ### 🔮 未来{FORECAST_HORIZON}周趋势预测（线性趋势外推）
+                        {outlook[0]}
+                        {outlook[1]}
+                        {outlook[2]}
+                        {outlook[3]}
                         
                         ### 🎯 行动建议
                         1. **持续监控**: 建立周报分析机制
@@ -827,29 +1337,16 @@ with tab4:
                     **如需更具体的分析，请尝试输入更具体的关键词**
                     """)
                     
-                    # 添加到对话历史
-                    st.session_state.ai_conversation.append({
-                        'role': 'user',
-                        'content': user_query,
-                        'time': dt.now().strftime('%H:%M:%S')
-                    })
-                    
-                    st.session_state.ai_conversation.append({
-                        'role': 'assistant',
-                        'content': ai_response,
-                        'time': dt.now().strftime('%H:%M:%S')
-                    })
-                    
-                    # 更新报告内容
-                    st.session_state.ai_report_content += f"\n\n## 💬 用户查询: {user_query}\n{ai_response}"
+                    # 添加到对话历史并更新报告内容
+                    report_store.add_exchange(user_query, ai_response, dt.now().strftime('%H:%M:%S'))
                     
                     st.success("✅ AI分析完成！报告已更新。")
     
     # 显示对话历史
-    if st.session_state.ai_conversation:
+    if report_store.conversation:
         st.markdown('<h3 class="sub-header">📜 对话历史</h3>', unsafe_allow_html=True)
         
-        for i, message in enumerate(st.session_state.ai_conversation[-6:]):  # 显示最近6条
+        for i, message in enumerate(list(report_store.conversation)[-6:]):  # 显示最近6条
             if message['role'] == 'user':
                 st.markdown(f"""
                 <div class="user-message">
@@ -868,87 +1365,60 @@ with tab4:
     # 报告下载功能
     st.markdown('<h3 class="sub-header">📥 报告下载</h3>', unsafe_allow_html=True)
     
-    col_dl1, col_dl2, col_dl3 = st.columns(3)
-    
-    with col_dl1:
-        # Markdown格式
-        md_report = st.session_state.ai_report_content
-        st.download_button(
-            label="📄 下载Markdown报告",
-            data=md_report,
-            file_name=f"AI教学分析报告_{current_week['date']}.md",
-            mime="text/markdown",
-            use_container_width=True
-        )
-    
-    with col_dl2:
-        # HTML格式
-        html_report = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="UTF-8">
-            <title>AI课堂教学分析报告 - {current_week['date']}</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; margin: 2rem; }}
-                h1 {{ color: #2c3e50; border-bottom: 2px solid #3498db; padding-bottom: 0.5rem; }}
-                h2 {{ color: #34495e; margin-top: 2rem; }}
-                .metric {{ background: #f8f9fa; padding: 1rem; border-radius: 8px; margin: 1rem 0; }}
-                .recommendation {{ background: #e8f4fd; padding: 1rem; border-radius: 8px; margin: 1rem 0; }}
-                .footer {{ margin-top: 3rem; color: #7f8c8d; font-size: 0.9rem; }}
-            </style>
-        </head>
-        <body>
-            <h1>🤖 AI课堂教学智能分析报告</h1>
-            <p><strong>生成时间</strong>: {analysis_results['analysis_time']}</p>
-            <p><strong>统计周期</strong>: {current_week['date']}</p>
-            
-            <div class="metric">
-                <h2>📊 核心指标</h2>
-                <p><strong>总课时</strong>: {current_metrics['total_hours']}课时</p>
-                <p><strong>平均出勤率</strong>: {current_metrics['attendance_rate']*100:.1f}%</p>
-                <p><strong>平均题目正确率</strong>: {current_metrics['correctness_rate']*100:.1f}%</p>
-            </div>
-            
-            <div class="recommendation">
-                <h2>💡 分析与建议</h2>
-                {st.session_state.ai_report_content.replace('\n', '<br>')}
-            </div>
-            
-            <div class="footer">
-                <p>报告生成系统: AI课堂教学智能分析平台 | 洋葱学园 智课团队</p>
-                <p>数据来源: {file_info['file_name']} | 分析记录: {file_info['total_records']}条</p>
-            </div>
-        </body>
-        </html>
-        """
-        
-        st.download_button(
-            label="🌐 下载HTML报告",
-            data=html_report,
-            file_name=f"AI教学分析报告_{current_week['date']}.html",
-            mime="text/html",
-            use_container_width=True
-        )
-    
-    with col_dl3:
-        # 文本格式
-        text_report = st.session_state.ai_report_content
-        st.download_button(
-            label="📝 下载文本报告",
-            data=text_report,
-            file_name=f"AI教学分析报告_{current_week['date']}.txt",
-            mime="text/plain",
-            use_container_width=True
-        )
+    # 报告在点击下载时按小节逐块生成；下载按钮会把整个文件读入内存（报告正文受会话报告字数上限约束）
+    report_date = current_week['date']
+    report_tables = export_sheets(analysis_results) if include_raw_data else None
+    download_options = [
+        ("📄 下载Markdown报告", 'markdown'),
+        ("🌐 下载HTML报告", 'html'),
+        ("📝 下载文本报告", 'text')
+    ]
+    for column, (label, fmt) in zip(st.columns(3), download_options):
+        extension, mime = EXPORT_FORMATS[fmt]
+        with column:
+            st.download_button(
+                label=label,
+                data=lambda fmt=fmt: export_report(fmt, report_store, analysis_results, report_tables),
+                file_name=f"AI教学分析报告_{report_date}.{extension}",
+                mime=mime,
+                on_click="ignore",
+                use_container_width=True
+            )
+
+# ==========================================
+# 主内容区域 - 标签页
+# ==========================================
+# 只执行当前选中标签页的内容；各标签页为独立片段，页内交互不会重跑其他标签页
+tab1, tab2, tab3, tab4 = st.tabs([
+    "📈 核心指标", 
+    "🏫 班级分析", 
+    "📚 学科分析", 
+    "🤖 AI协作"
+], key="main_tabs", on_change="rerun")
+
+with tab1:
+    if tab1.open:
+        render_core_tab()
+
+with tab2:
+    if tab2.open:
+        render_class_tab()
+
+with tab3:
+    if tab3.open:
+        render_subject_tab()
+
+with tab4:
+    if tab4.open:
+        render_ai_tab()
 
 # ==========================================
 # 页脚信息
 # ==========================================
 st.markdown("---")
-st.markdown("""
+st.markdown(f"""
 <div style='text-align: center; color: #7f8c8d; padding: 1rem;'>
     <p>© 2026 洋葱学园 - 智课团队 | AI课堂教学智能分析平台 v2.0</p>
     <p>技术支持: 张腾蛟 (zhangtengjiao@guanghe.tv) | 最后更新: {analysis_results['analysis_time']}</p>
 </div>
-""".format(analysis_results=analysis_results), unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
\ No newline at end of file
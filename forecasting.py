@@ -0,0 +1,204 @@
+import numpy as np
+import pandas as pd
+from anomaly_detection import series_matrices
+
+# 拟合使用的最近周数、预测周数、拟合所需最少观测周数
+FORECAST_WINDOW = 12
+FORECAST_HORIZON = 4
+MIN_POINTS = 4
+# 95% 区间的正态分位数；自由度不超过10时使用t分布分位数表
+INTERVAL_Z = 1.96
+T_QUANTILES_95 = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228]
+# 结果中列出的预计下滑最多的序列数
+MAX_DECLINING = 10
+
+# 周趋势中参与预测的指标及取值范围（比率截断到 [0, 1]，课时不小于0）
+TREND_METRICS = {
+    'total_hours': (0, None),
+    'attendance_rate': (0, 1),
+    'correctness_rate': (0, 1)
+}
+
+
+def week_positions(weeks):
+    """周次相对首周的位置（以周为单位，缺失的周次不占位置，间隔按实际天数计算）"""
+    weeks = pd.DatetimeIndex(weeks)
+    return ((weeks - weeks[0]) / pd.Timedelta(days=7)).to_numpy(dtype=float)
+
+
+def fit_linear_trend(values, positions):
+    """对每一行同时做线性趋势最小二乘拟合（NaN 视为缺失）
+
+    values 形状为 (..., 周)，positions 为各列的周位置。全部由按行求和的矩阵运算完成，
+    返回截距、斜率（每周变化）、观测数、位置均值、位置离差平方和与残差标准差。
+    """
+    valid = ~np.isnan(values)
+    y = np.where(valid, values, 0.0)
+    t = np.broadcast_to(positions, values.shape)
+    n = valid.sum(axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t_mean = np.where(valid, t, 0.0).sum(axis=-1) / n
+        y_mean = y.sum(axis=-1) / n
+        t_dev = np.where(valid, t - t_mean[..., None], 0.0)
+        sxx = (t_dev ** 2).sum(axis=-1)
+        sxy = (t_dev * (y - y_mean[..., None])).sum(axis=-1)
+        slope = np.where(sxx > 0, sxy / sxx, 0.0)
+        intercept = y_mean - slope * t_mean
+        residuals = np.where(valid, y - (intercept[..., None] + slope[..., None] * t), 0.0)
+        resid_std = np.sqrt((residuals ** 2).sum(axis=-1) / (n - 2))
+    return {
+        'intercept': intercept,
+        'slope': slope,
+        'n': n,
+        't_mean': t_mean,
+        'sxx': sxx,
+        'resid_std': np.where(n > 2, resid_std, np.nan)
+    }
+
+
+def t_quantile(df):
+    """95% 双侧t分位数：自由度≤10 查表，更大时用 Cornish-Fisher 展开（误差小于0.1%）；自由度<1 时为 NaN"""
+    df = np.asarray(df, dtype=float)
+    z = INTERVAL_Z
+    with np.errstate(invalid='ignore', divide='ignore'):
+        approx = z + (z ** 3 + z) / (4 * df) + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * df ** 2)
+    table = np.asarray(T_QUANTILES_95)[np.clip(df, 1, len(T_QUANTILES_95)).astype(int) - 1]
+    return np.where(df < 1, np.nan, np.where(df <= len(T_QUANTILES_95), table, approx))
+
+
+def project(fit, future_positions, bounds=(None, None)):
+    """按拟合结果外推到未来周位置，返回 (预测值, 下限, 上限)，形状为 (..., 预测周数)
+
+    95% 预测区间包含参数不确定性：t·s·sqrt(1 + 1/n + (x - x̄)²/Sxx)，t 按各序列自由度 n-2 取值；观测不足时为 NaN。
+    """
+    future = np.asarray(future_positions, dtype=float)
+    mean = fit['intercept'][..., None] + fit['slope'][..., None] * future
+    with np.errstate(invalid='ignore', divide='ignore'):
+        leverage = np.where(
+            fit['sxx'][..., None] > 0,
+            (future - fit['t_mean'][..., None]) ** 2 / fit['sxx'][..., None],
+            0.0
+        )
+        quantile = t_quantile(fit['n'] - 2)[..., None]
+        spread = quantile * fit['resid_std'][..., None] * np.sqrt(1 + 1 / fit['n'][..., None] + leverage)
+    lower, upper = mean - spread, mean + spread
+    low, high = bounds
+    if low is not None or high is not None:
+        mean, lower, upper = (np.clip(a, low, high) for a in (mean, lower, upper))
+    return mean, lower, upper
+
+
+def _round_list(values, digits):
+    return [None if np.isnan(v) else round(float(v), digits) for v in values]
+
+
+def forecast_trends(weekly_trends, horizon=FORECAST_HORIZON, window=FORECAST_WINDOW):
+    """对 weekly_trends 中的整体指标批量拟合线性趋势并预测未来几周
+
+    返回 {'weeks': 未来周次, 'horizon', 'window', 'metrics': {指标: {'values', 'lower', 'upper', 'slope'}}}；
+    周数不足 MIN_POINTS 时 metrics 为空。
+    """
+    recent = weekly_trends[-window:]
+    if len(recent) < MIN_POINTS:
+        return {'weeks': [], 'horizon': horizon, 'window': window, 'metrics': {}}
+
+    weeks = pd.to_datetime([week['week'] for week in recent])
+    positions = week_positions(weeks)
+    future_weeks = [weeks[-1] + pd.Timedelta(weeks=h) for h in range(1, horizon + 1)]
+    future_positions = positions[-1] + np.arange(1, horizon + 1)
+
+    keys = list(TREND_METRICS)
+    values = np.array([[float(week[key]) for week in recent] for key in keys])
+    fit = fit_linear_trend(values, positions)
+    mean, lower, upper = project(fit, future_positions)
+    metrics = {}
+    for i, key in enumerate(keys):
+        low, high = TREND_METRICS[key]
+        digits = 1 if key == 'total_hours' else 4
+        metrics[key] = {
+            'values': _round_list(np.clip(mean[i], low, high), digits),
+            'lower': _round_list(np.clip(lower[i], low, high), digits),
+            'upper': _round_list(np.clip(upper[i], low, high), digits),
+            'slope': round(float(fit['slope'][i]), 6)
+        }
+    return {
+        'weeks': [week.strftime('%Y-%m-%d') for week in future_weeks],
+        'horizon': horizon,
+        'window': window,
+        'metrics': metrics
+    }
+
+
+def forecast_series(fine, indicators, horizon=FORECAST_HORIZON, window=FORECAST_WINDOW):
+    """对每个 班级×学科 周序列的各指标批量拟合线性趋势，预测 horizon 周后的值
+
+    所有序列的拟合是一次矩阵运算；只使用最近 window 周，观测不足 MIN_POINTS 周的序列不预测。
+    返回统计表：班级名称、课时学科、指标、最近值、趋势值（拟合线在最近一周的值）、预测值及区间、每周变化、
+    斜率95%区间上限低于0的“显著下滑”标记与观测周数。
+    """
+    columns = [
+        '班级名称', '课时学科', '指标', '最近值', '趋势值', '预测值', '预测下限', '预测上限', '每周变化', '显著下滑', '观测周数'
+    ]
+    if len(fine) == 0:
+        return pd.DataFrame(columns=columns)
+
+    recent_weeks = np.sort(fine['周'].unique())[-window:]
+    fine = fine[fine['周'] >= recent_weeks[0]]
+    keys = list(indicators)
+    values, _, weeks, labels = series_matrices(fine, keys)
+    positions = week_positions(weeks)
+    fit = fit_linear_trend(values, positions)
+    mean, lower, upper = project(fit, [positions[-1], positions[-1] + horizon], (0, 1))
+
+    # 每个序列窗口内最后一个观测值
+    valid = ~np.isnan(values)
+    last = np.where(valid, np.arange(values.shape[-1]), -1).max(axis=-1)
+    latest = np.take_along_axis(values, np.maximum(last, 0)[..., None], axis=-1)[..., 0]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope_upper = fit['slope'] + t_quantile(fit['n'] - 2) * fit['resid_std'] / np.sqrt(fit['sxx'])
+
+    indicator_idx, series_idx = np.nonzero(fit['n'] >= MIN_POINTS)
+    return pd.DataFrame({
+        '班级名称': labels.iloc[series_idx, 0].to_numpy(),
+        '课时学科': labels.iloc[series_idx, 1].to_numpy(),
+        '指标': np.asarray([indicators[key] for key in keys])[indicator_idx],
+        '最近值': latest[indicator_idx, series_idx],
+        '趋势值': mean[indicator_idx, series_idx, 0],
+        '预测值': mean[indicator_idx, series_idx, 1],
+        '预测下限': lower[indicator_idx, series_idx, 1],
+        '预测上限': upper[indicator_idx, series_idx, 1],
+        '每周变化': fit['slope'][indicator_idx, series_idx],
+        '显著下滑': slope_upper[indicator_idx, series_idx] < 0,
+        '观测周数': fit['n'][indicator_idx, series_idx].astype(int)
+    }, columns=columns)
+
+
+def declining_series(series_forecasts, limit=MAX_DECLINING):
+    """预计下滑最多的序列：斜率显著为负，按预测期内相对当前趋势值的下降幅度排序"""
+    declining = series_forecasts[series_forecasts['显著下滑']]
+    declining = declining.assign(预计下降=declining['趋势值'] - declining['预测值'])
+    return declining.sort_values('预计下降', ascending=False, kind='stable').head(limit)
+
+
+def forecast_summary(weekly_trends, fine, indicators, horizon=FORECAST_HORIZON, window=FORECAST_WINDOW,
+                     limit=MAX_DECLINING):
+    """结果文档中的 forecasts 小节：整体指标预测，加上预计下滑最多的 班级×学科 序列"""
+    summary = forecast_trends(weekly_trends, horizon, window)
+    declining = declining_series(forecast_series(fine, indicators, horizon, window), limit)
+    summary['declining'] = [
+        {
+            'class': row['班级名称'],
+            'subject': row['课时学科'],
+            'label': row['指标'],
+            'latest': _round_list([row['最近值']], 4)[0],
+            'trend': round(float(row['趋势值']), 4),
+            'forecast': round(float(row['预测值']), 4),
+            'lower': round(float(row['预测下限']), 4),
+            'upper': round(float(row['预测上限']), 4),
+            'slope': round(float(row['每周变化']), 4),
+            'weeks': int(row['观测周数'])
+        }
+        for _, row in declining.iterrows()
+    ]
+    return summary
@@ -0,0 +1,116 @@
+from collections import deque
+
+# 默认意图及关键词（声明顺序即同分时的优先级，与原 if/elif 顺序一致）
+DEFAULT_INTENTS = {
+    'attendance': ['出勤', 'attendance', '到课'],
+    'correctness': ['正确率', '准确率', 'correctness', 'accuracy'],
+    'recommendation': ['建议', '改进', 'recommendation', 'suggestion'],
+    'class': ['班级', 'class', '班'],
+    'subject': ['学科', 'subject', '课程'],
+    'trend': ['趋势', 'trend', '变化', 'history']
+}
+
+
+class KeywordAutomaton:
+    """Aho–Corasick 多模式匹配自动机：一次扫描文本找出所有关键词出现位置"""
+
+    def __init__(self, keywords):
+        """keywords: 可迭代的 (关键词, 负载) 对"""
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        for keyword, payload in keywords:
+            self._add(keyword, payload)
+        self._build_failure_links()
+
+    def _add(self, keyword, payload):
+        """将关键词插入字典树"""
+        state = 0
+        for ch in keyword:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append((len(keyword), payload))
+
+    def _build_failure_links(self):
+        """广度优先构建失败指针，并合并后缀状态的输出"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(ch, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def iter_matches(self, text):
+        """逐个产出 (起始位置, 结束位置, 负载)"""
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length, payload in output[state]:
+                yield i + 1 - length, i + 1, payload
+
+
+class IntentRouter:
+    """基于关键词索引的意图路由：单次扫描查询，返回按得分排序的多个意图
+
+    意图得分为其关键词在查询中的命中次数（被同一意图更长关键词包含的命中不计分），
+    同分时按意图声明顺序排序。
+    与原 if/elif 首个命中即返回不同，组合回答需要统计所有意图的命中，因此内置 6 个意图时
+    每条查询约慢数微秒；逐个查找子串再计分与自动机耗时相当，而自动机耗时不随意图数增长。
+    """
+
+    def __init__(self, intents=DEFAULT_INTENTS):
+        self.intents = list(intents)
+        self._priority = {intent: index for index, intent in enumerate(self.intents)}
+        self._automaton = KeywordAutomaton(
+            (keyword.lower(), intent) for intent, keywords in intents.items() for keyword in keywords
+        )
+
+    def route(self, query):
+        """返回 [(意图, 得分, 命中关键词列表), ...]，按得分从高到低排列"""
+        text = query.lower()
+        spans = {}
+        for start, end, intent in self._automaton.iter_matches(text):
+            spans.setdefault(intent, set()).add((start, end))
+
+        ranked = []
+        for intent, intent_spans in spans.items():
+            # 只计被同一意图更长关键词包含之外的命中（如“班级”中的“班”不重复计分）
+            maximal = sorted(intent_spans) if len(intent_spans) == 1 else [
+                (start, end) for start, end in sorted(intent_spans)
+                if not any(s <= start and end <= e and (s, e) != (start, end) for s, e in intent_spans)
+            ]
+            keywords = list(dict.fromkeys(text[start:end] for start, end in maximal))
+            ranked.append((intent, len(maximal), keywords))
+        ranked.sort(key=lambda item: (-item[1], self._priority[item[0]]))
+        return ranked
+
+    def select(self, query, max_intents=3, min_ratio=0.5):
+        """选出用于组合回答的意图，按声明顺序排列，最多 max_intents 个
+
+        第一个意图始终是原 if/elif 顺序下首个命中的意图（单意图回答与原来一致），
+        其后补充得分不低于最高分 min_ratio 倍的其他意图。
+        """
+        ranked = self.route(query)
+        if not ranked:
+            return []
+        top_score = ranked[0][1]
+        selected = {intent for intent, score, _ in ranked if score >= top_score * min_ratio}
+        selected.add(min((intent for intent, _, _ in ranked), key=self._priority.get))
+        return sorted(selected, key=self._priority.get)[:max_intents]
+
+
+# 进程内共享的默认路由器（索引只构建一次）
+DEFAULT_ROUTER = IntentRouter()
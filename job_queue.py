@@ -0,0 +1,141 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+from shared_cache import SharedResultsCache
+
+# 任务状态
+JOB_PENDING = 'pending'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+# 默认工作进程数
+DEFAULT_WORKERS = 2
+# 任务表最多保留的失败任务数（超出时丢弃最早结束的）
+DEFAULT_MAX_FAILED = 20
+
+
+def _run_job(func, args):
+    """在工作进程中执行任务，同时记录实际开始时间"""
+    started = time.time()
+    return started, func(*args)
+
+
+class AnalysisJobQueue:
+    """本地分析任务队列
+
+    任务以输入哈希为键：相同输入的请求共享同一个任务，排队或运行中的任务不会重复提交，
+    已完成的结果保存在进程内共享的只读结果缓存中（按最近最少使用淘汰），失败的任务最多保留 max_failed 个。
+    任务在进程池中执行，不阻塞页面脚本线程；工作进程异常退出导致进程池损坏时，
+    受影响的任务记为失败，并重建进程池供后续任务使用。
+    """
+
+    def __init__(self, max_workers=DEFAULT_WORKERS, cache=None, executor=None, max_failed=DEFAULT_MAX_FAILED):
+        self._max_workers = max_workers
+        self._executor = executor or ProcessPoolExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self.max_failed = max_failed
+        self.cache = cache if cache is not None else SharedResultsCache()
+
+    def submit(self, key, func, *args, label=None):
+        """提交任务；相同键的任务已排队、运行中或已完成时直接返回，不重复计算
+
+        失败的任务需先调用 retry 才会重新提交。
+        """
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and (job['status'] != JOB_DONE or key in self.cache):
+                self._jobs.move_to_end(key)
+                return key
+            try:
+                future = self._executor.submit(_run_job, func, args)
+            except BrokenExecutor:
+                self._replace_executor(self._executor)
+                future = self._executor.submit(_run_job, func, args)
+            self._jobs[key] = {
+                'key': key,
+                'label': label or str(key),
+                'status': JOB_PENDING,
+                'submitted': time.time(),
+                'started': None,
+                'finished': None,
+                'error': None,
+                'future': future,
+                'executor': self._executor
+            }
+        future.add_done_callback(lambda f: self._on_done(key, f))
+        return key
+
+    def _on_done(self, key, future):
+        """任务结束回调：更新任务表并保存结果"""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None or job['future'] is not future:
+                return
+            job['finished'] = time.time()
+            error = future.exception()
+            if error is not None:
+                job['status'] = JOB_FAILED
+                job['error'] = f"{type(error).__name__}: {error}"
+                if isinstance(error, BrokenExecutor):
+                    self._replace_executor(job['executor'])
+            else:
+                job['started'], result = future.result()
+                job['status'] = JOB_DONE
+                self.cache.put(key, result)
+            self._prune()
+
+    def _prune(self):
+        """清理任务表：结果已被缓存淘汰的已完成任务，以及超出 max_failed 的较早失败任务"""
+        for done_key in [k for k, j in self._jobs.items() if j['status'] == JOB_DONE and k not in self.cache]:
+            del self._jobs[done_key]
+        failed = sorted((j['finished'], k) for k, j in self._jobs.items() if j['status'] == JOB_FAILED)
+        for _, failed_key in failed[:max(len(failed) - self.max_failed, 0)]:
+            del self._jobs[failed_key]
+
+    def _replace_executor(self, broken):
+        """重建已损坏的进程池（其他任务已重建过时不再重复）"""
+        if self._executor is not broken:
+            return
+        broken.shutdown(wait=False, cancel_futures=True)
+        self._executor = ProcessPoolExecutor(max_workers=self._max_workers)
+
+    def status(self, key):
+        """任务状态（pending / running / done / failed），未提交过返回 None"""
+        job = self.job(key)
+        return job['status'] if job is not None else None
+
+    def job(self, key):
+        """任务记录副本"""
+        with self._lock:
+            job = self._jobs.get(key)
+            return self._snapshot(job) if job is not None else None
+
+    def _snapshot(self, job):
+        """任务记录副本（排队中的任务已被工作进程取走时标记为运行中）"""
+        row = {name: value for name, value in job.items() if name not in ('future', 'executor')}
+        if row['status'] == JOB_PENDING and job['future'].running():
+            row['status'] = JOB_RUNNING
+        return row
+
+    def result(self, key):
+        """已完成任务的结果，未完成时返回 None"""
+        return self.cache.get(key)
+
+    def retry(self, key):
+        """清除失败的任务记录，以便重新提交"""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job['status'] == JOB_FAILED:
+                del self._jobs[key]
+
+    def jobs(self):
+        """任务表（按最近提交排列）"""
+        with self._lock:
+            return [self._snapshot(job) for job in reversed(self._jobs.values())]
+
+    def shutdown(self, wait=False):
+        """关闭工作进程池"""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,173 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from analysis_engine import (
+    CUBE_DIGITS, FINE_KEYS, aggregate_fine, class_stats_from_sums, class_week_stats_from_sums, metrics_from_sums,
+    stats_from_sums, subject_stats_from_sums, subject_week_stats_from_sums, sum_columns,
+    to_columnar, weekly_metrics_from_sums, weekly_trends_from_sums
+)
+
+# 维度名称（可用于上卷与筛选的列）
+DIMENSIONS = FINE_KEYS
+# 各维度的去重计数列名（上卷时对未分组的维度计数）
+DISTINCT_COLUMNS = {'周': '周数', '班级名称': '班级数', '课时学科': '学科数'}
+
+
+class MetricsCube:
+    """周×班级×学科 加权和立方体
+
+    以最细粒度保存课时数、各指标×课时数的乘积和与记录数，任何维度组合的统计都由上卷得到，
+    筛选只作用于已聚合的行（行数等于分组数），不再读取原始记录。
+    各维度预先编码为整数，切片只做整数比较。
+    """
+
+    def __init__(self, fine):
+        self.fine = fine.reset_index(drop=True)
+        self._codes = {}
+        self._levels = {}
+        for dim in DIMENSIONS:
+            codes, levels = pd.factorize(self.fine[dim], sort=True)
+            self._codes[dim] = codes
+            self._levels[dim] = levels
+
+    @classmethod
+    def from_frame(cls, df):
+        """由清洗后的原始记录构建"""
+        return cls(aggregate_fine(df))
+
+    @classmethod
+    def from_columnar(cls, value):
+        """由列式字典或Arrow表（结果文档中的 metrics_cube 小节）还原"""
+        if isinstance(value, pa.Table):
+            fine = value.to_pandas()
+        else:
+            fine = pd.DataFrame(value)
+        fine['周'] = pd.to_datetime(fine['周'])
+        return cls(fine)
+
+    def to_columnar(self):
+        """转为列式字典，写入结果文档"""
+        return to_columnar(self.fine, CUBE_DIGITS)
+
+    def __len__(self):
+        return len(self.fine)
+
+    # ==========================================
+    # 维度取值
+    # ==========================================
+    def _present(self, dim):
+        """维度在立方体中出现的取值编码（升序）"""
+        return np.flatnonzero(np.bincount(self._codes[dim], minlength=len(self._levels[dim])))
+
+    def levels(self, dim):
+        """维度在立方体中出现的取值（升序）"""
+        return list(self._levels[dim][self._present(dim)])
+
+    def weeks(self):
+        return self.levels('周')
+
+    def classes(self):
+        return self.levels('班级名称')
+
+    def subjects(self):
+        return self.levels('课时学科')
+
+    # ==========================================
+    # 切片
+    # ==========================================
+    def _member_mask(self, dim, values):
+        """维度取值属于 values 的行（按编码查表）"""
+        levels = self._levels[dim]
+        if dim == '周':
+            values = pd.to_datetime(pd.Index(values))
+        wanted = levels.get_indexer(values)
+        lookup = np.zeros(len(levels), dtype=bool)
+        lookup[wanted[wanted >= 0]] = True
+        return lookup[self._codes[dim]]
+
+    def _subset(self, mask):
+        """按行掩码取子立方体（沿用已有编码）"""
+        cube = object.__new__(type(self))
+        cube.fine = self.fine.loc[mask].reset_index(drop=True)
+        cube._codes = {dim: codes[mask] for dim, codes in self._codes.items()}
+        cube._levels = self._levels
+        return cube
+
+    def slice(self, weeks=None, classes=None, subjects=None, last_weeks=None, start=None, end=None):
+        """按维度取值筛选，返回新的立方体
+
+        weeks/classes/subjects 为取值列表；last_weeks 取最近N周；start/end 为周次范围（含端点）。
+        周次编码与日期同序，范围筛选只比较编码。
+        """
+        mask = np.ones(len(self.fine), dtype=bool)
+        if weeks is not None:
+            mask &= self._member_mask('周', weeks)
+        if classes is not None:
+            mask &= self._member_mask('班级名称', classes)
+        if subjects is not None:
+            mask &= self._member_mask('课时学科', subjects)
+        week_codes = self._codes['周']
+        if start is not None:
+            mask &= week_codes >= self._levels['周'].searchsorted(pd.Timestamp(start), side='left')
+        if end is not None:
+            mask &= week_codes < self._levels['周'].searchsorted(pd.Timestamp(end), side='right')
+        if last_weeks is not None:
+            present = self._present('周')
+            if last_weeks <= 0 or len(present) == 0:
+                mask[:] = False
+            else:
+                mask &= week_codes >= present[-last_weeks:][0]
+        return self._subset(mask)
+
+    def current_week(self):
+        """最新一周的子立方体"""
+        return self.slice(last_weeks=1)
+
+    def previous_week(self):
+        """前一周的子立方体（只有一周时为空）"""
+        present = self._present('周')
+        if len(present) < 2:
+            return self._subset(np.zeros(len(self.fine), dtype=bool))
+        return self._subset(self._codes['周'] == present[-2])
+
+    # ==========================================
+    # 上卷与视图
+    # ==========================================
+    def rollup(self, by=None):
+        """上卷到任意维度组合的加权和（by 为空时返回总计）"""
+        if not by:
+            return self.fine[sum_columns()].sum().to_frame().T
+        return self.fine.groupby(by, sort=True)[sum_columns()].sum()
+
+    def stats(self, by):
+        """任意维度组合的统计：总课时、加权平均指标、记录数，及其他维度的去重计数"""
+        by = [by] if isinstance(by, str) else list(by)
+        stats = stats_from_sums(self.fine, by)
+        others = [dim for dim in DIMENSIONS if dim not in by]
+        if others:
+            counts = self.fine.groupby(by, sort=True)[others].nunique()
+            for dim in others:
+                stats[DISTINCT_COLUMNS[dim]] = counts[dim]
+        return stats.reset_index()
+
+    def metrics(self):
+        """核心教学指标（与 metrics_from_sums 一致）"""
+        return metrics_from_sums(self.fine)
+
+    def class_stats(self):
+        return class_stats_from_sums(self.fine)
+
+    def subject_stats(self):
+        return subject_stats_from_sums(self.fine)
+
+    def weekly_metrics(self):
+        return weekly_metrics_from_sums(self.fine)
+
+    def weekly_trends(self):
+        return weekly_trends_from_sums(self.fine)
+
+    def class_week_stats(self):
+        return class_week_stats_from_sums(self.fine)
+
+    def subject_week_stats(self):
+        return subject_week_stats_from_sums(self.fine)
@@ -0,0 +1,205 @@
+import html
+import tempfile
+import pandas as pd
+import pyarrow as pa
+from openpyxl import Workbook
+
+# 导出格式：扩展名与MIME类型
+EXPORT_FORMATS = {
+    'markdown': ('md', 'text/markdown'),
+    'html': ('html', 'text/html'),
+    'text': ('txt', 'text/plain'),
+    'xlsx': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+}
+
+# 大表按块读取的行数；导出内容超过该字节数时落盘，生成过程的内存占用不随报告规模增长
+CHUNK_ROWS = 2000
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+# 流式传输导出文件时每块的字节数
+STREAM_CHUNK_BYTES = 1024 * 1024
+
+# 表格导出的工作表名称（结果小节 → 工作表）
+TABLE_SHEETS = {
+    'class_week_stats': '班级周统计',
+    'subject_week_stats': '学科周统计'
+}
+
+HTML_HEAD = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <title>AI课堂教学分析报告 - {date}</title>
+    <style>
+        body {{ font-family: Arial, sans-serif; line-height: 1.6; margin: 2rem; }}
+        h1 {{ color: #2c3e50; border-bottom: 2px solid #3498db; padding-bottom: 0.5rem; }}
+        h2 {{ color: #34495e; margin-top: 2rem; }}
+        .metric {{ background: #f8f9fa; padding: 1rem; border-radius: 8px; margin: 1rem 0; }}
+        .recommendation {{ background: #e8f4fd; padding: 1rem; border-radius: 8px; margin: 1rem 0; }}
+        .footer {{ margin-top: 3rem; color: #7f8c8d; font-size: 0.9rem; }}
+        table {{ border-collapse: collapse; margin: 1rem 0; font-size: 0.9rem; }}
+        th, td {{ border: 1px solid #dee2e6; padding: 0.3rem 0.6rem; text-align: right; }}
+        th {{ background: #f8f9fa; }}
+    </style>
+</head>
+<body>
+    <h1>🤖 AI课堂教学智能分析报告</h1>
+    <p><strong>生成时间</strong>: {analysis_time}</p>
+    <p><strong>统计周期</strong>: {date}</p>
+"""
+
+HTML_METRICS = """
+    <div class="metric">
+        <h2>📊 核心指标</h2>
+        <p><strong>总课时</strong>: {total_hours}课时</p>
+        <p><strong>平均出勤率</strong>: {attendance_rate:.1f}%</p>
+        <p><strong>平均题目正确率</strong>: {correctness_rate:.1f}%</p>
+    </div>
+"""
+
+HTML_FOOTER = """
+    <div class="footer">
+        <p>报告生成系统: AI课堂教学智能分析平台 | 洋葱学园 智课团队</p>
+        <p>数据来源: {file_name} | 分析记录: {total_records}条</p>
+    </div>
+</body>
+</html>
+"""
+
+
+# ==========================================
+# 表格分块读取
+# ==========================================
+def iter_row_chunks(source, chunk_rows=CHUNK_ROWS):
+    """将大表按块产出 (列名列表, 行列表)
+
+    source 可以是 Arrow 表（如结果存储中内存映射的表）、DataFrame、列式字典或记录列表，
+    每次只在内存中展开 chunk_rows 行。
+    """
+    if isinstance(source, pa.Table):
+        for batch in source.to_batches(max_chunksize=chunk_rows):
+            columns = batch.to_pydict()
+            yield list(columns), list(zip(*columns.values()))
+    elif isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunk_rows):
+            chunk = source.iloc[start:start + chunk_rows]
+            yield list(chunk.columns), list(chunk.itertuples(index=False, name=None))
+    elif isinstance(source, dict):
+        names = list(source)
+        total = len(source[names[0]]) if names else 0
+        for start in range(0, total, chunk_rows):
+            yield names, list(zip(*(source[name][start:start + chunk_rows] for name in names)))
+    else:
+        records = list(source)
+        names = list(records[0]) if records else []
+        for start in range(0, len(records), chunk_rows):
+            yield names, [tuple(row.get(name) for name in names) for row in records[start:start + chunk_rows]]
+
+
+def _format_cell(value):
+    """HTML表格单元格文本"""
+    if isinstance(value, float):
+        return f"{value:.4g}"
+    return html.escape(str(value))
+
+
+def iter_html_table(title, source, chunk_rows=CHUNK_ROWS):
+    """逐块生成HTML表格"""
+    header_written = False
+    for names, rows in iter_row_chunks(source, chunk_rows):
+        if not header_written:
+            yield f"\n    <h2>{html.escape(title)}</h2>\n    <table>\n        <tr>"
+            yield ''.join(f"<th>{html.escape(str(name))}</th>" for name in names)
+            yield "</tr>\n"
+            header_written = True
+        yield ''.join(
+            "        <tr>" + ''.join(f"<td>{_format_cell(value)}</td>" for value in row) + "</tr>\n"
+            for row in rows
+        )
+    if header_written:
+        yield "    </table>\n"
+
+
+# ==========================================
+# 报告分块生成
+# ==========================================
+def iter_markdown(report_store):
+    """Markdown报告（逐小节产出）"""
+    return report_store.iter_markdown()
+
+
+def iter_html(report_store, analysis_results, tables=None):
+    """HTML报告：页头、核心指标、报告正文逐小节转义输出，可附带大表"""
+    current_week = analysis_results['current_week']
+    metrics = current_week['metrics'] or {}
+    file_info = analysis_results['file_info']
+
+    yield HTML_HEAD.format(date=current_week['date'], analysis_time=analysis_results['analysis_time'])
+    yield HTML_METRICS.format(
+        total_hours=metrics.get('total_hours', 0),
+        attendance_rate=metrics.get('attendance_rate', 0) * 100,
+        correctness_rate=metrics.get('correctness_rate', 0) * 100
+    )
+    yield '\n    <div class="recommendation">\n        <h2>💡 分析与建议</h2>\n'
+    for chunk in report_store.iter_markdown():
+        yield html.escape(chunk).replace('\n', '<br>\n')
+    yield '\n    </div>\n'
+    for title, source in (tables or {}).items():
+        yield from iter_html_table(title, source)
+    yield HTML_FOOTER.format(file_name=file_info['file_name'], total_records=file_info['total_records'])
+
+
+# ==========================================
+# 输出
+# ==========================================
+def spool(chunks, encoding='utf-8'):
+    """将文本块写入临时文件（小于 SPOOL_MAX_BYTES 时留在内存），返回已回到开头的文件对象
+
+    只保证生成过程不在内存中拼接整个文件；调用方一次读出全部内容（如看板的下载按钮）时仍占用整个文件大小的内存，
+    大文件应按块读取（见 iter_file）。
+    """
+    target = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    for chunk in chunks:
+        target.write(chunk.encode(encoding))
+    target.seek(0)
+    return target
+
+
+def write_xlsx(sheets, target, chunk_rows=CHUNK_ROWS):
+    """以只写模式逐块写出XLSX工作簿（sheets: 工作表名 → 表数据）"""
+    workbook = Workbook(write_only=True)
+    for sheet_name, source in sheets.items():
+        sheet = workbook.create_sheet(title=sheet_name[:31])
+        header_written = False
+        for names, rows in iter_row_chunks(source, chunk_rows):
+            if not header_written:
+                sheet.append(names)
+                header_written = True
+            for row in rows:
+                sheet.append(row)
+    workbook.save(target)
+
+
+def iter_file(target, chunk_size=STREAM_CHUNK_BYTES):
+    """按块读出导出文件对象（用于流式响应），读完后关闭文件"""
+    try:
+        for chunk in iter(lambda: target.read(chunk_size), b''):
+            yield chunk
+    finally:
+        target.close()
+
+
+def export_report(fmt, report_store, analysis_results, tables=None):
+    """生成报告文件对象（markdown / html / text），内存占用说明见 spool"""
+    if fmt == 'html':
+        return spool(iter_html(report_store, analysis_results, tables))
+    if fmt in ('markdown', 'text'):
+        return spool(iter_markdown(report_store))
+    raise ValueError(f"不支持的报告格式: {fmt}")
+
+
+def export_tables(sheets):
+    """生成XLSX表格文件对象（逐块写出，超过 SPOOL_MAX_BYTES 时落盘；内存占用说明见 spool）"""
+    target = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    write_xlsx(sheets, target)
+    target.seek(0)
+    return target
@@ -0,0 +1,134 @@
+import os
+import json
+import shutil
+from datetime import datetime
+import pyarrow as pa
+
+# 结果存储格式版本（结构不兼容时递增）
+FORMAT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+DEFAULT_STORE_DIR = '/home/workspace/analysis_store'
+
+# 以Arrow IPC列式文件单独存放的大表（其余部分写入清单）
+TABLE_SECTIONS = ('class_week_stats', 'subject_week_stats', 'metrics_cube')
+# 大表中的文本键列（写入Arrow前统一为字符串，避免缺失值填充后混入的整数导致类型错误）
+TEXT_COLUMNS = ('班级名称', '课时学科')
+
+
+def table_from_section(value):
+    """将列式字典或记录列表转为Arrow表（文本键列统一为字符串）"""
+    if isinstance(value, list):
+        value = {key: [row[key] for row in value] for key in (value[0] if value else {})}
+    columns = dict(value)
+    for name in TEXT_COLUMNS:
+        if name in columns:
+            columns[name] = [None if v is None else str(v) for v in columns[name]]
+    return pa.table(columns)
+
+
+def save_store(results, store_dir=DEFAULT_STORE_DIR):
+    """将结果文档写为 清单JSON + Arrow IPC 列式文件
+
+    写入临时目录后整体替换，读取方不会看到写了一半的结果；写入失败时删除临时目录。
+    """
+    parent = os.path.dirname(os.path.abspath(store_dir))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = os.path.abspath(store_dir) + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    try:
+        _write_store_files(results, tmp_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    old_dir = os.path.abspath(store_dir) + '.old'
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(store_dir):
+        os.replace(store_dir, old_dir)
+    os.replace(tmp_dir, store_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def _write_store_files(results, tmp_dir):
+    """在临时目录中写出各大表的Arrow文件与清单"""
+    sections, tables = {}, {}
+    for name, value in results.items():
+        if name in TABLE_SECTIONS and value is not None:
+            table = table_from_section(value)
+            file_name = f"{name}.arrow"
+            # 不压缩，读取时可直接内存映射
+            with pa.OSFile(os.path.join(tmp_dir, file_name), 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            tables[name] = {
+                'file': file_name,
+                'rows': table.num_rows,
+                'columns': table.column_names
+            }
+        else:
+            sections[name] = value
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'created': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'sections': sections,
+        'tables': tables
+    }
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(',', ':'))
+
+
+class ResultsStore:
+    """结果存储读取器：打开时只解析清单，大表按需内存映射读取"""
+
+    def __init__(self, store_dir=DEFAULT_STORE_DIR):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        version = self.manifest.get('format_version')
+        if version != FORMAT_VERSION:
+            raise ValueError(f"不支持的结果存储版本: {version}（当前版本 {FORMAT_VERSION}）")
+        self._tables = {}
+
+    @staticmethod
+    def exists(store_dir=DEFAULT_STORE_DIR):
+        """判断目录下是否存在结果存储"""
+        return os.path.exists(os.path.join(store_dir, MANIFEST_FILE))
+
+    def section(self, name, default=None):
+        """读取清单中的小节"""
+        return self.manifest['sections'].get(name, default)
+
+    def table_names(self):
+        """列出存储中的大表"""
+        return list(self.manifest['tables'])
+
+    def table(self, name):
+        """内存映射读取Arrow表（首次访问时打开，之后复用）"""
+        if name not in self._tables:
+            info = self.manifest['tables'][name]
+            source = pa.memory_map(os.path.join(self.store_dir, info['file']), 'r')
+            self._tables[name] = pa.ipc.open_file(source).read_all()
+        return self._tables[name]
+
+    def frame(self, name, columns=None):
+        """以DataFrame形式读取大表，可只取部分列"""
+        table = self.table(name)
+        if columns is not None:
+            table = table.select(columns)
+        return table.to_pandas()
+
+    def summary(self):
+        """返回不含大表的结果文档（与 analysis_results 小节结构一致）"""
+        results = dict(self.manifest['sections'])
+        results['store_dir'] = self.store_dir
+        return results
+
+    def load_results(self):
+        """返回完整的结果文档（大表还原为列式字典）"""
+        results = dict(self.manifest['sections'])
+        for name in self.manifest['tables']:
+            results[name] = self.table(name).to_pydict()
+        return results
+
@@ -0,0 +1,119 @@
+import os
+import sys
+import json
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows 无 resource 模块，不记录内存
+    resource = None
+
+
+def peak_rss_mb():
+    """进程峰值常驻内存（MB），无法获取时返回 None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为KB，macOS 为字节
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class RunProfiler:
+    """分析流程的阶段级计时与内存记录
+
+    每个阶段记录墙钟时间、CPU时间、阶段结束时的峰值RSS及阶段内峰值增长、处理行数；
+    阶段可以嵌套。结果可写入结果文档（to_profile）或导出为 Chrome trace（chrome://tracing、Perfetto）。
+    """
+
+    def __init__(self, name='analysis'):
+        self.name = name
+        self.started = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.stages = []
+        self._origin = time.perf_counter()
+        self._depth = 0
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        """记录一个阶段；可在阶段内设置 info['rows'] 记录处理行数"""
+        info = {'rows': rows}
+        depth = self._depth
+        self._depth += 1
+        rss_before = peak_rss_mb()
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        try:
+            yield info
+        finally:
+            wall = time.perf_counter() - start
+            cpu = time.process_time() - cpu_start
+            self._depth -= 1
+            rss_after = peak_rss_mb()
+            self.stages.append({
+                'name': name,
+                'depth': depth,
+                'start_seconds': round(start - self._origin, 6),
+                'wall_seconds': round(wall, 6),
+                'cpu_seconds': round(cpu, 6),
+                'peak_rss_mb': round(rss_after, 1) if rss_after is not None else None,
+                'rss_growth_mb': round(rss_after - rss_before, 1) if rss_after is not None else None,
+                'rows': int(info['rows']) if info['rows'] is not None else None
+            })
+
+    def to_profile(self):
+        """结构化的运行概况（阶段按开始时间排序）"""
+        stages = sorted(self.stages, key=lambda stage: (stage['start_seconds'], stage['depth']))
+        peak = peak_rss_mb()
+        return {
+            'name': self.name,
+            'started': self.started,
+            'total_seconds': round(time.perf_counter() - self._origin, 6),
+            'cpu_seconds': round(sum(stage['cpu_seconds'] for stage in stages if stage['depth'] == 0), 6),
+            'peak_rss_mb': round(peak, 1) if peak is not None else None,
+            'stages': stages
+        }
+
+    def chrome_trace(self):
+        """Chrome trace 事件格式（完整事件，时间单位为微秒）"""
+        pid = os.getpid()
+        events = [{
+            'name': stage['name'],
+            'cat': self.name,
+            'ph': 'X',
+            'ts': stage['start_seconds'] * 1e6,
+            'dur': stage['wall_seconds'] * 1e6,
+            'pid': pid,
+            'tid': 0,
+            'args': {
+                'cpu_seconds': stage['cpu_seconds'],
+                'peak_rss_mb': stage['peak_rss_mb'],
+                'rss_growth_mb': stage['rss_growth_mb'],
+                'rows': stage['rows']
+            }
+        } for stage in self.stages]
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write_chrome_trace(self, path):
+        """导出 Chrome trace 文件"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.chrome_trace(), f, ensure_ascii=False)
+
+    def summary_lines(self):
+        """逐阶段的文本摘要（用于命令行输出）"""
+        lines = []
+        for stage in sorted(self.stages, key=lambda stage: (stage['start_seconds'], stage['depth'])):
+            rows = f"{stage['rows']:>10,}行" if stage['rows'] is not None else ' ' * 11
+            rss = f"{stage['peak_rss_mb']:>8.1f}MB" if stage['peak_rss_mb'] is not None else ''
+            lines.append(
+                f"{'  ' * stage['depth']}{stage['name']:<{24 - 2 * stage['depth']}} "
+                f"{stage['wall_seconds']:>8.3f}s {stage['cpu_seconds']:>8.3f}s(CPU) {rows} {rss}"
+            )
+        return lines
+
+
+def profile_stage(profiler, name, rows=None):
+    """有 profiler 时记录阶段，否则为空上下文（同样产出可写入 rows 的字典）"""
+    if profiler is None:
+        return nullcontext({'rows': rows})
+    return profiler.stage(name, rows)
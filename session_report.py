@@ -0,0 +1,131 @@
+from collections import deque
+
+# 默认容量限制
+DEFAULT_MAX_CHARS = 30000
+DEFAULT_MAX_SECTIONS = 30
+DEFAULT_KEEP_RECENT = 5
+DEFAULT_MAX_MESSAGES = 12
+DEFAULT_MAX_ARCHIVED = 20
+SUMMARY_CHARS = 120
+TITLE_CHARS = 80
+
+
+class ReportSessionStore:
+    """会话内AI报告存储
+
+    报告按小节保存：最近 keep_recent 个小节保留全文，超出字数或小节数上限时，
+    较早的小节先压缩为摘要，再合并进“历史查询摘要”小节（只保留归档总数和最近 max_archived 个标题）；
+    最近的小节本身超限时也依次压缩，再依次归档（至少保留最新一个小节）并丢弃较早的归档标题。
+    除概要 intro 与最新小节的摘要本身已超过 max_chars 外，报告总字数（total_chars）始终不超过 max_chars。
+    对话历史只保留最近 max_messages 条，因此每次重跑的渲染开销与会话长度无关。
+    """
+
+    def __init__(self, intro='', max_chars=DEFAULT_MAX_CHARS, max_sections=DEFAULT_MAX_SECTIONS,
+                 keep_recent=DEFAULT_KEEP_RECENT, max_messages=DEFAULT_MAX_MESSAGES,
+                 max_archived=DEFAULT_MAX_ARCHIVED):
+        self.intro = intro
+        self.max_chars = max_chars
+        self.max_sections = max_sections
+        self.keep_recent = keep_recent
+        self.sections = []
+        self.archived_titles = deque(maxlen=max_archived)
+        self.archived_count = 0
+        self.conversation = deque(maxlen=max_messages)
+        self.total_queries = 0
+        self._chars = len(intro)
+
+    @property
+    def total_chars(self):
+        """当前报告总字数"""
+        return self._chars
+
+    def add_exchange(self, query, response, time):
+        """记录一次问答，并把回答追加为报告小节"""
+        self.total_queries += 1
+        self.conversation.append({'role': 'user', 'content': query, 'time': time})
+        self.conversation.append({'role': 'assistant', 'content': response, 'time': time})
+        title = _truncate(f"💬 用户查询: {' '.join(query.split())}", TITLE_CHARS)
+        self.sections.append({'title': title, 'body': response, 'time': time, 'compacted': False})
+        self._chars += len(self.sections[-1]['title']) + len(response)
+        self._compact()
+
+    def _compact(self):
+        """按压缩策略控制报告规模"""
+        # 1. 将最近小节之外的全文小节压缩为摘要
+        self._summarize_sections(self.sections[:-self.keep_recent or None])
+
+        # 2. 仍超限时，将最早的小节归档为标题列表
+        while not self._within_limits() and len(self.sections) > self.keep_recent:
+            self._archive_oldest()
+
+        # 3. 最近的小节本身超限时，由旧到新压缩，仍超限则继续归档（至少保留最新一个小节）
+        self._summarize_sections(self.sections)
+        while not self._within_limits() and len(self.sections) > 1:
+            self._archive_oldest()
+
+        # 4. 仍超出字数上限时，从最早的归档标题开始丢弃
+        while self._chars > self.max_chars and self.archived_titles:
+            self._chars -= len(self.archived_titles.popleft())
+
+    def _summarize_sections(self, sections):
+        """依次将全文小节压缩为摘要，直到满足上限"""
+        for section in sections:
+            if self._within_limits():
+                return
+            if not section['compacted']:
+                summary = _summarize(section['body'])
+                self._chars -= len(section['body']) - len(summary)
+                section['body'] = summary
+                section['compacted'] = True
+
+    def _archive_oldest(self):
+        """将最早的小节归档为标题（标题列表已满时丢弃最早的标题）"""
+        section = self.sections.pop(0)
+        self._chars -= len(section['title']) + len(section['body'])
+        if self.archived_titles.maxlen:
+            if len(self.archived_titles) == self.archived_titles.maxlen:
+                self._chars -= len(self.archived_titles[0])
+            self.archived_titles.append(section['title'])
+            self._chars += len(section['title'])
+        self.archived_count += 1
+
+    def _within_limits(self):
+        return self._chars <= self.max_chars and len(self.sections) <= self.max_sections
+
+    def recent_sections(self, count):
+        """最近的若干小节（新的在后）"""
+        return self.sections[-count:] if count > 0 else []
+
+    def older_sections(self, count):
+        """最近 count 个之前的小节"""
+        return self.sections[:-count] if count > 0 else list(self.sections)
+
+    def iter_markdown(self):
+        """逐块生成完整报告的Markdown文本（用于下载）"""
+        yield self.intro
+        if self.archived_count:
+            yield "\n\n## 🗂️ 历史查询摘要\n"
+            omitted = self.archived_count - len(self.archived_titles)
+            if omitted:
+                yield f"- （另有 {omitted} 个更早的查询）\n"
+            for title in self.archived_titles:
+                yield f"- {title}\n"
+        for section in self.sections:
+            yield f"\n\n## {section['title']}\n{section['body']}"
+
+    def to_markdown(self):
+        """完整报告Markdown文本"""
+        return ''.join(self.iter_markdown())
+
+
+def _summarize(text, limit=SUMMARY_CHARS):
+    """提取小节摘要：去掉空行后保留前 limit 个字符"""
+    compact = ' '.join(line.strip() for line in text.splitlines() if line.strip())
+    return _truncate(compact, limit, '…（已压缩）')
+
+
+def _truncate(text, limit, suffix='…'):
+    """超过 limit 个字符时截断并加后缀"""
+    if len(text) <= limit:
+        return text
+    return text[:limit] + suffix
@@ -0,0 +1,130 @@
+import os
+import json
+import threading
+from collections import OrderedDict
+import pyarrow as pa
+from results_store import MANIFEST_FILE, TABLE_SECTIONS, ResultsStore, table_from_section
+
+# 默认容量：最多缓存的数据集个数与估算总字节数
+DEFAULT_MAX_ENTRIES = 32
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def freeze_results(results):
+    """将结果文档中的大表转为不可变的Arrow表，供多个会话只读共享
+
+    小节部分保持原结构（体积很小），大表不再以Python列表保存，所有会话引用同一份列式内存。
+    """
+    frozen = dict(results)
+    for name in TABLE_SECTIONS:
+        value = frozen.get(name)
+        if isinstance(value, (dict, list)):
+            frozen[name] = table_from_section(value)
+    return frozen
+
+
+def estimate_size(results):
+    """估算结果文档占用的内存字节数（Arrow表按缓冲区大小，其余部分按JSON长度）"""
+    size = 0
+    summary = {}
+    for name, value in results.items():
+        if isinstance(value, pa.Table):
+            size += value.nbytes
+        else:
+            summary[name] = value
+    return size + len(json.dumps(summary, ensure_ascii=False, default=str).encode('utf-8'))
+
+
+class SharedResultsCache:
+    """进程内共享的只读结果缓存
+
+    以数据集键（如内容哈希）缓存冻结后的结果文档，所有会话拿到同一个对象而不是各自的副本，
+    内存占用随不同数据集的数量增长，与在线用户数无关。超出条目数或估算字节数上限时按最近最少使用淘汰。
+    调用方不得修改取出的结果。
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """取出缓存的结果，未命中返回 None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, results):
+        """冻结并缓存结果，返回缓存中的共享对象"""
+        frozen = freeze_results(results)
+        size = estimate_size(frozen)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (frozen, size)
+            self._bytes += size
+            # 至少保留刚放入的条目
+            while len(self._entries) > 1 and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+        return frozen
+
+    def pop(self, key):
+        """移除条目"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[1]
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self):
+        """缓存统计：条目数、估算字节数、命中/未命中/淘汰次数"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
+def load_cached_results(cache, store_dir, results_file):
+    """读取预计算结果：优先列式结果存储的清单（大表按需读取），其次结果JSON
+
+    按文件修改时间缓存在共享缓存中，文件更新后自动重新读取；两者都不存在时抛出 FileNotFoundError。
+    """
+    if ResultsStore.exists(store_dir):
+        manifest_mtime = os.path.getmtime(os.path.join(store_dir, MANIFEST_FILE))
+        cache_key = f"store:{store_dir}:{manifest_mtime}"
+        results = cache.get(cache_key)
+        if results is None:
+            results = cache.put(cache_key, ResultsStore(store_dir).summary())
+        return results
+    cache_key = f"json:{results_file}:{os.path.getmtime(results_file)}"
+    results = cache.get(cache_key)
+    if results is None:
+        with open(results_file, 'r', encoding='utf-8') as f:
+            results = cache.put(cache_key, json.load(f))
+    return results
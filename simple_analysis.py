@@ -1,110 +1,157 @@
-import pandas as pd
-import numpy as np
+import os
 import json
-from datetime import datetime
-
-print("开始分析耀襄全周期数据...")
-
-# 读取Excel文件
-try:
-    df = pd.read_excel('/home/workspace/attachments/耀襄全周期.xlsx')
-    print(f"成功读取数据，行数: {len(df)}, 列数: {len(df.columns)}")
-except Exception as e:
-    print(f"读取文件失败: {e}")
-    exit(1)
-
-# 数据清洗
-# 1. 处理周次列
-df['周'] = pd.to_datetime(df['周'], errors='coerce')
-df = df.dropna(subset=['周'])  # 删除周次为NaN的行
-
-# 2. 填充缺失值
-df = df.fillna(0)
-
-# 3. 确保数值列的类型
-numeric_cols = ['课时数', '课时平均出勤率', '微课完成率', '题目正确率（自学+快背）']
-for col in numeric_cols:
-    if col in df.columns:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-        df[col] = df[col].fillna(0)
-
-print(f"数据清洗完成，剩余行数: {len(df)}")
-
-# 分析最新周次
-latest_week = df['周'].max()
-print(f"\n最新周次: {latest_week.strftime('%Y-%m-%d')}")
-
-# 获取最新周次数据
-current_week_data = df[df['周'] == latest_week].copy()
-print(f"最新周次数据行数: {len(current_week_data)}")
-
-# 获取前一周次数据（如果存在）
-previous_weeks = df[df['周'] < latest_week]
-if len(previous_weeks) > 0:
-    prev_week = previous_weeks['周'].max()
-    prev_week_data = df[df['周'] == prev_week].copy()
-    print(f"前一周次: {prev_week.strftime('%Y-%m-%d')}, 数据行数: {len(prev_week_data)}")
-else:
-    prev_week = None
-    prev_week_data = pd.DataFrame()
-    print("没有前一周数据")
-
-# 计算核心指标函数
-def calculate_core_metrics(data):
+import argparse
+from io import BytesIO
+import pandas as pd
+import analysis_engine
+from data_loader import clean_data, load_data
+from data_quality import DUPLICATE_SCOPES, DUPLICATES_CHUNK, DataQualityError, QualityReport
+from analysis_engine import (
+    aggregate_fine, class_stats_from_sums, metrics_from_sums, split_weeks,
+    subject_stats_from_sums, weekly_trends_from_sums
+)
+from metrics_cube import MetricsCube
+from anomaly_detection import RULE_LABELS
+from week_state import DEFAULT_STATE_FILE, WeekStateError, frozen_weeks, load_state, update_week_state
+from results_store import DEFAULT_STORE_DIR, TABLE_SECTIONS, save_store
+from run_profiler import RunProfiler, profile_stage
+from stream_ingest import DEFAULT_CHUNK_ROWS, stream_aggregate
+
+# 默认输入输出路径
+DEFAULT_INPUT_FILE = '/home/workspace/attachments/耀襄全周期.xlsx'
+DEFAULT_OUTPUT_FILE = '/home/workspace/analysis_results.json'
+
+# 超过该大小的工作簿在后台分析时分块读取，避免整表载入内存
+STREAM_MIN_BYTES = 64 * 1024 * 1024
+
+
+# ==========================================
+# 可复用的分析接口（均作用于内存中的DataFrame）
+# ==========================================
+def load(path=DEFAULT_INPUT_FILE, use_cache=True):
+    """读取并清洗工作簿，返回清洗后的DataFrame（命中缓存时跳过Excel解析和清洗）"""
+    df, _ = load_data(path, use_cache=use_cache)
+    return df
+
+
+def clean(df):
+    """清洗原始DataFrame（如上传的工作簿）"""
+    return clean_data(df)
+
+
+def compute_core_metrics(data):
     """计算核心教学指标"""
-    if len(data) == 0:
-        return None
-    
-    metrics = {
-        'total_hours': int(data['课时数'].sum()),
-        'total_classes': data['班级名称'].nunique(),
-        'total_subjects': data['课时学科'].nunique(),
-        'total_records': len(data)
-    }
-    
-    # 计算加权平均值
-    def weighted_avg(value_col):
-        total_weight = data['课时数'].sum()
-        if total_weight == 0:
-            return 0
-        return (data[value_col] * data['课时数']).sum() / total_weight
-    
-    # 核心指标
-    core_indicators = {
-        'attendance_rate': '课时平均出勤率',
-        'micro_completion_rate': '微课完成率',
-        'correctness_rate': '题目正确率（自学+快背）'
-    }
-    
-    for key, col in core_indicators.items():
-        if col in data.columns:
-            metrics[key] = float(weighted_avg(col))
-        else:
-            metrics[key] = 0.0
-    
-    return metrics
-
-# 计算当前周指标
-current_metrics = calculate_core_metrics(current_week_data)
-print(f"\n=== 当前周核心指标 ===")
-if current_metrics:
-    print(f"总课时: {current_metrics['total_hours']}")
-    print(f"涉及班级: {current_metrics['total_classes']}个")
-    print(f"涉及学科: {current_metrics['total_subjects']}门")
-    print(f"平均出勤率: {current_metrics['attendance_rate']*100:.2f}%")
-    print(f"微课完成率: {current_metrics['micro_completion_rate']*100:.2f}%")
-    print(f"题目正确率: {current_metrics['correctness_rate']*100:.2f}%")
-
-# 计算前一周指标（如果存在）
-if len(prev_week_data) > 0:
-    prev_metrics = calculate_core_metrics(prev_week_data)
-    print(f"\n=== 前一周核心指标 ===")
+    return metrics_from_sums(aggregate_fine(data))
+
+
+def class_stats(data):
+    """班级表现统计"""
+    return class_stats_from_sums(aggregate_fine(data))
+
+
+def subject_stats(data):
+    """学科表现统计"""
+    return subject_stats_from_sums(aggregate_fine(data))
+
+
+def weekly_trends(df):
+    """历史趋势（weekly_trends 记录列表）"""
+    return weekly_trends_from_sums(aggregate_fine(df))
+
+
+def cube(df):
+    """构建 周×班级×学科 指标立方体，之后任意维度的筛选与上卷不再读取原始记录"""
+    return MetricsCube.from_frame(df)
+
+
+def build_results(df, file_name='耀襄全周期.xlsx', profiler=None):
+    """由清洗后的DataFrame生成完整的 analysis_results 结果文档"""
+    with profile_stage(profiler, 'aggregate_fine', len(df)):
+        fine = aggregate_fine(df)
+    return analysis_engine.build_results(fine, file_name, profiler=profiler)
+
+
+def analyze_file(path, stream=None):
+    """分析工作簿文件，返回附带运行概况与数据质量报告的结果文档（可在后台工作进程中执行）
+
+    stream 为 None 时按文件大小决定是否分块读取。数据质量检查未通过时抛出 DataQualityError。
+    """
+    profiler = RunProfiler(os.path.basename(path))
+    if stream is None:
+        stream = os.path.getsize(path) >= STREAM_MIN_BYTES
+    if stream:
+        fine, accumulator = stream_aggregate(path, profiler=profiler)
+        quality_report = accumulator.quality.check()
+        results = analysis_engine.build_results(fine, os.path.basename(path), profiler=profiler)
+    else:
+        quality = QualityReport()
+        df, _ = load_data(path, profiler=profiler, quality=quality)
+        quality_report = quality.check()
+        results = build_results(df, os.path.basename(path), profiler)
+    results['data_quality'] = quality_report
+    results['run_profile'] = profiler.to_profile()
+    return results
+
+
+def analyze_bytes(content, file_name):
+    """分析工作簿内容（如上传的文件），返回附带运行概况与数据质量报告的结果文档"""
+    profiler = RunProfiler(file_name)
+    with profile_stage(profiler, 'read_excel') as stage:
+        df = pd.read_excel(BytesIO(content))
+        stage['rows'] = len(df)
+    quality = QualityReport()
+    df = clean_data(df, profiler, quality)
+    quality_report = quality.check()
+    results = build_results(df, file_name, profiler)
+    results['data_quality'] = quality_report
+    results['run_profile'] = profiler.to_profile()
+    return results
+
+
+def save_results(results, output_file=DEFAULT_OUTPUT_FILE, store_dir=None, profiler=None):
+    """保存分析结果：JSON文件只含摘要小节，大表写入列式结果存储"""
+    summary = {name: value for name, value in results.items() if name not in TABLE_SECTIONS}
+    with profile_stage(profiler, 'write_json'):
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+    if store_dir:
+        with profile_stage(profiler, 'write_store'):
+            save_store(results, store_dir)
+
+
+# ==========================================
+# 命令行入口
+# ==========================================
+def print_report(fine, results, class_table, subject_table):
+    """打印分析摘要"""
+    latest_week, current_week_sums, prev_week, prev_week_sums = split_weeks(fine)
+    print(f"\n最新周次: {latest_week.strftime('%Y-%m-%d')}")
+    print(f"最新周次数据行数: {int(current_week_sums['records'].sum())}")
+    if prev_week is not None:
+        print(f"前一周次: {prev_week.strftime('%Y-%m-%d')}, 数据行数: {int(prev_week_sums['records'].sum())}")
+    else:
+        print("没有前一周数据")
+
+    # 当前周指标
+    current_metrics = results['current_week']['metrics']
+    print(f"\n=== 当前周核心指标 ===")
+    if current_metrics:
+        print(f"总课时: {current_metrics['total_hours']}")
+        print(f"涉及班级: {current_metrics['total_classes']}个")
+        print(f"涉及学科: {current_metrics['total_subjects']}门")
+        print(f"平均出勤率: {current_metrics['attendance_rate']*100:.2f}%")
+        print(f"微课完成率: {current_metrics['micro_completion_rate']*100:.2f}%")
+        print(f"题目正确率: {current_metrics['correctness_rate']*100:.2f}%")
+
+    # 前一周指标（如果存在）
+    prev_metrics = results['previous_week']['metrics']
     if prev_metrics:
+        print(f"\n=== 前一周核心指标 ===")
         print(f"总课时: {prev_metrics['total_hours']}")
         print(f"平均出勤率: {prev_metrics['attendance_rate']*100:.2f}%")
         print(f"微课完成率: {prev_metrics['micro_completion_rate']*100:.2f}%")
         print(f"题目正确率: {prev_metrics['correctness_rate']*100:.2f}%")
-        
+
         # 计算变化趋势
         print(f"\n=== 周环比变化 ===")
         for key in ['total_hours', 'attendance_rate', 'micro_completion_rate', 'correctness_rate']:
@@ -116,143 +163,186 @@ if len(prev_week_data) > 0:
                     trend = "↑" if change > 0 else "↓" if change < 0 else "→"
                     print(f"{key}: {trend} {abs(change):.1f}%")
 
-# 班级表现分析
-print(f"\n=== 班级表现分析 ===")
-class_stats = current_week_data.groupby('班级名称').apply(
-    lambda x: pd.Series({
-        '总课时': int(x['课时数'].sum()),
-        '平均出勤率': (x['课时平均出勤率'] * x['课时数']).sum() / x['课时数'].sum() if x['课时数'].sum() > 0 else 0,
-        '平均微课完成率': (x['微课完成率'] * x['课时数']).sum() / x['课时数'].sum() if x['课时数'].sum() > 0 else 0,
-        '平均题目正确率': (x['题目正确率（自学+快背）'] * x['课时数']).sum() / x['课时数'].sum() if x['课时数'].sum() > 0 else 0,
-        '涉及学科': ', '.join(x['课时学科'].dropna().unique()),
-        '记录数': len(x)
-    })
-).reset_index()
-
-print(f"分析班级数量: {len(class_stats)}")
-
-# 找出最佳班级（综合表现）
-if len(class_stats) > 0:
-    class_stats['综合得分'] = (
-        class_stats['平均出勤率'] * 0.3 +
-        class_stats['平均微课完成率'] * 0.3 +
-        class_stats['平均题目正确率'] * 0.4
+    # 班级表现分析
+    print(f"\n=== 班级表现分析 ===")
+    print(f"分析班级数量: {len(class_table)}")
+
+    best_class = results['best_class']
+    if best_class['name'] is not None:
+        best_row = class_table[class_table['班级名称'] == best_class['name']].iloc[0]
+        print(f"\n🏆 最佳班级: {best_class['name']}")
+        print(f"  综合得分: {best_row['综合得分']:.3f}")
+        print(f"  总课时: {best_class['hours']}")
+        print(f"  平均出勤率: {best_class['attendance_rate']*100:.1f}%")
+        print(f"  平均题目正确率: {best_class['correctness_rate']*100:.1f}%")
+        print(f"  涉及学科: {best_class['subjects']}")
+
+    focus_class = results['focus_class']
+    if focus_class['name'] is not None:
+        print(f"\n⚠️ 重点关注班级: {focus_class['name']}")
+        print(f"  出勤率: {focus_class['attendance_rate']*100:.1f}% (高于平均 {current_metrics['attendance_rate']*100:.1f}%)")
+        print(f"  题目正确率: {focus_class['correctness_rate']*100:.1f}% (低于平均 {current_metrics['correctness_rate']*100:.1f}%)")
+        print(f"  涉及学科: {focus_class['subjects']}")
+
+    # 学科分析
+    print(f"\n=== 学科表现分析 ===")
+    print(f"分析学科数量: {len(subject_table)}")
+
+    # 显示课时最多的学科
+    top_subjects = results['top_subjects']
+    if top_subjects:
+        print(f"\n📚 课时最多的5个学科:")
+        for row in top_subjects:
+            print(f"  {row['课时学科']}: {row['总课时']}课时, 正确率:{row['平均题目正确率']*100:.1f}%, 涉及{row['涉及班级数']}个班级")
+
+    # 异常预警
+    anomalies = results['anomalies']
+    print(f"\n=== 异常预警 ===")
+    print(f"检测序列: {anomalies['series']}个 班级×学科, 异常: {anomalies['flagged']}个")
+    for alert in anomalies['alerts'][:5]:
+        rules = '、'.join(RULE_LABELS[rule] for rule in alert['rules'])
+        print(f"  🚨 {alert['class']} {alert['subject']} {alert['label']}: {alert['value']*100:.1f}% "
+              f"(近期中位数 {alert['median']*100:.1f}%) - {rules}")
+
+    # 历史趋势分析
+    print(f"\n=== 历史趋势分析 ===")
+    trends = results['weekly_trends']
+    print(f"分析周次数: {len(trends)}")
+
+    if len(trends) >= 2:
+        first_week = trends[0]
+        last_week = trends[-1]
+
+        print(f"\n📈 整体趋势对比:")
+        print(f"  从 {first_week['week']} 到 {last_week['week']}")
+        print(f"  总课时: {first_week['total_hours']} → {last_week['total_hours']}")
+        print(f"  出勤率: {first_week['attendance_rate']*100:.1f}% → {last_week['attendance_rate']*100:.1f}%")
+        print(f"  题目正确率: {first_week['correctness_rate']*100:.1f}% → {last_week['correctness_rate']*100:.1f}%")
+
+    # 趋势预测
+    forecasts = results['forecasts']
+    if forecasts['metrics']:
+        print(f"\n🔮 未来{forecasts['horizon']}周预测（至 {forecasts['weeks'][-1]}）:")
+        for key, label in [('attendance_rate', '出勤率'), ('correctness_rate', '题目正确率')]:
+            metric = forecasts['metrics'][key]
+            print(f"  {label}: {metric['values'][-1]*100:.1f}% "
+                  f"(95%区间 {metric['lower'][-1]*100:.1f}%-{metric['upper'][-1]*100:.1f}%)")
+        for item in forecasts['declining'][:5]:
+            print(f"  📉 {item['class']} {item['subject']} {item['label']}: "
+                  f"{item['trend']*100:.1f}% → {item['forecast']*100:.1f}%")
+
+
+def main(argv=None):
+    """命令行分析流程：读取 → 清洗 → 聚合 → 输出结果"""
+    parser = argparse.ArgumentParser(description='耀襄全周期数据分析')
+    parser.add_argument('--input', default=DEFAULT_INPUT_FILE, help='输入工作簿路径')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT_FILE, help='结果JSON输出路径')
+    parser.add_argument('--store-dir', default=DEFAULT_STORE_DIR, help='列式结果存储目录')
+    parser.add_argument('--incremental', action='store_true',
+                        help='增量模式：分块读取，跳过状态中已完成的周次（最近一周每次重新聚合），只清洗与聚合其余周次')
+    parser.add_argument('--state-file', default=DEFAULT_STATE_FILE, help='增量聚合状态文件路径')
+    parser.add_argument('--rebuild', action='store_true', help='丢弃已有增量状态，按全部周次重建')
+    parser.add_argument('--stream', action='store_true', help='分块读取并聚合工作簿（内存占用与总行数无关，不使用清洗缓存）')
+    parser.add_argument('--duplicates', choices=DUPLICATE_SCOPES, default=DUPLICATES_CHUNK,
+                        help='分块读取时重复记录的检查范围：all 跨块精确统计（每行占8字节）；chunk 仅块内；off 不检查')
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS, help='分块读取时每块的行数')
+    parser.add_argument('--trace', default=None, help='导出各阶段耗时的 Chrome trace 文件（chrome://tracing 或 Perfetto 打开）')
+    args = parser.parse_args(argv)
+
+    print("开始分析耀襄全周期数据...")
+    profiler = RunProfiler(os.path.basename(args.input))
+
+    state = None
+    if args.incremental and not args.rebuild:
+        try:
+            state = load_state(args.state_file, args.input)
+        except WeekStateError as e:
+            print(e)
+            return 1
+
+    if args.stream or args.incremental:
+        # 分块读取：每块清洗后立即聚合为 周×班级×学科 加权和，不保留原始数据；
+        # 增量模式下已完成周次的行在清洗前丢弃（工作簿仍需完整读取一遍）
+        try:
+            aggregated, accumulator = stream_aggregate(
+                args.input, args.chunk_rows, profiler, args.duplicates, skip_weeks=frozen_weeks(state)
+            )
+        except Exception as e:
+            print(f"读取文件失败: {e}")
+            return 1
+        print(f"分块读取完成: {accumulator.chunks} 块, 读取 {accumulator.rows_read} 行, "
+              f"跳过已完成周次 {accumulator.rows_skipped} 行, 清洗后 {accumulator.rows_kept} 行")
+        rows, aggregated_input = accumulator.rows_kept, True
+        quality = accumulator.quality
+    else:
+        # 读取并清洗数据（源文件未变化时直接复用Parquet缓存，跳过Excel解析和清洗）
+        quality = QualityReport()
+        try:
+            df, from_cache = load_data(args.input, profiler=profiler, quality=quality)
+            if from_cache:
+                print(f"命中清洗缓存，行数: {len(df)}, 列数: {len(df.columns)}")
+            else:
+                print(f"成功读取数据，行数: {len(df)}, 列数: {len(df.columns)}")
+        except Exception as e:
+            print(f"读取文件失败: {e}")
+            return 1
+
+        print(f"数据清洗完成，剩余行数: {len(df)}")
+        rows, aggregated_input = len(df), False
+
+    # 数据质量：错误级问题直接停止分析，警告随结果保存
+    try:
+        quality_report = quality.check()
+    except DataQualityError as e:
+        print(e)
+        return 1
+    print(f"数据质量: {quality_report['status']}, 有效行 {quality_report['usable_rows']}/{quality_report['rows']}")
+    for issue in quality_report['issues']:
+        print(f"  ⚠️ {issue['message']}")
+
+    # 聚合为 周×班级×学科 加权和，后续所有指标均由此计算
+    if args.incremental:
+        with profile_stage(profiler, 'update_week_state', rows):
+            fine, updated_weeks = update_week_state(aggregated, args.state_file, args.input, state)
+        print(f"增量模式: 更新周次 {len(updated_weeks)} 个（数据质量仅检查这些周次）, 状态文件: {args.state_file}")
+    elif aggregated_input:
+        fine = aggregated
+    else:
+        with profile_stage(profiler, 'aggregate_fine', rows):
+            fine = aggregate_fine(df)
+
+    # 各视图均为立方体的切片
+    current_week = MetricsCube(fine).current_week()
+    with profile_stage(profiler, 'class_stats', len(current_week)):
+        class_table = current_week.class_stats()
+    with profile_stage(profiler, 'subject_stats', len(current_week)):
+        subject_table = current_week.subject_stats()
+    results = analysis_engine.build_results(
+        fine, os.path.basename(args.input), class_table, subject_table, profiler=profiler
     )
-    
-    best_class_idx = class_stats['综合得分'].idxmax()
-    best_class = class_stats.loc[best_class_idx]
-    
-    print(f"\n🏆 最佳班级: {best_class['班级名称']}")
-    print(f"  综合得分: {best_class['综合得分']:.3f}")
-    print(f"  总课时: {best_class['总课时']}")
-    print(f"  平均出勤率: {best_class['平均出勤率']*100:.1f}%")
-    print(f"  平均题目正确率: {best_class['平均题目正确率']*100:.1f}%")
-    print(f"  涉及学科: {best_class['涉及学科']}")
-
-# 找出需要关注的班级（出勤正常但正确率低）
-if current_metrics and len(class_stats) > 0:
-    focus_classes = class_stats[
-        (class_stats['平均出勤率'] > current_metrics['attendance_rate']) & 
-        (class_stats['平均题目正确率'] < current_metrics['correctness_rate'])
-    ]
-    
-    if len(focus_classes) > 0:
-        focus_class = focus_classes.iloc[0]
-        print(f"\n⚠️ 重点关注班级: {focus_class['班级名称']}")
-        print(f"  出勤率: {focus_class['平均出勤率']*100:.1f}% (高于平均 {current_metrics['attendance_rate']*100:.1f}%)")
-        print(f"  题目正确率: {focus_class['平均题目正确率']*100:.1f}% (低于平均 {current_metrics['correctness_rate']*100:.1f}%)")
-        print(f"  涉及学科: {focus_class['涉及学科']}")
-
-# 学科分析
-print(f"\n=== 学科表现分析 ===")
-subject_stats = current_week_data.groupby('课时学科').apply(
-    lambda x: pd.Series({
-        '总课时': int(x['课时数'].sum()),
-        '平均出勤率': (x['课时平均出勤率'] * x['课时数']).sum() / x['课时数'].sum() if x['课时数'].sum() > 0 else 0,
-        '平均题目正确率': (x['题目正确率（自学+快背）'] * x['课时数']).sum() / x['课时数'].sum() if x['课时数'].sum() > 0 else 0,
-        '涉及班级数': x['班级名称'].nunique(),
-        '记录数': len(x)
-    })
-).reset_index()
-
-print(f"分析学科数量: {len(subject_stats)}")
-
-# 显示课时最多的学科
-if len(subject_stats) > 0:
-    top_subjects = subject_stats.sort_values('总课时', ascending=False).head(5)
-    print(f"\n📚 课时最多的5个学科:")
-    for _, row in top_subjects.iterrows():
-        print(f"  {row['课时学科']}: {row['总课时']}课时, 正确率:{row['平均题目正确率']*100:.1f}%, 涉及{row['涉及班级数']}个班级")
-
-# 历史趋势分析
-print(f"\n=== 历史趋势分析 ===")
-weekly_trends = []
-for week in sorted(df['周'].unique()):
-    week_data = df[df['周'] == week]
-    metrics = calculate_core_metrics(week_data)
-    if metrics:
-        weekly_trends.append({
-            'week': week.strftime('%Y-%m-%d'),
-            'total_hours': metrics['total_hours'],
-            'attendance_rate': metrics['attendance_rate'],
-            'correctness_rate': metrics['correctness_rate'],
-            'class_count': metrics['total_classes']
-        })
-
-print(f"分析周次数: {len(weekly_trends)}")
-
-if len(weekly_trends) >= 2:
-    first_week = weekly_trends[0]
-    last_week = weekly_trends[-1]
-    
-    print(f"\n📈 整体趋势对比:")
-    print(f"  从 {first_week['week']} 到 {last_week['week']}")
-    print(f"  总课时: {first_week['total_hours']} → {last_week['total_hours']}")
-    print(f"  出勤率: {first_week['attendance_rate']*100:.1f}% → {last_week['attendance_rate']*100:.1f}%")
-    print(f"  题目正确率: {first_week['correctness_rate']*100:.1f}% → {last_week['correctness_rate']*100:.1f}%")
-
-# 保存分析结果
-analysis_results = {
-    'file_info': {
-        'file_name': '耀襄全周期.xlsx',
-        'total_records': len(df),
-        'date_range': {
-            'start': df['周'].min().strftime('%Y-%m-%d'),
-            'end': df['周'].max().strftime('%Y-%m-%d')
-        }
-    },
-    'current_week': {
-        'date': latest_week.strftime('%Y-%m-%d'),
-        'metrics': current_metrics,
-        'class_stats_count': len(class_stats) if 'class_stats' in locals() else 0,
-        'subject_stats_count': len(subject_stats) if 'subject_stats' in locals() else 0
-    },
-    'best_class': {
-        'name': best_class['班级名称'] if 'best_class' in locals() else None,
-        'hours': int(best_class['总课时']) if 'best_class' in locals() else 0,
-        'attendance_rate': float(best_class['平均出勤率']) if 'best_class' in locals() else 0,
-        'correctness_rate': float(best_class['平均题目正确率']) if 'best_class' in locals() else 0,
-        'subjects': best_class['涉及学科'] if 'best_class' in locals() else ''
-    },
-    'focus_class': {
-        'name': focus_class['班级名称'] if 'focus_class' in locals() else None,
-        'attendance_rate': float(focus_class['平均出勤率']) if 'focus_class' in locals() else 0,
-        'correctness_rate': float(focus_class['平均题目正确率']) if 'focus_class' in locals() else 0,
-        'subjects': focus_class['涉及学科'] if 'focus_class' in locals() else ''
-    },
-    'top_subjects': top_subjects[['课时学科', '总课时', '平均题目正确率', '涉及班级数']].to_dict('records') if 'top_subjects' in locals() and len(top_subjects) > 0 else [],
-    'weekly_trends': weekly_trends,
-    'analysis_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-}
-
-# 保存到JSON文件
-output_file = '/home/workspace/analysis_results.json'
-with open(output_file, 'w', encoding='utf-8') as f:
-    json.dump(analysis_results, f, ensure_ascii=False, indent=2, default=str)
-
-print(f"\n✅ 分析完成!")
-print(f"分析结果已保存到: {output_file}")
-print(f"总分析记录: {len(df)}条")
-print(f"涉及周次: {len(weekly_trends)}周")
-print(f"涉及班级: {df['班级名称'].nunique()}个")
-print(f"涉及学科: {df['课时学科'].nunique()}门")
\ No newline at end of file
+    print_report(fine, results, class_table, subject_table)
+
+    # 数据质量报告与运行概况随结果保存（写出阶段本身的耗时见下方摘要和 Chrome trace）
+    results['data_quality'] = quality_report
+    results['run_profile'] = profiler.to_profile()
+    save_results(results, args.output, args.store_dir, profiler)
+
+    print(f"\n=== 各阶段耗时 ===")
+    for line in profiler.summary_lines():
+        print(line)
+    if args.trace:
+        profiler.write_chrome_trace(args.trace)
+        print(f"Chrome trace 已保存到: {args.trace}")
+
+    print(f"\n✅ 分析完成!")
+    print(f"分析结果已保存到: {args.output}")
+    print(f"列式结果存储: {args.store_dir}")
+    print(f"总分析记录: {results['file_info']['total_records']}条")
+    print(f"涉及周次: {len(results['weekly_trends'])}周")
+    print(f"涉及班级: {fine['班级名称'].nunique()}个")
+    print(f"涉及学科: {fine['课时学科'].nunique()}门")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,113 @@
+import os
+import pandas as pd
+from openpyxl import load_workbook
+from analysis_engine import FINE_KEYS, aggregate_fine, sum_columns
+from data_loader import clean_data
+from data_quality import DUPLICATES_CHUNK, QualityReport, check_schema
+from run_profiler import profile_stage
+
+# 每块读取的行数
+DEFAULT_CHUNK_ROWS = 50_000
+
+
+def iter_workbook_chunks(path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """以只读模式逐行读取工作簿第一个工作表，按块产出DataFrame（首行为表头）"""
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        # 忽略没有表头的空白列
+        keep = [i for i, name in enumerate(header) if name is not None]
+        columns = [str(header[i]) for i in keep]
+        buffer = []
+        for row in rows:
+            if row is None or all(value is None for value in row):
+                continue
+            buffer.append([row[i] if i < len(row) else None for i in keep])
+            if len(buffer) >= chunk_rows:
+                yield pd.DataFrame(buffer, columns=columns)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=columns)
+    finally:
+        workbook.close()
+
+
+def iter_csv_chunks(path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """按块读取CSV导出文件"""
+    yield from pd.read_csv(path, chunksize=chunk_rows)
+
+
+def iter_chunks(path, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """按扩展名选择分块读取方式"""
+    if os.path.splitext(path)[1].lower() == '.csv':
+        return iter_csv_chunks(path, chunk_rows)
+    return iter_workbook_chunks(path, chunk_rows)
+
+
+class FineAccumulator:
+    """周×班级×学科 加权和累加器
+
+    每块数据清洗后先聚合为细粒度加权和，再与已有结果合并，
+    内存占用取决于块大小和分组数，与总行数无关。合并保持各组首次出现的顺序，
+    结果与一次性读取全部数据后 aggregate_fine 的结果一致。
+    各块的数据质量检查累加到同一份报告（quality），缺少必需列时在第一块即失败；
+    重复记录默认只在块内检查，内存占用同样与总行数无关（跨块精确检查见 data_quality.DUPLICATES_ALL）。
+    skip_weeks 中的周次（如增量状态中已完成的周次）在清洗前丢弃，不做清洗、质量检查与聚合。
+    """
+
+    def __init__(self, duplicate_scope=DUPLICATES_CHUNK, skip_weeks=None):
+        self.fine = None
+        self.rows_read = 0
+        self.rows_skipped = 0
+        self.rows_kept = 0
+        self.chunks = 0
+        self.quality = QualityReport(duplicate_scope)
+        self.skip_weeks = list(skip_weeks or [])
+
+    def add(self, chunk):
+        """清洗一块原始数据并累加"""
+        self.rows_read += len(chunk)
+        self.chunks += 1
+        if self.skip_weeks:
+            check_schema(chunk.columns)
+            skipped = pd.to_datetime(chunk['周'], errors='coerce').isin(self.skip_weeks)
+            self.rows_skipped += int(skipped.sum())
+            chunk = chunk[~skipped]
+            if len(chunk) == 0:
+                return
+        clean = clean_data(chunk, quality=self.quality)
+        self.rows_kept += len(clean)
+        if len(clean) > 0:
+            self.merge(aggregate_fine(clean))
+
+    def merge(self, partial):
+        """合并一份细粒度加权和"""
+        if self.fine is None:
+            self.fine = partial
+            return
+        combined = pd.concat([self.fine, partial], ignore_index=True)
+        columns = [col for col in sum_columns() if col in combined.columns]
+        self.fine = combined.groupby(FINE_KEYS, sort=False)[columns].sum().reset_index()
+
+    def result(self):
+        """累加得到的细粒度加权和（没有有效数据时为空表）"""
+        if self.fine is None:
+            return pd.DataFrame(columns=FINE_KEYS + sum_columns())
+        return self.fine
+
+
+def stream_aggregate(path, chunk_rows=DEFAULT_CHUNK_ROWS, profiler=None, duplicate_scope=DUPLICATES_CHUNK,
+                     skip_weeks=None):
+    """分块读取、清洗并聚合工作簿，返回 (细粒度加权和, 累加器)
+
+    传入 profiler 时整个读取过程记为一个阶段（逐块阶段过多，不单独记录）；duplicate_scope 与 skip_weeks 见 FineAccumulator。
+    """
+    accumulator = FineAccumulator(duplicate_scope, skip_weeks)
+    with profile_stage(profiler, 'stream_ingest') as stage:
+        for chunk in iter_chunks(path, chunk_rows):
+            accumulator.add(chunk)
+        stage['rows'] = accumulator.rows_read
+    return accumulator.result(), accumulator
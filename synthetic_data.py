@@ -0,0 +1,100 @@
+import argparse
+import numpy as np
+import pandas as pd
+from data_loader import NUMERIC_COLS, clean_data
+
+# 与真实工作簿一致的列
+RAW_COLUMNS = ['周', '班级名称', '课时学科'] + NUMERIC_COLS
+SUBJECTS = ['语文', '数学', '英语', '物理', '化学', '生物', '政治', '历史', '地理']
+GRADES = [2023, 2024, 2025]
+
+# Excel工作表行数上限（不含表头）
+EXCEL_MAX_ROWS = 1_048_575
+
+
+def class_names(count, grades=GRADES):
+    """生成班级名称，如 2024级3班（按年级轮流编号）"""
+    return [f"{grades[i % len(grades)]}级{i // len(grades) + 1}班" for i in range(count)]
+
+
+def subject_names(count):
+    """生成学科名称：不超过真实学科数时取真实名称，否则追加编号学科"""
+    return SUBJECTS[:count] + [f"学科{i}" for i in range(len(SUBJECTS), count)]
+
+
+def make_raw_frame(rows, weeks=20, classes=30, subjects=len(SUBJECTS), start='2025-09-07',
+                   dirty_ratio=0.0, seed=0):
+    """生成与原始工作簿结构一致的合成数据（清洗前）
+
+    周次为 ISO 日期字符串；各班级有稳定的出勤/正确率水平并叠加逐行噪声；
+    dirty_ratio 控制缺失值、非法数值和非法周次所占比例，用于覆盖清洗逻辑。
+    """
+    rng = np.random.default_rng(seed)
+    week_values = pd.date_range(start, periods=weeks, freq='W').strftime('%Y-%m-%dT00:00:00.000000000')
+    class_index = rng.integers(0, classes, rows)
+    subject_index = rng.integers(0, subjects, rows)
+
+    # 班级基线水平 + 行级噪声，截断到 [0, 1]
+    attendance_base = rng.beta(8, 3, classes)
+    correctness_base = rng.beta(5, 4, classes)
+    attendance = np.clip(attendance_base[class_index] + rng.normal(0, 0.08, rows), 0, 1)
+    correctness = np.clip(correctness_base[class_index] + rng.normal(0, 0.12, rows), 0, 1)
+    completion = np.clip(attendance * rng.beta(6, 3, rows), 0, 1)
+
+    df = pd.DataFrame({
+        '周': np.asarray(week_values, dtype=object)[rng.integers(0, weeks, rows)],
+        '班级名称': pd.Categorical.from_codes(class_index, class_names(classes)).astype(object),
+        '课时学科': pd.Categorical.from_codes(subject_index, subject_names(subjects)).astype(object),
+        '课时数': rng.choice([0, 1, 1, 1, 2, 2, 3], rows),
+        '课时平均出勤率': attendance,
+        '微课完成率': completion,
+        '题目正确率（自学+快背）': correctness
+    })
+
+    if dirty_ratio > 0:
+        df = df.astype({col: object for col in NUMERIC_COLS})
+        dirty = rng.random((rows, len(NUMERIC_COLS))) < dirty_ratio
+        for j, col in enumerate(NUMERIC_COLS):
+            mask = dirty[:, j]
+            df.loc[mask, col] = np.where(rng.random(mask.sum()) < 0.5, None, '—')
+        bad_weeks = rng.random(rows) < dirty_ratio / 4
+        df.loc[bad_weeks, '周'] = np.where(rng.random(bad_weeks.sum()) < 0.5, None, '未知周次')
+    return df
+
+
+def make_frame(rows, weeks=40, classes=300, subjects=len(SUBJECTS), seed=0):
+    """生成清洗后结构的合成数据（周次已解析为日期，数值列为浮点数）"""
+    return clean_data(make_raw_frame(rows, weeks=weeks, classes=classes, subjects=subjects, seed=seed))
+
+
+def write_workbook(df, path):
+    """将合成数据写为Excel工作簿"""
+    if len(df) > EXCEL_MAX_ROWS:
+        raise ValueError(f"行数 {len(df)} 超过Excel单表上限 {EXCEL_MAX_ROWS}")
+    df.to_excel(path, index=False)
+
+
+def main(argv=None):
+    """命令行：生成合成工作簿"""
+    parser = argparse.ArgumentParser(description='生成合成教学数据工作簿')
+    parser.add_argument('output', help='输出路径（.xlsx 或 .parquet）')
+    parser.add_argument('--rows', type=int, default=100_000, help='行数')
+    parser.add_argument('--weeks', type=int, default=20, help='周次数')
+    parser.add_argument('--classes', type=int, default=30, help='班级数')
+    parser.add_argument('--subjects', type=int, default=len(SUBJECTS), help='学科数')
+    parser.add_argument('--dirty-ratio', type=float, default=0.0, help='缺失/非法值比例')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    args = parser.parse_args(argv)
+
+    df = make_raw_frame(args.rows, args.weeks, args.classes, args.subjects,
+                        dirty_ratio=args.dirty_ratio, seed=args.seed)
+    if args.output.endswith('.parquet'):
+        df.astype({col: str for col in df.columns if df[col].dtype == object}).to_parquet(args.output, index=False)
+    else:
+        write_workbook(df, args.output)
+    print(f"已生成 {len(df)} 行合成数据: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,202 @@
+import io
+import json
+import asyncio
+import threading
+from urllib.parse import urlencode
+import pytest
+from openpyxl import load_workbook
+from analysis_api import AnalysisService, create_app
+from simple_analysis import analyze_file, save_results
+from synthetic_data import make_raw_frame, write_workbook
+
+
+# ==========================================
+# 进程内测试客户端
+# ==========================================
+class LocalResponse:
+    """测试客户端响应"""
+
+    def __init__(self, status_code, headers, body):
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class LocalClient:
+    """进程内ASGI测试客户端：不经网络直接调用应用，可用 asyncio.gather 并发请求"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def arequest(self, method, path, params=None, payload=None):
+        body = b'' if payload is None else json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': method,
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode('utf-8'),
+            'root_path': '',
+            'query_string': urlencode(params or {}).encode('ascii'),
+            'headers': [
+                (b'host', b'testserver'),
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode('ascii'))
+            ],
+            'client': ('127.0.0.1', 0),
+            'server': ('testserver', 80)
+        }
+        messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+        response = {'status': None, 'headers': {}, 'body': []}
+        finished = asyncio.Event()
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            # 响应发送完之前客户端保持连接（流式响应会监听断开）
+            await finished.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+                response['headers'] = {
+                    key.decode('latin-1'): value.decode('latin-1') for key, value in message['headers']
+                }
+            elif message['type'] == 'http.response.body':
+                response['body'].append(message.get('body', b''))
+                if not message.get('more_body', False):
+                    finished.set()
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            finished.set()
+        return LocalResponse(response['status'], response['headers'], b''.join(response['body']))
+
+    def request(self, method, path, params=None, payload=None):
+        return asyncio.run(self.arequest(method, path, params, payload))
+
+    def get(self, path, params=None):
+        return self.request('GET', path, params)
+
+    def post(self, path, payload=None):
+        return self.request('POST', path, payload=payload)
+
+
+@pytest.fixture(scope='module')
+def analysis_paths(tmp_path_factory):
+    """合成工作簿的分析结果：(结果JSON路径, 列式存储目录)"""
+    tmp_dir = tmp_path_factory.mktemp('api')
+    workbook = tmp_dir / 'synthetic.xlsx'
+    write_workbook(make_raw_frame(3000, weeks=12, classes=8), str(workbook))
+    results_file, store_dir = str(tmp_dir / 'results.json'), str(tmp_dir / 'store')
+    save_results(analyze_file(str(workbook)), results_file, store_dir)
+    return results_file, store_dir
+
+
+class RecordingService(AnalysisService):
+    """记录加载结果时所在线程的分析服务"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threads = set()
+
+    def results(self):
+        self.threads.add(threading.get_ident())
+        return super().results()
+
+
+@pytest.fixture
+def service(analysis_paths):
+    results_file, store_dir = analysis_paths
+    return RecordingService(store_dir, results_file)
+
+
+@pytest.fixture
+def client(service):
+    return LocalClient(create_app(service))
+
+
+def test_health(client):
+    response = client.get('/health')
+    assert response.status_code == 200
+    assert response.json() == {'status': 'ok'}
+
+
+def test_missing_results_return_503(tmp_path):
+    client = LocalClient(create_app(AnalysisService(str(tmp_path / 'store'), str(tmp_path / 'none.json'))))
+    for path in ['/api/metrics', '/api/trends', '/api/classes', '/api/cube', '/api/export/tables']:
+        assert client.get(path).status_code == 503
+    assert client.get('/api/query', {'q': '出勤'}).status_code == 503
+
+
+def test_metrics_and_trends(client):
+    metrics = client.get('/api/metrics').json()
+    trends = client.get('/api/trends').json()['weekly_trends']
+    assert metrics['current_week']['date'] == trends[-1]['week']
+    assert metrics['file_info']['file_name'] == 'synthetic.xlsx'
+
+
+@pytest.mark.parametrize('path, key', [('/api/classes', 'classes'), ('/api/subjects', 'subjects')])
+def test_week_tables(client, path, key):
+    current = client.get(path).json()
+    assert current[key] and all(row['周'] == current['week'] for row in current[key])
+
+    first_week = client.get('/api/trends').json()['weekly_trends'][0]['week']
+    assert client.get(path, {'week': first_week}).json()['week'] == first_week
+    assert client.get(path, {'week': '1999-01-01'}).status_code == 404
+
+
+@pytest.mark.parametrize('path', ['/api/anomalies', '/api/forecasts', '/api/quality'])
+def test_result_sections(client, path):
+    assert client.get(path).status_code == 200
+
+
+def test_cube(client):
+    overall = client.get('/api/cube').json()
+    assert overall['by'] == [] and overall['metrics']['total_hours'] > 0
+
+    rows = client.get('/api/cube', {'by': '周', 'last_weeks': 4}).json()['rows']
+    assert len(rows) == 4
+    assert client.get('/api/cube', {'by': '年级'}).status_code == 400
+    assert client.get('/api/cube', {'last_weeks': 'abc'}).status_code == 400
+
+
+def test_query(client):
+    by_get = client.get('/api/query', {'q': '题目正确率改进建议'}).json()
+    assert by_get['intents'][0] == 'correctness'
+    by_post = client.post('/api/query', {'query': '题目正确率改进建议'}).json()
+    assert by_post == by_get
+    assert client.post('/api/query', {'context': '教研'}).status_code == 400
+    assert client.post('/api/query', ['出勤']).status_code == 400
+
+
+def test_export_tables(client):
+    response = client.get('/api/export/tables')
+    assert response.status_code == 200
+    assert 'attachment' in response.headers['content-disposition']
+    workbook = load_workbook(io.BytesIO(response.body), read_only=True)
+    assert workbook.sheetnames == ['周趋势', '班级周统计', '学科周统计']
+
+
+def test_blocking_handlers_run_off_event_loop(client, service):
+    """阻塞的处理函数在线程池中执行，并发请求不占用事件循环线程"""
+    paths = ['/api/metrics', '/api/classes', '/api/cube', '/api/anomalies', '/api/quality']
+
+    async def run():
+        loop_thread = threading.get_ident()
+        responses = await asyncio.gather(
+            *(client.arequest('GET', path) for path in paths),
+            client.arequest('POST', '/api/query', payload={'query': '出勤'})
+        )
+        return loop_thread, responses
+
+    loop_thread, responses = asyncio.run(run())
+    assert all(response.status_code == 200 for response in responses)
+    assert service.threads and loop_thread not in service.threads
@@ -0,0 +1,36 @@
+import pandas as pd
+import pytest
+from data_loader import load_data
+from data_quality import QualityReport
+from synthetic_data import make_raw_frame, write_workbook
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    raw = make_raw_frame(500, weeks=6, classes=5, dirty_ratio=0.05)
+    # 缺失的班级/学科在清洗后为 "0"，数字班级名称与文本混在同一列
+    raw['班级名称'] = raw['班级名称'].astype(object)
+    raw.loc[raw.index[:20], '班级名称'] = 101
+    path = tmp_path / 'school.xlsx'
+    write_workbook(raw, str(path))
+    return str(path)
+
+
+def test_cache_hit_matches_fresh_parse(workbook, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    fresh_quality, cached_quality = QualityReport(), QualityReport()
+    fresh, fresh_from_cache = load_data(workbook, cache_dir=cache_dir, quality=fresh_quality)
+    cached, cached_from_cache = load_data(workbook, cache_dir=cache_dir, quality=cached_quality)
+
+    assert (fresh_from_cache, cached_from_cache) == (False, True)
+    assert fresh.dtypes.to_dict() == cached.dtypes.to_dict()
+    pd.testing.assert_frame_equal(fresh, cached)
+    assert cached_quality.to_dict() == fresh_quality.to_dict()
+
+
+def test_cache_matches_uncached_load(workbook, tmp_path):
+    uncached, _ = load_data(workbook, use_cache=False)
+    load_data(workbook, cache_dir=str(tmp_path / 'cache'))
+    cached, from_cache = load_data(workbook, cache_dir=str(tmp_path / 'cache'))
+    assert from_cache
+    pd.testing.assert_frame_equal(uncached, cached)
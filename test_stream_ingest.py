@@ -0,0 +1,51 @@
+import pandas as pd
+import pytest
+from analysis_engine import FINE_KEYS, aggregate_fine
+from data_loader import clean_data, read_workbook
+from stream_ingest import stream_aggregate
+from synthetic_data import make_raw_frame, write_workbook
+
+
+def sorted_fine(fine):
+    """按分组键排序，便于比较分块与一次性聚合的结果"""
+    return fine.sort_values(FINE_KEYS).reset_index(drop=True)
+
+
+def assert_same_fine(streamed, full):
+    pd.testing.assert_frame_equal(sorted_fine(streamed), sorted_fine(full))
+
+
+@pytest.fixture(scope='module')
+def workbook(tmp_path_factory):
+    path = tmp_path_factory.mktemp('stream') / 'synthetic.xlsx'
+    write_workbook(make_raw_frame(600, weeks=8, classes=6, dirty_ratio=0.02), str(path))
+    return str(path)
+
+
+@pytest.mark.parametrize('chunk_rows', [7, 64, 250, 10_000])
+def test_stream_matches_full_ingest(workbook, chunk_rows):
+    streamed, accumulator = stream_aggregate(workbook, chunk_rows=chunk_rows)
+    full = clean_data(read_workbook(workbook))
+    assert accumulator.rows_kept == len(full)
+    assert_same_fine(streamed, aggregate_fine(full))
+
+
+@pytest.mark.parametrize('chunk_rows', [1, 2, 3, 5])
+def test_numeric_class_names_do_not_depend_on_chunking(tmp_path, chunk_rows):
+    """某块的班级名称全为数字、另一块为混合类型时，101 仍是同一个班级"""
+    raw = pd.DataFrame({
+        '周': ['2025-09-07'] * 5,
+        '班级名称': [101, 101, 101, 101, '二班'],
+        '课时学科': ['英语'] * 5,
+        '课时数': [1] * 5,
+        '课时平均出勤率': [0.9] * 5,
+        '微课完成率': [0.8] * 5,
+        '题目正确率（自学+快背）': [0.7] * 5
+    })
+    path = tmp_path / 'classes.csv'
+    raw.to_csv(path, index=False)
+
+    streamed, _ = stream_aggregate(str(path), chunk_rows=chunk_rows)
+    full = aggregate_fine(clean_data(pd.read_csv(path)))
+    assert_same_fine(streamed, full)
+    assert streamed.set_index('班级名称').loc['101', '课时数'] == 4
@@ -0,0 +1,103 @@
+import json
+import pandas as pd
+import pytest
+from analysis_engine import FINE_KEYS, aggregate_fine
+from data_loader import clean_data
+from simple_analysis import main
+from stream_ingest import stream_aggregate
+from synthetic_data import make_raw_frame, write_workbook
+from week_state import WeekStateError, frozen_weeks, load_state, update_week_state
+
+
+def sorted_fine(fine):
+    return fine.sort_values(FINE_KEYS).reset_index(drop=True)
+
+
+def rounded(value, digits=9):
+    """递归舍入浮点数（求和顺序不同带来的末位误差不影响比较）"""
+    if isinstance(value, float):
+        return round(value, digits)
+    if isinstance(value, dict):
+        return {key: rounded(item, digits) for key, item in value.items()}
+    if isinstance(value, list):
+        return [rounded(item, digits) for item in value]
+    return value
+
+
+@pytest.fixture(scope='module')
+def raw():
+    return make_raw_frame(800, weeks=8, classes=6, dirty_ratio=0.02)
+
+
+def first_run_rows(raw):
+    """第一次运行时的数据：前5周，第5周只有一部分记录（其余在第二次运行前补录）"""
+    weeks = pd.to_datetime(raw['周'], errors='coerce')
+    week_list = sorted(weeks.dropna().unique())
+    fifth = weeks == week_list[4]
+    late = fifth & (raw.index % 2 == 0)
+    return raw[(weeks <= week_list[4]) & ~late]
+
+
+def run_incremental(path, state_file, rebuild=False):
+    state = None if rebuild else load_state(state_file, path)
+    delta, accumulator = stream_aggregate(path, chunk_rows=100, skip_weeks=frozen_weeks(state))
+    fine, weeks = update_week_state(delta, state_file, path, state)
+    return fine, weeks, accumulator
+
+
+def test_two_incremental_runs_match_full_aggregation(tmp_path, raw):
+    workbook, state_file = str(tmp_path / 'school.xlsx'), str(tmp_path / 'state.parquet')
+    write_workbook(first_run_rows(raw), workbook)
+    _, first_weeks, _ = run_incremental(workbook, state_file)
+    assert len(first_weeks) == 5
+
+    write_workbook(raw, workbook)
+    fine, weeks, accumulator = run_incremental(workbook, state_file)
+    # 前4周已完成，在清洗前跳过；第5周（上次的最近一周）连同补录记录重新聚合
+    assert len(weeks) == 4
+    assert accumulator.rows_skipped > 0
+    assert accumulator.rows_kept < len(clean_data(raw))
+
+    full = aggregate_fine(clean_data(raw))
+    pd.testing.assert_frame_equal(sorted_fine(fine), sorted_fine(full), check_dtype=False)
+
+
+def test_state_from_another_source_is_refused(tmp_path, raw):
+    workbook, other, state_file = (str(tmp_path / name) for name in ['a.xlsx', 'b.xlsx', 'state.parquet'])
+    write_workbook(raw, workbook)
+    write_workbook(raw, other)
+    run_incremental(workbook, state_file)
+
+    with pytest.raises(WeekStateError):
+        run_incremental(other, state_file)
+    fine, _, _ = run_incremental(other, state_file, rebuild=True)
+    assert load_state(state_file, other) is not None
+    assert len(fine) == len(aggregate_fine(clean_data(raw)))
+
+
+def test_state_without_source_metadata_is_refused(tmp_path, raw):
+    state_file = str(tmp_path / 'state.parquet')
+    aggregate_fine(clean_data(raw)).to_parquet(state_file, index=False)
+    with pytest.raises(WeekStateError):
+        load_state(state_file, str(tmp_path / 'school.xlsx'))
+
+
+def test_cli_incremental_matches_full_mode(tmp_path, raw):
+    workbook = str(tmp_path / 'school.xlsx')
+
+    def run(name, *extra):
+        output = str(tmp_path / f'{name}.json')
+        argv = ['--input', workbook, '--output', output, '--store-dir', str(tmp_path / f'{name}_store')]
+        assert main(argv + list(extra)) == 0
+        with open(output, encoding='utf-8') as f:
+            return json.load(f)
+
+    incremental = ['--state-file', str(tmp_path / 'state.parquet'), '--incremental']
+    write_workbook(first_run_rows(raw), workbook)
+    run('first', *incremental)
+    write_workbook(raw, workbook)
+    second = run('second', *incremental)
+    full = run('full')
+
+    for section in ['weekly_trends', 'current_week', 'previous_week', 'best_class', 'focus_class']:
+        assert rounded(second[section]) == rounded(full[section]), section
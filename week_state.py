@@ -0,0 +1,95 @@
+import os
+import json
+import pandas as pd
+from analysis_engine import FINE_KEYS, sum_columns
+
+# 默认增量状态文件
+DEFAULT_STATE_FILE = '/home/workspace/analysis_state.parquet'
+# 状态格式版本（格式变化时递增，旧状态需重建）
+STATE_VERSION = 2
+# 状态文件中保存来源信息的Parquet元数据键
+STATE_METADATA_KEY = b'week_state'
+
+
+class WeekStateError(ValueError):
+    """增量状态不能用于当前输入（属于其他源文件或格式版本不兼容），需要重建"""
+
+
+def state_source(input_path):
+    """状态记录的源文件标识（绝对路径）"""
+    return os.path.abspath(input_path)
+
+
+def read_state_info(path):
+    """读取状态文件的来源信息 {'version', 'source'}（旧版本状态没有时返回空字典）"""
+    import pyarrow.parquet as pq
+
+    metadata = pq.read_schema(path).metadata or {}
+    if STATE_METADATA_KEY not in metadata:
+        return {}
+    return json.loads(metadata[STATE_METADATA_KEY])
+
+
+def load_state(path, input_path=None):
+    """读取增量聚合状态（周×班级×学科 加权和），不存在时返回None
+
+    传入 input_path 时检查状态是否由同一源文件生成，不一致或版本不兼容时抛出 WeekStateError。
+    """
+    if not os.path.exists(path):
+        return None
+    info = read_state_info(path)
+    if info.get('version') != STATE_VERSION:
+        raise WeekStateError(f"增量状态 {path} 的格式版本不兼容，请重建状态（--rebuild）")
+    if input_path is not None and info.get('source') != state_source(input_path):
+        raise WeekStateError(
+            f"增量状态 {path} 由 {info.get('source')} 生成，与当前输入 {state_source(input_path)} 不一致；"
+            f"请重建状态（--rebuild）或指定其他状态文件（--state-file）"
+        )
+    return pd.read_parquet(path)
+
+
+def save_state(state, path, input_path):
+    """原子写入增量聚合状态（源文件与格式版本写入文件元数据）"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_file = path + '.tmp'
+    frame = state.copy()
+    for key in FINE_KEYS[1:]:
+        frame[key] = frame[key].astype(str)
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[STATE_METADATA_KEY] = json.dumps(
+        {'version': STATE_VERSION, 'source': state_source(input_path)}, ensure_ascii=False
+    ).encode('utf-8')
+    pq.write_table(table.replace_schema_metadata(metadata), tmp_file)
+    os.replace(tmp_file, path)
+
+
+def frozen_weeks(state):
+    """读取时可以跳过的周次：状态中最近一周之前的全部周次
+
+    最近一周可能还有补录的记录，每次运行都重新聚合，不视为已完成。
+    """
+    if state is None or len(state) == 0:
+        return []
+    weeks = sorted(state['周'].unique())
+    return weeks[:-1]
+
+
+def update_week_state(delta, path, input_path, state=None):
+    """将本次聚合的细粒度加权和并入状态并落盘
+
+    delta 中出现的周次整体替换状态中的同一周次（最近一周的补录数据因此生效），其余周次保持不变。
+    返回 (state, 本次更新的周次列表)。
+    """
+    weeks = sorted(delta['周'].unique())
+    if state is None or len(state) == 0:
+        merged = delta if len(delta) > 0 else pd.DataFrame(columns=FINE_KEYS + sum_columns())
+    else:
+        merged = pd.concat([state[~state['周'].isin(weeks)], delta], ignore_index=True)
+        merged = merged.sort_values('周', kind='stable').reset_index(drop=True)
+    save_state(merged, path, input_path)
+    return merged, weeks